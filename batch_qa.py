@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+批量问答脚本
+从 JSONL 文件读取问题，批量检索后并发调用LLM生成答案，逐条写入 JSONL 结果（答案、来源、各阶段耗时）。
+结果文件中已成功生成的问题会被跳过，中断后重新运行即可续跑；检索或生成失败的问题会重试
+（追加新记录，同一ID以最后一条为准）。
+
+用法:
+    python batch_qa.py questions.jsonl [--output answers.jsonl] [--field question] [--id-field id]
+                       [--top-k 5] [--search-batch 64] [--concurrency 8] [--limit N]
+                       [--stub-llm 0.5]
+
+输入每行一个 JSON 对象，问题取 --field 指定的字段（默认依次尝试 question / query / title），
+ID 取 --id-field（默认依次尝试 id / request_id，都没有时使用行号）。
+检索耗时为所在批次的耗时按问题数平均。
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+sys.path.append('./src')
+
+import numpy as np
+
+from config import Config
+from rag_system import RAGSystem
+
+QUESTION_FIELDS = ("question", "query", "title")
+ID_FIELDS = ("id", "request_id")
+
+
+def load_questions(path, field=None, id_field=None):
+    """读取 JSONL 中的问题，返回 [{'id', 'question'}]，跳过没有问题文本的行"""
+    items = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            question = record.get(field) if field else next(
+                (record[k] for k in QUESTION_FIELDS if record.get(k)), None)
+            if not question:
+                continue
+            item_id = record.get(id_field) if id_field else next(
+                (record[k] for k in ID_FIELDS if record.get(k) is not None), None)
+            items.append({'id': str(item_id if item_id is not None else line_no), 'question': question})
+    return items
+
+
+def trim_partial_line(path):
+    """截掉中断时只写了一半的最后一行（没有换行符），之后追加的记录从新行开始"""
+    if not os.path.exists(path):
+        return
+    with open(path, "rb+") as f:
+        end = f.seek(0, os.SEEK_END)
+        pos = end
+        while pos > 0:
+            start = max(0, pos - 4096)
+            f.seek(start)
+            data = f.read(pos - start)
+            if pos == end and data.endswith(b"\n"):
+                return
+            newline = data.rfind(b"\n")
+            if newline >= 0:
+                f.truncate(start + newline + 1)
+                return
+            pos = start
+        f.truncate(0)
+
+
+def load_finished_ids(path):
+    """结果文件中已成功生成答案的问题ID（生成失败的记录不计入，重新运行时重试）"""
+    finished = set()
+    if not os.path.exists(path):
+        return finished
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                if record.get('generated'):
+                    finished.add(str(record['id']))
+            except (ValueError, KeyError):
+                continue
+    return finished
+
+
+def create_system(args):
+    config = Config()
+    rag_system = RAGSystem(config)
+    if not rag_system.initialize(warmup=False):
+        raise RuntimeError("RAG系统初始化失败")
+    if rag_system.collection.count() == 0:
+        print(f"📚 集合为空，先加载 {args.data_file}")
+        rag_system.load_and_index_data(args.data_file)
+    if args.stub_llm is not None:
+        from llm_stub import StubOpenAIClient
+        rag_system.openai_client = StubOpenAIClient(delay=args.stub_llm, tokens_per_second=0)
+    return rag_system
+
+
+def answer_one(rag_system, item, sources, search_time):
+    """
+    为一个问题生成答案，返回结果记录
+
+    sources 为 None 表示检索失败：不调用LLM，记录为未生成（search_failed），重新运行时重试。
+    """
+    if sources is None:
+        return {
+            'id': item['id'],
+            'question': item['question'],
+            'answer': "检索失败",
+            'generated': False,
+            'search_failed': True,
+            'sources': [],
+            'timings': {'search': search_time, 'generate': 0.0, 'total': search_time}
+        }
+    generate_start = time.time()
+    try:
+        answer, generated = rag_system.answer_from_sources(item['question'], sources)
+    except Exception as e:
+        answer, generated = f"生成失败: {e}", False
+    generate_time = time.time() - generate_start
+    return {
+        'id': item['id'],
+        'question': item['question'],
+        'answer': answer,
+        'generated': generated,
+        'sources': [
+            {
+                'id': source['id'],
+                'score': round(source['score'], 4),
+                'source': source['metadata'].get('source'),
+                'chapter': source['metadata'].get('chapter'),
+                'content': source['content'][:200]
+            }
+            for source in sources
+        ],
+        'timings': {
+            'search': search_time,
+            'generate': generate_time,
+            'total': search_time + generate_time
+        }
+    }
+
+
+def run(rag_system, items, args):
+    """批量检索 + 并发生成，结果按完成顺序写入输出文件；返回写入的记录"""
+    records = []
+    max_pending = args.concurrency * 4  # 限制已检索未生成的问题数，避免一次性检索全部问题
+
+    def flush(done, out):
+        for future in done:
+            record = future.result()
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            records.append(record)
+        out.flush()
+        print(f"\r✅ {len(records)}/{len(items)}", end="", flush=True)
+
+    pool = ThreadPoolExecutor(max_workers=args.concurrency)
+    try:
+        with open(args.output, "a", encoding="utf-8") as out:
+            pending = set()
+            for i in range(0, len(items), args.search_batch):
+                batch = items[i:i + args.search_batch]
+                search_start = time.time()
+                results = rag_system.search_batch([item['question'] for item in batch], args.top_k,
+                                                  batch_size=args.search_batch)
+                search_time = (time.time() - search_start) / len(batch)
+                for item, sources in zip(batch, results):
+                    pending.add(pool.submit(answer_one, rag_system, item, sources, search_time))
+                while len(pending) > max_pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    flush(done, out)
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                flush(done, out)
+    finally:
+        # 中断时丢弃尚未开始的生成任务
+        pool.shutdown(wait=True, cancel_futures=True)
+    print()
+    return records
+
+
+def print_summary(records, elapsed, skipped):
+    if not records:
+        print(f"没有需要处理的问题（跳过已完成 {skipped} 个）")
+        return
+    search = [r['timings']['search'] for r in records]
+    # 检索失败的问题没有生成阶段，不计入生成耗时
+    generate = [r['timings']['generate'] for r in records if not r.get('search_failed')] or [0.0]
+    search_failed = sum(bool(r.get('search_failed')) for r in records)
+    failed = sum(not r['generated'] for r in records) - search_failed
+    print(f"\n{'问题数':<14}{len(records)}（跳过已完成 {skipped} 个）")
+    print(f"{'总耗时':<14}{elapsed:.1f}s")
+    print(f"{'吞吐':<14}{len(records) / elapsed:.2f} 问/秒")
+    print(f"{'检索(均摊)':<14}{np.mean(search) * 1000:.1f}ms/问，合计 {sum(search):.1f}s")
+    print(f"{'生成 p50/p95':<14}{np.percentile(generate, 50):.2f}s / {np.percentile(generate, 95):.2f}s")
+    print(f"{'检索失败':<14}{search_failed}")
+    print(f"{'生成失败':<14}{failed}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量问答（JSONL 输入/输出，可续跑）")
+    parser.add_argument("input", help="问题文件（JSONL）")
+    parser.add_argument("--output", help="结果文件（JSONL），默认为 <输入文件名>.answers.jsonl")
+    parser.add_argument("--field", help="问题字段名")
+    parser.add_argument("--id-field", help="ID 字段名")
+    parser.add_argument("--top-k", type=int, default=Config.DEFAULT_TOP_K)
+    parser.add_argument("--search-batch", type=int, default=64, help="每批检索的问题数")
+    parser.add_argument("--concurrency", type=int, default=8, help="同时进行的LLM请求数")
+    parser.add_argument("--limit", type=int, help="最多处理的问题数")
+    parser.add_argument("--data-file", default="./data/xi_you_ji.txt", help="集合为空时加载的数据文件")
+    parser.add_argument("--stub-llm", type=float, metavar="SECONDS",
+                        help="使用本地桩客户端代替DeepSeek，模拟每次生成的延迟（用于测试）")
+    args = parser.parse_args()
+    args.output = args.output or os.path.splitext(args.input)[0] + ".answers.jsonl"
+
+    logging.basicConfig(level=logging.WARNING)
+
+    items = load_questions(args.input, args.field, args.id_field)
+    trim_partial_line(args.output)
+    finished = load_finished_ids(args.output)
+    todo = [item for item in items if item['id'] not in finished]
+    skipped = len(items) - len(todo)
+    if args.limit is not None:
+        todo = todo[:args.limit]
+    print(f"📋 共 {len(items)} 个问题，已完成 {skipped} 个，本次处理 {len(todo)} 个 → {args.output}")
+    if not todo:
+        print_summary([], 0.0, skipped)
+        return
+
+    rag_system = create_system(args)
+    start = time.time()
+    try:
+        records = run(rag_system, todo, args)
+    except KeyboardInterrupt:
+        print("\n⏸️ 已中断，已写入的结果会在下次运行时跳过")
+        return
+    print_summary(records, time.time() - start, skipped)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+HTTP API 压测脚本
+启动 src/api_server.py（使用LLM桩客户端），在不同并发度下压测 /query 或 /search，
+报告吞吐(QPS)、延迟分位数和错误数
+
+用法:
+    python benchmark_api_load.py [--workers 2] [--concurrency 1 4 16] [--requests 200]
+                                 [--endpoint /query] [--stub-llm-delay 0.5]
+    python benchmark_api_load.py --url http://127.0.0.1:8000   # 压测已启动的服务
+
+注意：服务使用 Config 中的集合，压测前请先加载数据。
+自动启动的服务关闭问答结果缓存（问题重复出现，否则测到的只是缓存命中）；
+压测已启动的服务时，请以 RAG_QUERY_CACHE_SIZE=0 启动该服务。
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import subprocess
+
+import httpx
+import numpy as np
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "src")
+
+QUESTIONS = [
+    "悟空的兵器是什么？",
+    "悟空的师傅是谁？",
+    "猪八戒的兵器是什么？",
+    "唐僧取经经过了哪些地方？",
+    "诸葛亮是如何借东风的？",
+    "刘备三顾茅庐请的是谁？",
+]
+
+
+def start_server(port, workers, stub_llm_delay):
+    process = subprocess.Popen(
+        [sys.executable, "api_server.py", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--stub-llm-delay", str(stub_llm_delay)],
+        cwd=SRC_DIR,
+        env=dict(os.environ, RAG_QUERY_CACHE_SIZE="0")
+    )
+    return process
+
+
+def wait_until_ready(url, timeout=300):
+    """等待 /stats 返回200（所有worker加载模型可能需要较长时间）"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"{url}/stats", timeout=5).status_code == 200:
+                return True
+        except httpx.HTTPError:
+            pass
+        time.sleep(1)
+    return False
+
+
+async def run_load(url, endpoint, concurrency, total_requests, top_k):
+    latencies, errors = [], 0
+    counter = iter(range(total_requests))
+
+    async def worker(client):
+        nonlocal errors
+        for i in counter:
+            payload = {"query": QUESTIONS[i % len(QUESTIONS)], "top_k": top_k}
+            start = time.perf_counter()
+            try:
+                response = await client.post(f"{url}{endpoint}", json=payload)
+                if response.status_code != 200:
+                    errors += 1
+                    continue
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=120, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        'concurrency': concurrency,
+        'ok': len(latencies),
+        'errors': errors,
+        'qps': len(latencies) / elapsed if elapsed else 0.0,
+        'p50': float(np.percentile(latencies, 50)) if latencies else 0.0,
+        'p95': float(np.percentile(latencies, 95)) if latencies else 0.0,
+        'p99': float(np.percentile(latencies, 99)) if latencies else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RAG HTTP API 压测")
+    parser.add_argument("--url", default=None, help="压测已启动的服务；不指定时自动启动本地服务")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=2, help="自动启动服务时的 uvicorn worker 数")
+    parser.add_argument("--stub-llm-delay", type=float, default=0.5, help="LLM桩客户端延迟（秒）")
+    parser.add_argument("--endpoint", default="/query", choices=["/query", "/search"])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=200, help="每个并发度的请求总数")
+    parser.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+
+    process = None
+    url = args.url
+    if url is None:
+        url = f"http://127.0.0.1:{args.port}"
+        print(f"🚀 启动API服务: {args.workers} 个worker, LLM桩延迟 {args.stub_llm_delay}s")
+        process = start_server(args.port, args.workers, args.stub_llm_delay)
+
+    try:
+        if not wait_until_ready(url):
+            print("❌ 服务未就绪")
+            return
+
+        print(f"\n压测 {args.endpoint} ({args.requests} 个请求/并发度)\n")
+        print(f"{'并发':>5} {'成功':>6} {'错误':>6} | {'QPS':>8} {'p50(ms)':>9} {'p95(ms)':>9} {'p99(ms)':>9}")
+        print("-" * 62)
+        for concurrency in args.concurrency:
+            row = asyncio.run(run_load(url, args.endpoint, concurrency, args.requests, args.top_k))
+            print(f"{row['concurrency']:>5} {row['ok']:>6} {row['errors']:>6} | {row['qps']:>8.1f} "
+                  f"{row['p50']:>9.1f} {row['p95']:>9.1f} {row['p99']:>9.1f}")
+    finally:
+        if process:
+            process.terminate()
+            process.wait(timeout=30)
+
+
+if __name__ == "__main__":
+    main()
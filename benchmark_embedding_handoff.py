@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+嵌入向量传递方式基准测试脚本
+在两部完整小说上对比索引阶段的两种向量传递方式：
+  - list:  每批 .tolist() 转为 Python 浮点列表再拼接（旧实现）
+  - array: 预分配连续 float32 数组，切片直接传给向量库（当前 RAGSystem._index_chunks）
+
+用法:
+    python benchmark_embedding_handoff.py
+
+每种方式在独立子进程中运行，报告索引耗时、tracemalloc 峰值和进程峰值常驻内存。
+"""
+import sys
+import time
+import shutil
+import resource
+import tempfile
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+sys.path.append('./src')
+
+
+def create_system(persist_dir):
+    from config import Config
+    from rag_system import RAGSystem
+
+    config = Config()
+    config.CHROMA_PERSIST_DIR = persist_dir
+    config.ENABLE_DEDUP = False
+    rag_system = RAGSystem(config)
+    if not rag_system._initialize_embedding_model() or not rag_system._initialize_vector_db():
+        raise RuntimeError("RAG系统初始化失败")
+    return rag_system
+
+
+def load_chunks(config):
+    from utils import build_novel_chunks
+
+    chunks, metadatas, ids = [], [], []
+    for data_file in ["./data/xi_you_ji.txt", "./data/san_guo_yan_yi.txt"]:
+        result = build_novel_chunks(data_file, 1000, config.MAX_CHUNK_SIZE, config.CHUNK_OVERLAP)
+        chunks.extend(result['chunks'])
+        metadatas.extend(result['metadatas'])
+        ids.extend(result['ids'])
+    return chunks, metadatas, ids
+
+
+def index_with_lists(rag_system, chunks, metadatas, ids):
+    """旧实现：逐批 tolist() 并拼接成 Python 列表"""
+    batch_size = 32
+    embeddings = []
+    for i in range(0, len(chunks), batch_size):
+        batch_embeddings = rag_system.embedding_model.encode(
+            chunks[i:i + batch_size], convert_to_tensor=False, show_progress_bar=False
+        )
+        embeddings.extend(batch_embeddings.tolist())
+    write_batch = rag_system.chroma_client.get_max_batch_size()
+    for i in range(0, len(chunks), write_batch):
+        rag_system.collection.add(
+            embeddings=embeddings[i:i + write_batch],
+            documents=chunks[i:i + write_batch],
+            metadatas=metadatas[i:i + write_batch],
+            ids=ids[i:i + write_batch]
+        )
+    return True
+
+
+def run_strategy(strategy):
+    """子进程：用指定方式索引全部文本块"""
+    import logging
+    logging.disable(logging.INFO)
+
+    persist_dir = tempfile.mkdtemp(prefix=f"rag_handoff_{strategy}_")
+    try:
+        rag_system = create_system(persist_dir)
+        chunks, metadatas, ids = load_chunks(rag_system.config)
+        # 预热模型，排除首批推理的初始化开销
+        rag_system.embedding_model.encode(chunks[:8])
+
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        tracemalloc.start()
+        start = time.perf_counter()
+        if strategy == "list":
+            index_with_lists(rag_system, chunks, metadatas, ids)
+        else:
+            rag_system._index_chunks(chunks, metadatas, ids)
+        elapsed = time.perf_counter() - start
+        _, traced_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        return {
+            'strategy': strategy,
+            'chunks': len(chunks),
+            'indexed': rag_system.collection.count(),
+            'seconds': elapsed,
+            'traced_peak_mb': traced_peak / 1024 / 1024,
+            'peak_rss_growth_mb': (rss_after - rss_before) / 1024
+        }
+    finally:
+        shutil.rmtree(persist_dir, ignore_errors=True)
+
+
+def main():
+    print("🧮 对比嵌入向量传递方式（完整小说）...\n")
+    print(f"{'方式':>6} {'文本块':>8} {'已索引':>8} | {'耗时(s)':>8} {'tracemalloc峰值(MB)':>20} {'峰值RSS增长(MB)':>16}")
+    print("-" * 80)
+    for strategy in ["list", "array"]:
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            row = executor.submit(run_strategy, strategy).result()
+        print(f"{row['strategy']:>6} {row['chunks']:>8} {row['indexed']:>8} | {row['seconds']:>8.2f} "
+              f"{row['traced_peak_mb']:>20.1f} {row['peak_rss_growth_mb']:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+分层检索基准测试脚本
+对比扁平检索与分层检索（章节 → 文本块）在不同语料规模下的延迟和召回率
+
+用法:
+    python benchmark_hierarchical.py [--scales 1 2 4 8] [--top-k 5] [--top-chapters 5] [--queries 50]
+
+语料放大方式：对两部小说的文本块向量复制多份并加入少量噪声，
+每份使用不同的 source 名称，模拟加入更多书籍后的索引规模。
+"""
+import sys
+import time
+import argparse
+sys.path.append('./src')
+
+import numpy as np
+import chromadb
+from chromadb.config import Settings
+
+from config import Config
+from rag_system import RAGSystem
+from utils import build_novel_chunks
+
+QUESTIONS = [
+    "悟空的兵器是什么？",
+    "悟空的师傅是谁？",
+    "诸葛亮是如何借东风的？",
+    "刘备三顾茅庐请的是谁？",
+    "关羽过五关斩六将",
+    "赤壁之战谁放的火？",
+]
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+def load_corpus(config):
+    """加载并编码两部小说的全部文本块"""
+    chunks, metadatas = [], []
+    for data_file in ["./data/xi_you_ji.txt", "./data/san_guo_yan_yi.txt"]:
+        result = build_novel_chunks(data_file, 1000, config.MAX_CHUNK_SIZE, config.CHUNK_OVERLAP)
+        chunks.extend(result['chunks'])
+        metadatas.extend(result['metadatas'])
+    return chunks, metadatas
+
+
+def build_scaled_system(rag_system, client, base_embeddings, base_metadatas, scale, rng):
+    """构建放大 scale 倍的扁平索引和章节索引"""
+    collection = client.create_collection(name=f"bench_flat_{scale}", metadata={"hnsw:space": "cosine"})
+    chapter_collection = client.create_collection(name=f"bench_chapters_{scale}", metadata={"hnsw:space": "cosine"})
+
+    all_embeddings, all_metadatas = [], []
+    for copy in range(scale):
+        embeddings = base_embeddings
+        if copy > 0:
+            embeddings = base_embeddings + rng.normal(0, 0.01, base_embeddings.shape).astype(np.float32)
+            embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+        metadatas = [dict(m, source=f"{m['source']}_{copy}") for m in base_metadatas]
+        all_embeddings.append(embeddings)
+        all_metadatas.extend(metadatas)
+    all_embeddings = np.vstack(all_embeddings)
+    ids = [f"chunk_{i}" for i in range(len(all_embeddings))]
+
+    # ChromaDB 单次写入有批量上限，分批写入
+    batch = 4000
+    for start in range(0, len(ids), batch):
+        collection.add(
+            ids=ids[start:start + batch],
+            embeddings=all_embeddings[start:start + batch].tolist(),
+            documents=[""] * len(ids[start:start + batch]),
+            metadatas=all_metadatas[start:start + batch]
+        )
+
+    rag_system.collection = collection
+    rag_system.chapter_collection = chapter_collection
+    chapter_sums = {}
+    rag_system._accumulate_chapter_sums(chapter_sums, all_embeddings, all_metadatas)
+    rag_system._write_chapter_centroids(chapter_sums)
+    return all_embeddings, ids
+
+
+def run_benchmark(args):
+    config = Config()
+    config.HIERARCHICAL_TOP_CHAPTERS = args.top_chapters
+    rag_system = RAGSystem(config)
+    if not rag_system._initialize_embedding_model():
+        print("❌ 嵌入模型初始化失败")
+        return
+
+    print("📚 加载并编码语料...")
+    chunks, metadatas = load_corpus(config)
+    base_embeddings = rag_system.embedding_model.encode(
+        chunks, batch_size=32, normalize_embeddings=True, show_progress_bar=True
+    ).astype(np.float32)
+
+    rng = np.random.RandomState(0)
+    sample = rng.choice(len(chunks), size=max(0, args.queries - len(QUESTIONS)), replace=False)
+    query_embeddings = np.vstack([
+        rag_system.embedding_model.encode(QUESTIONS, normalize_embeddings=True),
+        base_embeddings[sample]
+    ]).astype(np.float32)
+
+    client = chromadb.EphemeralClient(settings=Settings(anonymized_telemetry=False, allow_reset=True))
+
+    print(f"\n{'规模':>4} {'文本块':>8} {'章节':>6} | {'扁平p50':>9} {'扁平p95':>9} {'召回':>6} | "
+          f"{'分层p50':>9} {'分层p95':>9} {'召回':>6}")
+    print("-" * 86)
+    for scale in args.scales:
+        all_embeddings, ids = build_scaled_system(rag_system, client, base_embeddings, metadatas, scale, rng)
+        id_index = {chunk_id: i for i, chunk_id in enumerate(ids)}
+
+        timings = {'flat': [], 'hierarchical': []}
+        recalls = {'flat': [], 'hierarchical': []}
+        for query_embedding in query_embeddings:
+            # 精确检索作为召回率基准
+            exact = set(np.argsort(-all_embeddings @ query_embedding)[:args.top_k])
+
+            start = time.perf_counter()
+            flat = rag_system.collection.query(query_embeddings=[query_embedding.tolist()], n_results=args.top_k)
+            timings['flat'].append((time.perf_counter() - start) * 1000)
+            recalls['flat'].append(len(exact & {id_index[i] for i in flat['ids'][0]}) / args.top_k)
+
+            start = time.perf_counter()
+            results = rag_system._query_hierarchical(query_embedding.tolist(), args.top_k)
+            timings['hierarchical'].append((time.perf_counter() - start) * 1000)
+            found = {id_index[result['id']] for result in results}
+            recalls['hierarchical'].append(len(exact & found) / args.top_k)
+
+        print(f"{scale:>3}x {len(ids):>8} {rag_system.chapter_collection.count():>6} | "
+              f"{percentile(timings['flat'], 50):>7.2f}ms {percentile(timings['flat'], 95):>7.2f}ms "
+              f"{np.mean(recalls['flat']):>6.3f} | "
+              f"{percentile(timings['hierarchical'], 50):>7.2f}ms {percentile(timings['hierarchical'], 95):>7.2f}ms "
+              f"{np.mean(recalls['hierarchical']):>6.3f}")
+
+        client.delete_collection(f"bench_flat_{scale}")
+        client.delete_collection(f"bench_chapters_{scale}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="扁平检索 vs 分层检索基准测试")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 2, 4, 8], help="语料放大倍数")
+    parser.add_argument("--top-k", type=int, default=5, help="检索结果数量")
+    parser.add_argument("--top-chapters", type=int, default=5, help="分层检索粗排保留的章节数")
+    parser.add_argument("--queries", type=int, default=50, help="查询数量")
+    run_benchmark(parser.parse_args())
+
+
+if __name__ == "__main__":
+    main()
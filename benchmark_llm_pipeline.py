@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+完整问答流程压测脚本（使用本地模拟LLM）
+启动 src/mock_llm_server.py，把 RAGSystem 的 DeepSeek 客户端指向它，
+在不同并发度下调用 RAGSystem.query，报告各阶段延迟分位数、吞吐和降级次数
+
+用法:
+    python benchmark_llm_pipeline.py [--concurrency 1 4 8] [--requests 60]
+                                     [--ttft 0.3] [--tokens-per-second 40] [--error-rate 0.05]
+
+注意：使用 Config 中的集合，集合为空时会先加载 data/xi_you_ji.txt。
+"""
+import os
+import sys
+import time
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append('./src')
+
+import httpx
+import numpy as np
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "src")
+
+QUESTIONS = [
+    "悟空的兵器是什么？",
+    "悟空的师傅是谁？",
+    "猪八戒的兵器是什么？",
+    "唐僧取经经过了哪些地方？",
+    "沙僧原来是做什么的？",
+    "白龙马是怎么来的？",
+]
+
+FALLBACK_PREFIXES = ("抱歉，无法生成回答", "基于检索到的信息")
+
+
+def start_mock_server(args):
+    return subprocess.Popen(
+        [sys.executable, "mock_llm_server.py", "--port", str(args.port),
+         "--ttft", str(args.ttft), "--tokens-per-second", str(args.tokens_per_second),
+         "--answer-tokens", str(args.answer_tokens), "--error-rate", str(args.error_rate)],
+        cwd=SRC_DIR
+    )
+
+
+def wait_until_ready(base_url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"{base_url}/models", timeout=2).status_code == 200:
+                return True
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    return False
+
+
+def create_system(base_url):
+    from config import Config
+    from rag_system import RAGSystem
+
+    config = Config()
+    config.DEEPSEEK_API_KEY = "sk-mock"
+    config.DEEPSEEK_BASE_URL = base_url
+    config.QUERY_CACHE_SIZE = 0  # 问题重复出现，开启结果缓存时测到的只是缓存命中
+    rag_system = RAGSystem(config)
+    if not rag_system.initialize(warmup=False):
+        raise RuntimeError("RAG系统初始化失败")
+    if rag_system.collection.count() == 0:
+        rag_system.load_and_index_data("./data/xi_you_ji.txt")
+    return rag_system
+
+
+def summarize(values):
+    return (float(np.percentile(values, 50)) * 1000, float(np.percentile(values, 95)) * 1000) if values else (0.0, 0.0)
+
+
+def run_level(rag_system, concurrency, total_requests, top_k):
+    def one(i):
+        return rag_system.query(QUESTIONS[i % len(QUESTIONS)], top_k=top_k)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(one, range(total_requests)))
+    elapsed = time.perf_counter() - start
+
+    fallbacks = sum(1 for r in results if r['answer'].startswith(FALLBACK_PREFIXES))
+    return {
+        'concurrency': concurrency,
+        'qps': len(results) / elapsed,
+        'search': summarize([r['search_time'] for r in results]),
+        'generate': summarize([r['generate_time'] for r in results]),
+        'total': summarize([r['total_time'] for r in results]),
+        'fallbacks': fallbacks
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RAGSystem.query 压测（模拟LLM）")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--ttft", type=float, default=0.3)
+    parser.add_argument("--tokens-per-second", type=float, default=40.0)
+    parser.add_argument("--answer-tokens", type=int, default=80)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--requests", type=int, default=60, help="每个并发度的请求总数")
+    parser.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+
+    base_url = f"http://127.0.0.1:{args.port}/v1"
+    server = start_mock_server(args)
+    try:
+        if not wait_until_ready(base_url):
+            print("❌ 模拟LLM服务未就绪")
+            return
+        import logging
+        logging.disable(logging.INFO)
+        rag_system = create_system(base_url)
+
+        print(f"\n模拟LLM: 首token {args.ttft}s, {args.tokens_per_second} token/s, "
+              f"{args.answer_tokens} token/回答, 错误率 {args.error_rate}\n")
+        print(f"{'并发':>5} {'QPS':>7} | {'检索p50':>8} {'检索p95':>8} | {'生成p50':>8} {'生成p95':>8} | "
+              f"{'总计p50':>8} {'总计p95':>8} | {'降级':>5}")
+        print("-" * 92)
+        for concurrency in args.concurrency:
+            row = run_level(rag_system, concurrency, args.requests, args.top_k)
+            print(f"{row['concurrency']:>5} {row['qps']:>7.2f} | {row['search'][0]:>6.0f}ms {row['search'][1]:>6.0f}ms | "
+                  f"{row['generate'][0]:>6.0f}ms {row['generate'][1]:>6.0f}ms | "
+                  f"{row['total'][0]:>6.0f}ms {row['total'][1]:>6.0f}ms | {row['fallbacks']:>5}")
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+日志开销测量脚本
+1. 在不同日志级别下对数据目录做完整入库（每次使用临时向量库），比较耗时和日志量
+2. 单独测量旧的逐块预览日志（每个文本块一条 INFO，先拼接字符串）在全部文本块上的开销
+
+日志写入临时文件（与实际部署时写文件/终端的成本接近）。
+
+用法:
+    python benchmark_logging.py [--levels WARNING INFO DEBUG] [--data-dir ./data]
+"""
+import os
+import sys
+import time
+import shutil
+import logging
+import argparse
+import tempfile
+sys.path.append('./src')
+
+from config import Config
+from rag_system import RAGSystem
+from utils import build_novel_chunks
+
+
+def configure_logging(level, log_file):
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+    handler = logging.FileHandler(log_file, mode="w", encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(levelname)s %(message)s"))
+    root.addHandler(handler)
+    root.setLevel(level)
+
+
+def run_ingest(level, data_dir, log_file):
+    """以指定日志级别完整入库一次，返回 (耗时, 日志字节数, 日志行数)"""
+    persist_dir = tempfile.mkdtemp(prefix="rag_bench_logging_")
+    try:
+        configure_logging(logging.WARNING, log_file)
+        config = Config()
+        config.CHROMA_PERSIST_DIR = persist_dir
+        rag_system = RAGSystem(config)
+        if not rag_system.initialize(warmup=False):
+            raise RuntimeError("RAG系统初始化失败")
+
+        configure_logging(level, log_file)
+        start = time.perf_counter()
+        if not rag_system.load_and_index_directory(data_dir, force_reload=True):
+            raise RuntimeError("入库失败")
+        elapsed = time.perf_counter() - start
+        logging.getLogger().handlers[0].flush()
+    finally:
+        shutil.rmtree(persist_dir, ignore_errors=True)
+
+    with open(log_file, "r", encoding="utf-8") as f:
+        lines = f.readlines()
+    return elapsed, sum(len(line.encode("utf-8")) for line in lines), len(lines)
+
+
+def legacy_preview_cost(data_dir, log_file):
+    """
+    测量旧实现逐块 logger.info 预览日志（每条都拼接字符串）在全部文本块上的耗时
+
+    Returns:
+        (文本块数, {级别: 耗时}, INFO 级别下的日志字节数)
+    """
+    chunks = []
+    for name in sorted(os.listdir(data_dir)):
+        if name.endswith(".txt"):
+            chunks.extend(build_novel_chunks(os.path.join(data_dir, name), 1000,
+                                             Config.MAX_CHUNK_SIZE, Config.CHUNK_OVERLAP)['chunks'])
+    logger = logging.getLogger("rag_system")
+    timings, info_bytes = {}, 0
+    for level in (logging.INFO, logging.WARNING):
+        configure_logging(level, log_file)
+        start = time.perf_counter()
+        for chunk in chunks:
+            logger.info("✅ 文本块: " + chunk[0:100])
+        timings[logging.getLevelName(level)] = time.perf_counter() - start
+        logging.getLogger().handlers[0].flush()
+        if level == logging.INFO:
+            info_bytes = os.path.getsize(log_file)
+    return len(chunks), timings, info_bytes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="入库流程日志开销测量")
+    parser.add_argument("--data-dir", default="./data")
+    parser.add_argument("--levels", nargs="+", default=["WARNING", "INFO", "DEBUG"])
+    args = parser.parse_args()
+
+    log_file = os.path.join(tempfile.gettempdir(), "rag_bench_logging.log")
+
+    chunk_count, legacy, legacy_bytes = legacy_preview_cost(args.data_dir, log_file)
+    print(f"旧的逐块预览日志 ({chunk_count} 个文本块):")
+    print(f"  INFO 输出:   {legacy['INFO'] * 1000:.1f}ms, {legacy_bytes / 1024:.1f}KB")
+    print(f"  级别关闭时:  {legacy['WARNING'] * 1000:.1f}ms（仍有字符串拼接开销）")
+
+    print(f"\n{'日志级别':<10} {'入库耗时(s)':>12} {'日志行数':>10} {'日志量(KB)':>12}")
+    print("-" * 48)
+    baseline = None
+    for level in args.levels:
+        elapsed, size, lines = run_ingest(getattr(logging, level), args.data_dir, log_file)
+        baseline = baseline or elapsed
+        print(f"{level:<10} {elapsed:>12.2f} {lines:>10} {size / 1024:>12.1f}  ({(elapsed / baseline - 1):+.1%})")
+
+    os.remove(log_file)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+量化向量存储基准测试脚本
+在不同语料规模下对比 ChromaDB(float32) 与 int8 / binary 量化存储的
+索引磁盘大小、常驻内存、查询延迟和召回率
+
+用法:
+    python benchmark_quantization.py [--scales 1 4 16] [--top-k 5] [--queries 100] [--rescore-factor 4]
+
+每个 (存储方式, 规模) 组合在独立子进程中先写入索引，再在另一个全新子进程中
+加载并查询，这样常驻内存只包含加载索引本身的开销。
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+sys.path.append('./src')
+
+import numpy as np
+
+MODES = ["chroma", "int8", "binary"]
+
+
+def current_rss_mb() -> float:
+    """当前进程常驻内存（MB）"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def directory_size_mb(path: str) -> float:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total / 1024 / 1024
+
+
+def open_store(mode, path, rescore_factor, create=False):
+    """打开（或创建）指定存储方式的集合"""
+    if mode == "chroma":
+        import chromadb
+        from chromadb.config import Settings
+        client = chromadb.PersistentClient(path=path, settings=Settings(anonymized_telemetry=False))
+        if create:
+            return client.create_collection(name="bench_chunks", metadata={"hnsw:space": "cosine"})
+        return client.get_collection(name="bench_chunks")
+    from quantized_store import QuantizedCollection
+    return QuantizedCollection(path, mode=mode, rescore_factor=rescore_factor)
+
+
+def build_index(mode, path, embeddings_file, rescore_factor):
+    """子进程：写入索引"""
+    embeddings = np.load(embeddings_file)
+    store = open_store(mode, path, rescore_factor, create=True)
+    ids = [str(i) for i in range(len(embeddings))]
+    batch = 4000
+    start = time.perf_counter()
+    for offset in range(0, len(ids), batch):
+        rows = slice(offset, offset + batch)
+        store.add(
+            embeddings=embeddings[rows],
+            documents=[""] * len(ids[rows]),
+            metadatas=[{"row": i} for i in range(offset, min(offset + batch, len(ids)))],
+            ids=ids[rows]
+        )
+    if mode != "chroma":
+        store.flush()
+    return time.perf_counter() - start
+
+
+def query_index(mode, path, queries_file, ground_truth, top_k, rescore_factor):
+    """子进程：加载索引并查询，返回常驻内存和延迟"""
+    queries = np.load(queries_file)
+    rss_before = current_rss_mb()
+    store = open_store(mode, path, rescore_factor)
+    # 预热一次，让索引真正载入内存
+    store.query(query_embeddings=[queries[0].tolist()], n_results=top_k)
+    latencies, recalls = [], []
+    for query, exact in zip(queries, ground_truth):
+        start = time.perf_counter()
+        results = store.query(query_embeddings=[query.tolist()], n_results=top_k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        recalls.append(len(exact & {int(i) for i in results['ids'][0]}) / top_k)
+    return {
+        'rss_mb': current_rss_mb() - rss_before,
+        'p50': float(np.percentile(latencies, 50)),
+        'p95': float(np.percentile(latencies, 95)),
+        'recall': float(np.mean(recalls))
+    }
+
+
+def load_base_embeddings():
+    from config import Config
+    from rag_system import RAGSystem
+    from utils import build_novel_chunks
+
+    config = Config()
+    rag_system = RAGSystem(config)
+    if not rag_system._initialize_embedding_model():
+        raise RuntimeError("嵌入模型初始化失败")
+    chunks = []
+    for data_file in ["./data/xi_you_ji.txt", "./data/san_guo_yan_yi.txt"]:
+        chunks.extend(build_novel_chunks(data_file, 1000, config.MAX_CHUNK_SIZE, config.CHUNK_OVERLAP)['chunks'])
+    embeddings = rag_system.embedding_model.encode(
+        chunks, batch_size=32, normalize_embeddings=True, show_progress_bar=True
+    )
+    return np.asarray(embeddings, dtype=np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="量化向量存储基准测试")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 4, 16], help="语料放大倍数")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--rescore-factor", type=int, default=4)
+    args = parser.parse_args()
+
+    print("📚 加载并编码语料...")
+    base = load_base_embeddings()
+    rng = np.random.RandomState(0)
+    work_dir = tempfile.mkdtemp(prefix="rag_quant_bench_")
+
+    print(f"\n{'规模':>4} {'向量数':>8} {'存储':>7} | {'磁盘(MB)':>9} {'内存(MB)':>9} {'构建(s)':>8} "
+          f"{'p50(ms)':>8} {'p95(ms)':>8} {'recall':>7}")
+    print("-" * 88)
+    try:
+        for scale in args.scales:
+            # 复制语料并加噪声模拟更大的语料库
+            copies = [base] + [base + rng.normal(0, 0.01, base.shape).astype(np.float32) for _ in range(scale - 1)]
+            embeddings = np.vstack(copies)
+            embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+            queries = embeddings[rng.choice(len(embeddings), size=args.queries, replace=False)]
+            queries = queries + rng.normal(0, 0.02, queries.shape).astype(np.float32)
+            queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+            ground_truth = [set(np.argsort(-embeddings @ q)[:args.top_k].tolist()) for q in queries]
+
+            embeddings_file = os.path.join(work_dir, f"embeddings_{scale}.npy")
+            queries_file = os.path.join(work_dir, f"queries_{scale}.npy")
+            np.save(embeddings_file, embeddings)
+            np.save(queries_file, queries)
+
+            for mode in MODES:
+                path = os.path.join(work_dir, f"{mode}_{scale}")
+                with ProcessPoolExecutor(max_workers=1) as executor:
+                    build_time = executor.submit(build_index, mode, path, embeddings_file, args.rescore_factor).result()
+                with ProcessPoolExecutor(max_workers=1) as executor:
+                    stats = executor.submit(
+                        query_index, mode, path, queries_file, ground_truth, args.top_k, args.rescore_factor
+                    ).result()
+                print(f"{scale:>3}x {len(embeddings):>8} {mode:>7} | {directory_size_mb(path):>9.1f} "
+                      f"{stats['rss_mb']:>9.1f} {build_time:>8.2f} {stats['p50']:>8.2f} {stats['p95']:>8.2f} "
+                      f"{stats['recall']:>7.3f}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+冷启动导入耗时基准测试脚本
+使用 python -X importtime 在全新解释器中导入模块，统计冷导入耗时和最耗时的依赖，
+并检查重量级依赖是否被提前导入
+
+用法:
+    python benchmark_startup.py [--modules rag_system utils config] [--repeat 5] [--top 10]
+                                [--max-ms 500] [--check-manifest]
+
+--max-ms 作为回归阈值：任一模块导入耗时的中位数超过阈值，或导入后加载了重量级依赖时，
+脚本以非零状态退出。
+--check-manifest 检查配置的嵌入模型在第二次启动时直接从模型清单解析到本地路径。
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "src")
+
+# 只应在组件初始化时导入的依赖
+HEAVY_MODULES = ["torch", "transformers", "sentence_transformers", "modelscope", "chromadb", "openai",
+                 "httpx", "tenacity"]
+
+
+def measure_import(module: str):
+    """
+    在全新解释器中导入模块
+
+    Returns:
+        (总耗时ms, [(累计耗时us, 模块名)], 已加载的重量级依赖)
+    """
+    probe = (
+        f"import sys, json; import {module}; "
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", probe],
+        cwd=SRC_DIR, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"导入 {module} 失败:\n{result.stderr[-2000:]}")
+
+    entries = []
+    total_us = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        cumulative_us, name = int(cumulative_us), name.strip()
+        entries.append((cumulative_us, name))
+        if name == module:
+            total_us = cumulative_us
+
+    loaded_heavy = json.loads(result.stdout.strip().splitlines()[-1])
+    return total_us / 1000, sorted(entries, reverse=True), loaded_heavy
+
+
+def check_manifest() -> bool:
+    """
+    连续两次在全新解释器中解析配置的嵌入模型，第二次应直接命中模型清单
+
+    Returns:
+        是否通过检查（本地没有模型时视为跳过）
+    """
+    probe = (
+        "import json; from config import Config; from model_resolver import ModelResolver; "
+        "r = ModelResolver(Config.MODEL_CACHE_DIR, offline=True); "
+        "path = r.resolve_local(Config.EMBEDDING_MODEL_NAME); "
+        "print(json.dumps({'path': path, 'timings': r.timings}))"
+    )
+    runs = []
+    for _ in range(2):
+        result = subprocess.run([sys.executable, "-c", probe], cwd=SRC_DIR, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"模型解析失败:\n{result.stderr[-2000:]}")
+        runs.append(json.loads(result.stdout.strip().splitlines()[-1]))
+
+    first, second = runs
+    if not first["path"]:
+        print("\n📁 模型清单: 本地未找到配置的嵌入模型，跳过检查")
+        return True
+    manifest_hit = second["timings"][0]["found"] and len(second["timings"]) == 1
+    print(f"\n📁 模型清单: 第二次启动{'直接从清单' if manifest_hit else '未从清单'}解析到 {second['path']} "
+          f"({sum(t['ms'] for t in second['timings']):.1f}ms)")
+    same_path = os.path.abspath(os.path.join(SRC_DIR, first["path"])) == second["path"]
+    if not manifest_hit or not same_path:
+        print("   ❌ 第二次启动未直接使用清单中的模型路径")
+        return False
+    print("   ✅ 清单命中")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="冷启动导入耗时基准测试")
+    parser.add_argument("--modules", nargs="+", default=["rag_system", "utils", "config"])
+    parser.add_argument("--repeat", type=int, default=5, help="每个模块的测量次数（取中位数）")
+    parser.add_argument("--top", type=int, default=10, help="显示最耗时的依赖数量")
+    parser.add_argument("--max-ms", type=float, default=None, help="回归阈值（毫秒）")
+    parser.add_argument("--check-manifest", action="store_true", help="检查第二次启动是否直接命中模型清单")
+    args = parser.parse_args()
+
+    failed = False
+    for module in args.modules:
+        timings = []
+        for _ in range(args.repeat):
+            total_ms, entries, loaded_heavy = measure_import(module)
+            timings.append(total_ms)
+
+        median_ms = statistics.median(timings)
+        print(f"\n📦 {module}: 中位数 {median_ms:.1f}ms (最小 {min(timings):.1f}ms, 最大 {max(timings):.1f}ms)")
+        print(f"   最耗时的导入 (累计):")
+        for cumulative_us, name in entries[:args.top]:
+            print(f"   {cumulative_us / 1000:>9.1f}ms  {name}")
+
+        if loaded_heavy:
+            print(f"   ❌ 导入时加载了重量级依赖: {', '.join(loaded_heavy)}")
+            failed = True
+        else:
+            print(f"   ✅ 未加载重量级依赖")
+
+        if args.max_ms is not None and median_ms > args.max_ms:
+            print(f"   ❌ 超过回归阈值 {args.max_ms:.0f}ms")
+            failed = True
+
+    if args.check_manifest and not check_manifest():
+        failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+端到端基准测试套件
+覆盖索引与查询全流程，结果输出为JSON，并可与基线对比标记性能回退
+
+测试项:
+  - chunking:  两部小说的分块吞吐（MB/s、文本块/s）
+  - embedding: 嵌入吞吐（文本块/s）
+  - indexing:  _index_chunks 耗时与峰值RSS（独立子进程）
+  - search:    不同 top_k 下的检索延迟分位数
+  - query:     完整 query() 延迟（LLM桩客户端）
+
+用法:
+    python benchmark_suite.py --output bench_results.json
+    python benchmark_suite.py --output bench_results.json --compare bench_baseline.json --threshold 0.15
+    python benchmark_suite.py --only chunking search
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import resource
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+sys.path.append('./src')
+
+import numpy as np
+
+DATA_FILES = ["./data/xi_you_ji.txt", "./data/san_guo_yan_yi.txt"]
+QUESTIONS = [
+    "悟空的兵器是什么？",
+    "悟空的师傅是谁？",
+    "诸葛亮是如何借东风的？",
+    "刘备三顾茅庐请的是谁？",
+    "关羽过五关斩六将",
+    "赤壁之战谁放的火？",
+]
+STAGES = ["chunking", "embedding", "indexing", "search", "query"]
+
+
+def metric(value, unit, better):
+    """单个指标：better 为 "lower" 或 "higher"，用于回退判断"""
+    return {'value': float(value), 'unit': unit, 'better': better}
+
+
+def percentiles(samples_ms, prefix, metrics):
+    for q in (50, 95, 99):
+        metrics[f"{prefix}.p{q}_ms"] = metric(np.percentile(samples_ms, q), "ms", "lower")
+
+
+def create_system(persist_dir, stub_llm_delay=None):
+    from config import Config
+    from rag_system import RAGSystem
+
+    config = Config()
+    config.CHROMA_PERSIST_DIR = persist_dir
+    config.ENABLE_DEDUP = False
+    config.QUERY_CACHE_SIZE = 0  # 问题重复出现，开启结果缓存时测到的只是缓存命中
+    rag_system = RAGSystem(config)
+    if not rag_system.initialize(warmup=False):
+        raise RuntimeError("RAG系统初始化失败")
+    if stub_llm_delay is not None:
+        from llm_stub import StubOpenAIClient
+        rag_system.openai_client = StubOpenAIClient(delay=stub_llm_delay)
+    return rag_system
+
+
+def load_all_chunks(config):
+    from utils import build_novel_chunks
+
+    chunks, metadatas, ids = [], [], []
+    for data_file in DATA_FILES:
+        result = build_novel_chunks(data_file, 1000, config.MAX_CHUNK_SIZE, config.CHUNK_OVERLAP)
+        chunks.extend(result['chunks'])
+        metadatas.extend(result['metadatas'])
+        ids.extend(result['ids'])
+    return chunks, metadatas, ids
+
+
+# ----------------------------------------------------------------------
+# 各测试项
+# ----------------------------------------------------------------------
+def bench_chunking(args, metrics):
+    from config import Config
+    from utils import build_novel_chunks
+
+    for data_file in DATA_FILES:
+        name = os.path.splitext(os.path.basename(data_file))[0]
+        size_mb = os.path.getsize(data_file) / 1024 / 1024
+        timings, chunk_count = [], 0
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            result = build_novel_chunks(data_file, 1000, Config.MAX_CHUNK_SIZE, Config.CHUNK_OVERLAP)
+            timings.append(time.perf_counter() - start)
+            chunk_count = len(result['chunks'])
+        best = min(timings)
+        metrics[f"chunking.{name}.seconds"] = metric(best, "s", "lower")
+        metrics[f"chunking.{name}.mb_per_s"] = metric(size_mb / best, "MB/s", "higher")
+        metrics[f"chunking.{name}.chunks_per_s"] = metric(chunk_count / best, "chunks/s", "higher")
+
+
+def bench_embedding(args, metrics, rag_system):
+    chunks, _, _ = load_all_chunks(rag_system.config)
+    sample = chunks[:args.embedding_sample]
+    rag_system.embedding_model.encode(sample[:8])  # 预热
+    start = time.perf_counter()
+    rag_system._encode_chunks(sample)
+    elapsed = time.perf_counter() - start
+    metrics["embedding.chunks_per_s"] = metric(len(sample) / elapsed, "chunks/s", "higher")
+
+
+def _index_in_subprocess(persist_dir):
+    """子进程：索引两部小说，返回耗时和峰值RSS"""
+    import logging
+    logging.disable(logging.INFO)
+
+    rag_system = create_system(persist_dir)
+    chunks, metadatas, ids = load_all_chunks(rag_system.config)
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    if not rag_system._index_chunks(chunks, metadatas, ids):
+        raise RuntimeError("索引失败")
+    elapsed = time.perf_counter() - start
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        'chunks': len(chunks),
+        'seconds': elapsed,
+        'peak_rss_mb': peak_rss / 1024,
+        'rss_growth_mb': (peak_rss - rss_before) / 1024
+    }
+
+
+def bench_indexing(args, metrics, persist_dir):
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        result = executor.submit(_index_in_subprocess, persist_dir).result()
+    metrics["indexing.seconds"] = metric(result['seconds'], "s", "lower")
+    metrics["indexing.chunks_per_s"] = metric(result['chunks'] / result['seconds'], "chunks/s", "higher")
+    metrics["indexing.peak_rss_mb"] = metric(result['peak_rss_mb'], "MB", "lower")
+    metrics["indexing.rss_growth_mb"] = metric(result['rss_growth_mb'], "MB", "lower")
+
+
+def bench_search(args, metrics, rag_system):
+    rag_system.search(QUESTIONS[0], 1)  # 预热
+    for top_k in args.top_k:
+        samples = []
+        for i in range(args.search_iterations):
+            start = time.perf_counter()
+            rag_system.search(QUESTIONS[i % len(QUESTIONS)], top_k)
+            samples.append((time.perf_counter() - start) * 1000)
+        percentiles(samples, f"search.top{top_k}", metrics)
+
+
+def bench_query(args, metrics, rag_system):
+    samples = []
+    for i in range(args.query_iterations):
+        result = rag_system.query(QUESTIONS[i % len(QUESTIONS)], top_k=5)
+        samples.append(result['total_time'] * 1000)
+    percentiles(samples, "query", metrics)
+
+
+# ----------------------------------------------------------------------
+# 对比
+# ----------------------------------------------------------------------
+def compare(results, baseline, threshold):
+    """返回回退的指标列表"""
+    regressions = []
+    print(f"\n{'指标':<36} {'基线':>12} {'当前':>12} {'变化':>8}")
+    print("-" * 72)
+    for name, current in sorted(results['metrics'].items()):
+        base = baseline.get('metrics', {}).get(name)
+        if not base or not base['value']:
+            continue
+        change = (current['value'] - base['value']) / base['value']
+        worse = change > threshold if current['better'] == "lower" else change < -threshold
+        flag = " ❌" if worse else ""
+        print(f"{name:<36} {base['value']:>12.3f} {current['value']:>12.3f} {change:>+7.1%}{flag}")
+        if worse:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RAG系统端到端基准测试套件")
+    parser.add_argument("--output", default="bench_results.json", help="结果JSON文件")
+    parser.add_argument("--compare", default=None, help="基线JSON文件，提供时对比并标记回退")
+    parser.add_argument("--threshold", type=float, default=0.10, help="回退阈值（相对变化）")
+    parser.add_argument("--only", nargs="+", choices=STAGES, default=STAGES, help="只运行指定测试项")
+    parser.add_argument("--repeat", type=int, default=3, help="分块测试重复次数")
+    parser.add_argument("--embedding-sample", type=int, default=256, help="嵌入吞吐测试的文本块数")
+    parser.add_argument("--top-k", type=int, nargs="+", default=[1, 5, 10, 20])
+    parser.add_argument("--search-iterations", type=int, default=100)
+    parser.add_argument("--query-iterations", type=int, default=30)
+    parser.add_argument("--stub-llm-delay", type=float, default=0.0, help="LLM桩客户端延迟（秒）")
+    args = parser.parse_args()
+
+    import logging
+    logging.disable(logging.INFO)
+
+    metrics = {}
+    persist_dir = tempfile.mkdtemp(prefix="rag_bench_suite_")
+    try:
+        if "chunking" in args.only:
+            print("📝 分块吞吐...")
+            bench_chunking(args, metrics)
+
+        if "indexing" in args.only:
+            print("💾 索引耗时与峰值内存（子进程）...")
+            bench_indexing(args, metrics, persist_dir)
+
+        if {"embedding", "search", "query"} & set(args.only):
+            rag_system = create_system(persist_dir, stub_llm_delay=args.stub_llm_delay)
+            if rag_system.collection.count() == 0 and {"search", "query"} & set(args.only):
+                chunks, metadatas, ids = load_all_chunks(rag_system.config)
+                rag_system._index_chunks(chunks, metadatas, ids)
+            if "embedding" in args.only:
+                print("🧮 嵌入吞吐...")
+                bench_embedding(args, metrics, rag_system)
+            if "search" in args.only:
+                print("🔍 检索延迟...")
+                bench_search(args, metrics, rag_system)
+            if "query" in args.only:
+                print("🤖 问答延迟（LLM桩客户端）...")
+                bench_query(args, metrics, rag_system)
+    finally:
+        shutil.rmtree(persist_dir, ignore_errors=True)
+
+    results = {
+        'meta': {
+            'timestamp': time.strftime("%Y-%m-%d %H:%M:%S"),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'stages': args.only,
+        },
+        'metrics': metrics
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"\n✅ 结果已写入 {args.output} ({len(metrics)} 项指标)")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} 项指标回退超过 {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+        print(f"\n✅ 无超过 {args.threshold:.0%} 的回退")
+
+
+if __name__ == "__main__":
+    main()
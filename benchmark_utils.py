@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+utils 文本处理流程微基准测试
+在真实小说和按倍数平铺放大的合成语料（默认 1×/10×/100×）上分别运行
+split_novel_by_chapters、extract_chapter_info、extract_keywords、clean_text、split_text_by_sentences，
+报告每个函数的调用次数/秒、MB/秒，以及 tracemalloc 统计的内存分配（结果保留的分配块数与遍历期间峰值）
+
+与入库流程一致：split_novel_by_chapters 处理全文，其余函数逐章节调用；
+一次"遍历"即把整份语料处理一遍，MB/秒按语料UTF-8字节数计算。
+
+用法:
+    python benchmark_utils.py
+    python benchmark_utils.py --scales 1 10 --functions clean_text extract_keywords
+    python benchmark_utils.py --output utils_bench.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+sys.path.append('./src')
+
+from config import Config
+from utils import (split_novel_by_chapters, extract_chapter_info, extract_keywords,
+                   clean_text, split_text_by_sentences)
+
+DATA_FILES = ["./data/xi_you_ji.txt", "./data/san_guo_yan_yi.txt"]
+
+
+def make_workloads(content):
+    """返回 {函数名: 调用列表}，每个调用是一个无参函数，整个列表即一次遍历"""
+    chapters = split_novel_by_chapters(content)
+    contents = [extract_chapter_info(chapter)[1] for chapter in chapters]
+    return {
+        'split_novel_by_chapters': [lambda: split_novel_by_chapters(content)],
+        'extract_chapter_info': [lambda c=chapter: extract_chapter_info(c) for chapter in chapters],
+        'extract_keywords': [lambda c=text: extract_keywords(c) for text in contents],
+        'clean_text': [lambda c=text: clean_text(c) for text in contents],
+        'split_text_by_sentences': [
+            lambda c=text: split_text_by_sentences(c, Config.MAX_CHUNK_SIZE, Config.CHUNK_OVERLAP)
+            for text in contents
+        ],
+    }
+
+
+def run_pass(calls):
+    return [call() for call in calls]
+
+
+def time_function(calls, min_time):
+    """重复遍历直到累计时间不少于 min_time，返回 (遍历次数, 总耗时)"""
+    passes, elapsed = 0, 0.0
+    while passes == 0 or elapsed < min_time:
+        start = time.perf_counter()
+        run_pass(calls)
+        elapsed += time.perf_counter() - start
+        passes += 1
+    return passes, elapsed
+
+
+def measure_allocations(calls):
+    """单次遍历后结果仍持有的新分配块数，以及遍历期间的峰值内存"""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    results = run_pass(calls)
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    stats = after.compare_to(before, "filename")
+    blocks = sum(stat.count_diff for stat in stats if stat.count_diff > 0)
+    del results
+    return blocks, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="utils 文本处理流程微基准测试")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100], help="合成语料放大倍数")
+    parser.add_argument("--functions", nargs="+", default=None, help="只测试指定函数")
+    parser.add_argument("--min-time", type=float, default=1.0, help="每项测试的最短计时（秒）")
+    parser.add_argument("--no-alloc", action="store_true", help="跳过 tracemalloc 分配统计")
+    parser.add_argument("--output", default=None, help="结果JSON文件")
+    args = parser.parse_args()
+
+    rows = []
+    print(f"{'语料':<22} {'函数':<26} {'调用/秒':>12} {'MB/秒':>9} {'保留块数':>10} {'峰值(MB)':>9}")
+    print("-" * 94)
+    for data_file in DATA_FILES:
+        with open(data_file, "r", encoding="utf-8") as f:
+            base_content = f.read()
+        name = os.path.splitext(os.path.basename(data_file))[0]
+
+        for scale in args.scales:
+            content = "\n".join([base_content] * scale)
+            size_mb = len(content.encode("utf-8")) / 1024 / 1024
+            corpus = f"{name}×{scale}"
+            workloads = make_workloads(content)
+
+            for func_name, calls in workloads.items():
+                if args.functions and func_name not in args.functions:
+                    continue
+                passes, elapsed = time_function(calls, args.min_time)
+                blocks, peak = (None, None) if args.no_alloc else measure_allocations(calls)
+                row = {
+                    'corpus': corpus,
+                    'function': func_name,
+                    'size_mb': size_mb,
+                    'calls_per_pass': len(calls),
+                    'ops_per_sec': passes * len(calls) / elapsed,
+                    'mb_per_sec': passes * size_mb / elapsed,
+                    'alloc_blocks': blocks,
+                    'peak_mb': peak / 1024 / 1024 if peak is not None else None
+                }
+                rows.append(row)
+                alloc = f"{blocks:>10} {row['peak_mb']:>9.1f}" if blocks is not None else f"{'-':>10} {'-':>9}"
+                print(f"{corpus:<22} {func_name:<26} {row['ops_per_sec']:>12.1f} {row['mb_per_sec']:>9.2f} {alloc}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(rows, f, ensure_ascii=False, indent=2)
+        print(f"\n✅ 结果已写入 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,8 +4,16 @@
 """
 import sys
 import os
+import re
+import time
+import pstats
+import cProfile
+import tracemalloc
 sys.path.append('./src')
 
+# profile / memprofile 输出目录
+PROFILE_DIR = "./profiles"
+
 def setup_debug_environment():
     """设置调试环境"""
     print("🔧 设置调试环境...")
@@ -49,7 +57,6 @@ def create_debug_session():
             
             # 显示系统状态
             print(f"   - 使用ModelScope: {rag_system.using_modelscope}")
-            print(f"   - 使用TF-IDF: {rag_system.using_tfidf}")
             print(f"   - 嵌入模型: {getattr(rag_system.embedding_model, '__class__.__name__', 'None')}")
             
             return rag_system
@@ -63,16 +70,147 @@ def create_debug_session():
         traceback.print_exc()
         return None
 
+def print_help():
+    """显示帮助"""
+    print("可用命令:")
+    print("  search <query> - 搜索文档")
+    print("  query <question> - 完整问答")
+    print("  load <file> [max_docs] - 加载数据")
+    print("  stats - 显示统计信息")
+    print("  profile <command> - 用cProfile运行命令，显示最耗时的函数并保存 .prof 文件（不使用结果缓存）")
+    print("  memprofile <command> - 用tracemalloc运行命令，显示主要内存分配位置并保存快照（不使用结果缓存）")
+    print("  bench search <query> <N> - 重复搜索N次，显示延迟分位数")
+    print("  help - 显示帮助")
+    print("  quit - 退出")
+
+def run_command(rag_system, parts, use_cache=True):
+    """
+    执行 search / query / load / stats 命令
+    
+    Args:
+        use_cache: query 是否使用结果缓存（profile / memprofile 时关闭，分析完整的问答流程）
+    
+    Returns:
+        bool: 是否识别了该命令
+    """
+    cmd = parts[0].lower()
+    
+    if cmd == 'search' and len(parts) > 1:
+        query = ' '.join(parts[1:])
+        print(f"🔍 搜索: {query}")
+        
+        results = rag_system.search(query, top_k=3)
+        print(f"找到 {len(results)} 个结果:")
+        for i, result in enumerate(results, 1):
+            print(f"  {i}. 相似度: {result['score']:.3f}")
+            print(f"     内容: {result['content'][:100]}...")
+            
+    elif cmd == 'query' and len(parts) > 1:
+        question = ' '.join(parts[1:])
+        print(f"🤖 问题: {question}")
+        
+        result = rag_system.query(question, top_k=3, use_cache=use_cache)
+        print(f"⏱️  响应时间: {result['total_time']:.2f}s")
+        print(f"📝 回答: {result['answer']}")
+        
+    elif cmd == 'load' and len(parts) > 1:
+        file_path = parts[1]
+        max_docs = int(parts[2]) if len(parts) > 2 else 100
+        
+        print(f"📚 加载数据: {file_path} (最多{max_docs}条)")
+        success = rag_system.load_and_index_data(file_path, max_docs, force_reload=True)
+        
+        if success:
+            print("✅ 数据加载成功")
+            stats = rag_system.get_collection_stats()
+            print(f"📊 统计信息: {stats}")
+        else:
+            print("❌ 数据加载失败")
+            
+    elif cmd == 'stats':
+        stats = rag_system.get_collection_stats()
+        print("📊 系统统计信息:")
+        for key, value in stats.items():
+            print(f"  {key}: {value}")
+            
+    else:
+        return False
+    
+    return True
+
+def _profile_path(parts, suffix):
+    """按时间和命令生成输出文件路径，如 profiles/20250620_153000_search.prof"""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    name = re.sub(r'\W+', '_', parts[0].lower())
+    return os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%d_%H%M%S')}_{name}{suffix}")
+
+def profile_command(rag_system, parts, top_n=20):
+    """用cProfile运行命令，按累计耗时显示前 top_n 个函数，保存为pstats格式"""
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        handled = run_command(rag_system, parts, use_cache=False)
+    finally:
+        profiler.disable()
+    if not handled:
+        print("❌ 未知命令，profile 支持 search / query / load / stats")
+        return
+    
+    path = _profile_path(parts, ".prof")
+    profiler.dump_stats(path)
+    print(f"\n🔥 最耗时的 {top_n} 个函数（按累计时间）:")
+    pstats.Stats(profiler).strip_dirs().sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top_n)
+    print(f"💾 已保存: {path}（可用 python -m pstats 或 snakeviz 查看）")
+
+def memprofile_command(rag_system, parts, top_n=15):
+    """用tracemalloc运行命令，显示新增内存最多的分配位置，保存快照"""
+    tracemalloc.start(25)
+    before = tracemalloc.take_snapshot()
+    try:
+        handled = run_command(rag_system, parts, use_cache=False)
+        after = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    if not handled:
+        print("❌ 未知命令，memprofile 支持 search / query / load / stats")
+        return
+    
+    path = _profile_path(parts, ".tracemalloc")
+    after.dump(path)
+    stats = after.compare_to(before, 'lineno')
+    print(f"\n🧠 峰值内存: {peak / 1024 / 1024:.1f}MB，新增内存最多的 {top_n} 个分配位置:")
+    for stat in stats[:top_n]:
+        frame = stat.traceback[0]
+        print(f"  {stat.size_diff / 1024:>10.1f}KB {stat.count_diff:>+8} 块  {frame.filename}:{frame.lineno}")
+    print(f"💾 已保存: {path}（可用 tracemalloc.Snapshot.load 加载）")
+
+def bench_search(rag_system, parts):
+    """bench search <query> <N>：重复搜索N次，显示延迟分位数"""
+    if len(parts) < 3 or parts[0].lower() != 'search' or not parts[-1].isdigit():
+        print("❌ 用法: bench search <query> <N>")
+        return
+    
+    import numpy as np
+    
+    query = ' '.join(parts[1:-1])
+    repeat = int(parts[-1])
+    rag_system.search(query, top_k=3)  # 预热
+    
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rag_system.search(query, top_k=3)
+        latencies.append((time.perf_counter() - start) * 1000)
+    
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    print(f"⏱️  搜索 {repeat} 次: 平均 {np.mean(latencies):.2f}ms, p50 {p50:.2f}ms, p95 {p95:.2f}ms, "
+          f"p99 {p99:.2f}ms, 最大 {max(latencies):.2f}ms")
+
 def interactive_debug(rag_system):
     """交互式调试"""
     print("\n🎯 进入交互式调试模式")
-    print("可用命令:")
-    print("  - search <query>: 搜索文档")
-    print("  - query <question>: 完整问答")
-    print("  - load <file> [max_docs]: 加载数据")
-    print("  - stats: 显示统计信息")
-    print("  - help: 显示帮助")
-    print("  - quit: 退出")
+    print_help()
     
     while True:
         try:
@@ -89,53 +227,18 @@ def interactive_debug(rag_system):
                 break
                 
             elif cmd == 'help':
-                print("可用命令:")
-                print("  search <query> - 搜索文档")
-                print("  query <question> - 完整问答")
-                print("  load <file> [max_docs] - 加载数据")
-                print("  stats - 显示统计信息")
-                print("  help - 显示帮助")
-                print("  quit - 退出")
-                
-            elif cmd == 'search' and len(parts) > 1:
-                query = ' '.join(parts[1:])
-                print(f"🔍 搜索: {query}")
-                
-                results = rag_system.search(query, top_k=3)
-                print(f"找到 {len(results)} 个结果:")
-                for i, result in enumerate(results, 1):
-                    print(f"  {i}. 相似度: {result['score']:.3f}")
-                    print(f"     内容: {result['content'][:100]}...")
-                    
-            elif cmd == 'query' and len(parts) > 1:
-                question = ' '.join(parts[1:])
-                print(f"🤖 问题: {question}")
+                print_help()
                 
-                result = rag_system.query(question, top_k=3)
-                print(f"⏱️  响应时间: {result['total_time']:.2f}s")
-                print(f"📝 回答: {result['answer']}")
+            elif cmd == 'profile' and len(parts) > 1:
+                profile_command(rag_system, parts[1:])
                 
-            elif cmd == 'load' and len(parts) > 1:
-                file_path = parts[1]
-                max_docs = int(parts[2]) if len(parts) > 2 else 100
+            elif cmd == 'memprofile' and len(parts) > 1:
+                memprofile_command(rag_system, parts[1:])
                 
-                print(f"📚 加载数据: {file_path} (最多{max_docs}条)")
-                success = rag_system.load_and_index_data(file_path, max_docs, force_reload=True)
+            elif cmd == 'bench' and len(parts) > 1:
+                bench_search(rag_system, parts[1:])
                 
-                if success:
-                    print("✅ 数据加载成功")
-                    stats = rag_system.get_collection_stats()
-                    print(f"📊 统计信息: {stats}")
-                else:
-                    print("❌ 数据加载失败")
-                    
-            elif cmd == 'stats':
-                stats = rag_system.get_collection_stats()
-                print("📊 系统统计信息:")
-                for key, value in stats.items():
-                    print(f"  {key}: {value}")
-                    
-            else:
+            elif not run_command(rag_system, parts):
                 print("❌ 未知命令，输入 'help' 查看可用命令")
                 
         except KeyboardInterrupt:
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+HNSW参数扫描工具
+在内置语料上按参数网格构建索引，测量 recall@k（以精确检索为基准）和查询延迟，
+并输出帕累托前沿，用于选择 Config.HNSW_M / HNSW_CONSTRUCTION_EF / HNSW_SEARCH_EF
+
+用法:
+    python hnsw_sweep.py [--m 8 16 32] [--construction-ef 64 100 200] [--search-ef 16 32 64 128]
+                         [--top-k 5] [--queries 100]
+"""
+import sys
+import time
+import argparse
+import itertools
+sys.path.append('./src')
+
+import numpy as np
+import chromadb
+from chromadb.config import Settings
+
+from config import Config
+from rag_system import RAGSystem
+from utils import build_novel_chunks
+
+
+def load_embeddings(rag_system, config):
+    """加载两部小说的全部文本块并编码"""
+    chunks = []
+    for data_file in ["./data/xi_you_ji.txt", "./data/san_guo_yan_yi.txt"]:
+        result = build_novel_chunks(data_file, 1000, config.MAX_CHUNK_SIZE, config.CHUNK_OVERLAP)
+        chunks.extend(result['chunks'])
+    embeddings = rag_system.embedding_model.encode(
+        chunks, batch_size=32, normalize_embeddings=True, show_progress_bar=True
+    )
+    return np.asarray(embeddings, dtype=np.float32)
+
+
+def evaluate(client, embeddings, queries, ground_truth, m, construction_ef, search_ef, top_k):
+    """构建一组参数的索引并测量召回率和延迟"""
+    name = f"sweep_m{m}_c{construction_ef}_s{search_ef}"
+    collection = client.create_collection(name=name, metadata={
+        "hnsw:space": "cosine",
+        "hnsw:M": m,
+        "hnsw:construction_ef": construction_ef,
+        "hnsw:search_ef": search_ef
+    })
+
+    build_start = time.perf_counter()
+    ids = [str(i) for i in range(len(embeddings))]
+    batch = 4000
+    for start in range(0, len(ids), batch):
+        collection.add(ids=ids[start:start + batch], embeddings=embeddings[start:start + batch].tolist())
+    build_time = time.perf_counter() - build_start
+
+    latencies, recalls = [], []
+    for query, exact in zip(queries, ground_truth):
+        start = time.perf_counter()
+        results = collection.query(query_embeddings=[query.tolist()], n_results=top_k, include=[])
+        latencies.append((time.perf_counter() - start) * 1000)
+        recalls.append(len(exact & {int(i) for i in results['ids'][0]}) / top_k)
+
+    client.delete_collection(name)
+    return {
+        'm': m,
+        'construction_ef': construction_ef,
+        'search_ef': search_ef,
+        'build_time': build_time,
+        'recall': float(np.mean(recalls)),
+        'p50': float(np.percentile(latencies, 50)),
+        'p95': float(np.percentile(latencies, 95))
+    }
+
+
+def pareto_frontier(rows):
+    """召回率越高、p95延迟越低越好；返回不被其他参数组合支配的结果"""
+    frontier = []
+    for row in rows:
+        dominated = any(
+            other['recall'] >= row['recall'] and other['p95'] <= row['p95']
+            and (other['recall'] > row['recall'] or other['p95'] < row['p95'])
+            for other in rows
+        )
+        if not dominated:
+            frontier.append(row)
+    return sorted(frontier, key=lambda r: r['p95'])
+
+
+def print_rows(rows):
+    print(f"{'M':>4} {'constr_ef':>10} {'search_ef':>10} | {'构建(s)':>8} {'recall':>7} {'p50(ms)':>8} {'p95(ms)':>8}")
+    print("-" * 66)
+    for row in rows:
+        print(f"{row['m']:>4} {row['construction_ef']:>10} {row['search_ef']:>10} | "
+              f"{row['build_time']:>8.2f} {row['recall']:>7.3f} {row['p50']:>8.2f} {row['p95']:>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HNSW参数 recall/延迟 扫描")
+    parser.add_argument("--m", type=int, nargs="+", default=[8, 16, 32])
+    parser.add_argument("--construction-ef", type=int, nargs="+", default=[64, 100, 200])
+    parser.add_argument("--search-ef", type=int, nargs="+", default=[16, 32, 64, 128])
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=100, help="从语料中抽样作为查询的文本块数")
+    args = parser.parse_args()
+
+    config = Config()
+    rag_system = RAGSystem(config)
+    if not rag_system._initialize_embedding_model():
+        print("❌ 嵌入模型初始化失败")
+        return
+
+    print("📚 加载并编码语料...")
+    embeddings = load_embeddings(rag_system, config)
+
+    # 抽样文本块向量并加入少量噪声作为查询，避免查询与索引向量完全重合
+    rng = np.random.RandomState(0)
+    queries = embeddings[rng.choice(len(embeddings), size=min(args.queries, len(embeddings)), replace=False)]
+    queries = queries + rng.normal(0, 0.02, queries.shape).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    ground_truth = [set(np.argsort(-embeddings @ q)[:args.top_k].tolist()) for q in queries]
+
+    client = chromadb.EphemeralClient(settings=Settings(anonymized_telemetry=False, allow_reset=True))
+
+    grid = list(itertools.product(args.m, args.construction_ef, args.search_ef))
+    print(f"\n🔍 扫描 {len(grid)} 组参数 ({len(embeddings)} 个向量, {len(queries)} 个查询, top_k={args.top_k})\n")
+    rows = [
+        evaluate(client, embeddings, queries, ground_truth, m, construction_ef, search_ef, args.top_k)
+        for m, construction_ef, search_ef in grid
+    ]
+
+    print_rows(rows)
+    print("\n🏆 帕累托前沿 (recall ↑, p95 ↓):\n")
+    print_rows(pareto_frontier(rows))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+RAG系统 HTTP API 服务
+无界面的 FastAPI 服务，提供 /search、/query、/query/stream、/stats 和 /metrics 接口
+
+启动:
+    cd src
+    python api_server.py --port 8000 --workers 4
+
+每个 uvicorn worker 进程持有一个共享的 RAGSystem 实例；
+进程内并发请求数由 Config.API_MAX_CONCURRENCY 限制，单个请求超时由 Config.API_REQUEST_TIMEOUT 控制。
+设置环境变量 RAG_STUB_LLM_DELAY=<秒> 时使用本地桩客户端代替DeepSeek（用于压测）。
+"""
+import os
+import sys
+import json
+import asyncio
+import logging
+import argparse
+import functools
+import contextvars
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, Any
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse, PlainTextResponse
+from pydantic import BaseModel, Field
+from starlette.concurrency import run_in_threadpool
+
+from config import Config
+from rag_system import RAGSystem
+
+logger = logging.getLogger(__name__)
+
+STUB_LLM_DELAY_ENV = "RAG_STUB_LLM_DELAY"
+
+
+class SearchRequest(BaseModel):
+    """检索请求"""
+    query: str = Field(..., min_length=1)
+    top_k: int = Field(Config.DEFAULT_TOP_K, ge=1, le=50)
+    source: Optional[str] = None
+    chapter_start: Optional[int] = None
+    chapter_end: Optional[int] = None
+
+    def where(self) -> Optional[Dict[str, Any]]:
+        return RAGSystem.build_where_filter(self.source, self.chapter_start, self.chapter_end)
+
+
+class QueryRequest(SearchRequest):
+    """问答请求"""
+
+
+class RAGService:
+    """包装共享的 RAGSystem，限制并发并为每个请求设置超时"""
+
+    def __init__(self, config: Config):
+        self.config = config
+        self.rag_system: Optional[RAGSystem] = None
+        self.ready = False
+        self._limiter: Optional[asyncio.Semaphore] = None
+
+    async def start(self):
+        self._limiter = asyncio.Semaphore(self.config.API_MAX_CONCURRENCY)
+        self.rag_system = RAGSystem(self.config)
+        # 初始化（加载模型等）在线程池中执行，不阻塞事件循环
+        self.ready = await run_in_threadpool(self.rag_system.initialize)
+        if not self.ready:
+            logger.error("❌ RAG系统初始化失败")
+            return
+
+        stub_delay = os.getenv(STUB_LLM_DELAY_ENV)
+        if stub_delay is not None:
+            from llm_stub import StubOpenAIClient
+            self.rag_system.openai_client = StubOpenAIClient(delay=float(stub_delay))
+            logger.info(f"🧪 使用LLM桩客户端 (延迟 {stub_delay}s)")
+
+    async def acquire(self):
+        """获取并发名额；排队超过 API_QUEUE_TIMEOUT 返回503"""
+        if not self.ready:
+            raise HTTPException(status_code=503, detail="RAG系统未就绪")
+        try:
+            await asyncio.wait_for(self._limiter.acquire(), timeout=self.config.API_QUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=503, detail="服务繁忙，请稍后重试")
+
+    def release(self):
+        self._limiter.release()
+
+    @staticmethod
+    def submit(func, *args) -> asyncio.Future:
+        """在线程池中执行阻塞调用（沿用当前上下文），返回 asyncio Future"""
+        loop = asyncio.get_running_loop()
+        return loop.run_in_executor(None, functools.partial(contextvars.copy_context().run, func, *args))
+
+    def release_when_done(self, future: asyncio.Future):
+        """线程中的调用真正结束时才释放名额：超时返回后调用仍在后台执行，继续占用名额"""
+        def done(f):
+            if not f.cancelled():
+                f.exception()  # 超时后无人等待结果，在此读取异常避免告警
+            self.release()
+        future.add_done_callback(done)
+
+    async def run(self, func, *args):
+        """在线程池中执行阻塞调用，受并发限制和请求超时约束"""
+        await self.acquire()
+        future = self.submit(func, *args)
+        self.release_when_done(future)
+        try:
+            # shield：超时只放弃等待，不把 future 标记为取消（否则会提前触发释放）
+            return await asyncio.wait_for(asyncio.shield(future), timeout=self.config.API_REQUEST_TIMEOUT)
+        except asyncio.TimeoutError:
+            # 线程中的调用无法强制中止，会在后台执行完毕
+            raise HTTPException(status_code=504, detail="请求超时")
+
+    def close_stream(self, events, pending: Optional[asyncio.Future]):
+        """
+        关闭流式问答生成器（结束上游LLM流）并释放名额
+
+        仍有 next() 在线程中执行时（超时或客户端断开），等其返回后再关闭，
+        生成器不能在执行中被关闭。
+        """
+        def close(_=None):
+            self.release_when_done(self.submit(events.close))
+
+        if pending is not None and not pending.done():
+            pending.add_done_callback(close)
+        else:
+            close()
+
+
+service = RAGService(Config())
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 每个 uvicorn worker 进程各自导入本模块，在此配置日志（main() 只在父进程执行）
+    logging.basicConfig(level=Config.LOG_LEVEL)
+    await service.start()
+    yield
+
+
+app = FastAPI(title="RAG智能问答API", lifespan=lifespan)
+
+
+@app.post("/search")
+async def search(request: SearchRequest):
+    results = await service.run(service.rag_system.search, request.query, request.top_k, request.where())
+    return {'results': results}
+
+
+@app.post("/query")
+async def query(request: QueryRequest):
+    return await service.run(service.rag_system.query, request.query, request.top_k, request.where())
+
+
+@app.post("/query/stream")
+async def query_stream(request: QueryRequest):
+    """流式问答，响应为 NDJSON：sources → token... → done"""
+    if not service.ready:
+        raise HTTPException(status_code=503, detail="RAG系统未就绪")
+
+    async def generate():
+        # 名额和上游生成器在开始输出时才获取/创建：响应未开始迭代就被丢弃时不会占用名额
+        try:
+            await service.acquire()
+        except HTTPException as e:
+            yield json.dumps({'type': 'error', 'detail': e.detail}, ensure_ascii=False) + "\n"
+            return
+        events = service.rag_system.query_stream(request.query, request.top_k, request.where())
+        pending = None
+        try:
+            while True:
+                pending = service.submit(next, events, None)
+                event = await asyncio.wait_for(asyncio.shield(pending), timeout=service.config.API_REQUEST_TIMEOUT)
+                pending = None
+                if event is None:
+                    break
+                yield json.dumps(event, ensure_ascii=False) + "\n"
+        except asyncio.TimeoutError:
+            yield json.dumps({'type': 'error', 'detail': '请求超时'}, ensure_ascii=False) + "\n"
+        finally:
+            # 正常结束、超时或客户端断开都会执行
+            service.close_stream(events, pending)
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
+@app.get("/stats")
+async def stats():
+    if not service.ready:
+        raise HTTPException(status_code=503, detail="RAG系统未就绪")
+    return await run_in_threadpool(service.rag_system.get_collection_stats)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus 文本格式的性能指标（每个worker进程独立统计）"""
+    if not service.ready:
+        raise HTTPException(status_code=503, detail="RAG系统未就绪")
+    return PlainTextResponse(
+        service.rag_system.metrics.to_prometheus(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RAG系统 HTTP API 服务")
+    parser.add_argument("--host", default=Config.API_HOST)
+    parser.add_argument("--port", type=int, default=Config.API_PORT)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker 进程数")
+    parser.add_argument("--stub-llm-delay", type=float, default=None, help="使用LLM桩客户端并设置其延迟（秒）")
+    args = parser.parse_args()
+
+    if args.stub_llm_delay is not None:
+        # 通过环境变量传递给各 worker 进程
+        os.environ[STUB_LLM_DELAY_ENV] = str(args.stub_llm_delay)
+
+    import uvicorn
+    uvicorn.run("api_server:app", host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,7 @@ import streamlit as st
 import os
 import sys
 import time
+import logging
 import traceback
 from pathlib import Path
 
@@ -29,6 +30,9 @@ except ImportError as e:
     st.error(f"❌ 导入模块失败: {e}")
     st.stop()
 
+# 配置日志（rag_system 导入时不配置根日志器，级别由 Config.LOG_LEVEL 决定）
+logging.basicConfig(level=Config.LOG_LEVEL)
+
 # 初始化session state
 if 'rag_system' not in st.session_state:
     st.session_state.rag_system = None
@@ -145,6 +149,12 @@ def display_system_info():
                         else:
                             st.metric("嵌入模型", "本地模型")
                     
+                    warmup_state = stats.get('warmup_status', {}).get('state')
+                    if warmup_state == 'running':
+                        st.markdown('<div class="status-box info-box">🔥 后台预热中...</div>', unsafe_allow_html=True)
+                    elif warmup_state == 'done':
+                        st.caption(f"🔥 预热完成 ({stats['warmup_status'].get('total_time', 0):.1f}s)")
+                    
                     if stats.get('using_modelscope', False):
                         st.markdown('<div class="status-box info-box">🚀 使用ModelScope镜像源</div>', unsafe_allow_html=True)
                     elif stats.get('using_tfidf', False):
@@ -208,26 +218,28 @@ def main():
             # 加载数据
             max_docs = st.slider("最大文档数量", 10, 1000, 100, 10)
             force_reload = st.checkbox("强制重新加载")
+            load_all_files = st.checkbox("加载数据目录下全部文本", help="并行分块 data/*.txt 并写入同一集合")
+            job = st.session_state.rag_system.index_job
             
-            if st.button("📚 加载数据到向量库"):
+            if st.button("📚 加载数据到向量库", disabled=bool(job and job.is_running())):
                 data_file = "../data/xi_you_ji.txt"
                 if not os.path.exists(data_file):
                     create_sample_data()
                 
-                with st.spinner("正在加载和索引数据..."):
-                    try:
-                        success = st.session_state.rag_system.load_and_index_data(
-                            data_file, 
-                            max_documents=max_docs,
-                            force_reload=force_reload
-                        )
-                        if success:
-                            st.success("✅ 数据加载成功！")
-                            st.rerun()
-                        else:
-                            st.error("❌ 数据加载失败")
-                    except Exception as e:
-                        st.error(f"❌ 加载数据异常: {e}")
+                # 后台索引，不阻塞页面；完成前查询继续使用现有集合
+                try:
+                    st.session_state.rag_system.start_index_job(
+                        data_file,
+                        max_documents=max_docs,
+                        force_reload=force_reload,
+                        directory=load_all_files
+                    )
+                except Exception as e:
+                    st.error(f"❌ 加载数据异常: {e}")
+            
+            # 任务运行时每秒刷新进度
+            job = st.session_state.rag_system.index_job
+            st.fragment(display_index_job, run_every=1 if job and job.is_running() else None)()
         
             # 模型选择器
             st.header("�� 模型选择")
@@ -254,6 +266,40 @@ def main():
         - 支持中文问答，效果更佳
         """)
 
+def display_index_job():
+    """后台索引任务的进度；任务状态保存在 RAG 系统中，页面重跑后仍可查看"""
+    job = st.session_state.rag_system.index_job
+    if job is None:
+        return
+    info = job.snapshot()
+    
+    if job.is_running():
+        if info['total']:
+            st.progress(min(info['done'] / info['total'], 1.0),
+                        text=f"{info['stage_label']}: {info['done']}/{info['total']}")
+        else:
+            st.progress(0.0, text=info['stage_label'] or "等待开始")
+        if info['stage'] == 'embedding' and info['rate'] > 0:
+            eta = f"，预计剩余 {info['eta']:.0f}s" if info['eta'] is not None else ""
+            st.caption(f"⚡ {info['rate']:.1f} 块/秒{eta}")
+        if info['cancel_requested']:
+            st.caption("🛑 正在取消...")
+        elif st.button("⏹️ 取消索引", key=f"cancel_{info['id']}"):
+            job.cancel()
+        return
+    
+    if info['state'] == 'done':
+        st.success(f"✅ 数据加载成功！({info['elapsed']:.1f}s)")
+    elif info['state'] == 'cancelled':
+        st.warning("🛑 索引任务已取消，现有数据未改变")
+    else:
+        st.error(f"❌ 数据加载失败: {info['error']}")
+    
+    # 任务结束后整页重跑一次，刷新文档数等统计
+    if st.session_state.get('index_job_reported') != info['id']:
+        st.session_state.index_job_reported = info['id']
+        st.rerun()
+
 def display_main_interface():
     """显示主界面"""
     # 创建标签页
@@ -279,6 +325,23 @@ def display_chat_interface():
     with col2:
         top_k = st.selectbox("检索结果数量", [3, 5, 8, 10], index=1)
     
+    # 检索范围（过滤条件由向量库执行）
+    with st.expander("🎯 检索范围", expanded=False):
+        data_dir = Path(st.session_state.config.DATA_DIR) if st.session_state.config else Path("../data")
+        source_options = ["全部"] + sorted(p.stem for p in data_dir.glob("*.txt"))
+        scope_col1, scope_col2, scope_col3 = st.columns(3)
+        with scope_col1:
+            source = st.selectbox("数据来源", source_options)
+        with scope_col2:
+            chapter_start = st.number_input("起始章节", min_value=0, value=0, help="0 表示不限制")
+        with scope_col3:
+            chapter_end = st.number_input("结束章节", min_value=0, value=0, help="0 表示不限制")
+    where = RAGSystem.build_where_filter(
+        source=None if source == "全部" else source,
+        chapter_start=chapter_start or None,
+        chapter_end=chapter_end or None
+    )
+    
     # 问题输入
     question = st.text_input(
         "请输入您的问题:",
@@ -288,14 +351,7 @@ def display_chat_interface():
     
     # 预设问题
     st.subheader("🔥 热门问题")
-    preset_questions = [
-        "悟空的兵器是什么？",
-        "悟空的师傅是谁？",
-        "悟能的兵器是什么？",
-        "悟净的兵器是什么？",
-        "悟能的师傅是谁？",
-        "悟净的师傅是谁？",
-    ]
+    preset_questions = Config.PRESET_QUESTIONS
     
     # 使用按钮组显示预设问题
     cols = st.columns(len(preset_questions))
@@ -314,7 +370,7 @@ def display_chat_interface():
     if question:
         try:
             with st.spinner("🔍 正在搜索相关信息..."):
-                result = st.session_state.rag_system.query(question, top_k=top_k)
+                result = st.session_state.rag_system.query(question, top_k=top_k, where=where)
                 
                 # 显示答案
                 st.subheader("🎯 智能回答")
@@ -333,6 +389,8 @@ def display_chat_interface():
                     st.metric("生成时间", f"{result['generate_time']:.2f}s")
                 with col_c:
                     st.metric("总时间", f"{result['total_time']:.2f}s")
+                if result.get('cached'):
+                    st.caption("⚡ 命中结果缓存（索引和模型未变化），未重新检索和生成，以上为首次计算的耗时")
                 
                 # 显示参考来源
                 if result.get('sources'):
@@ -348,6 +406,9 @@ def display_chat_interface():
                                     st.markdown(f"**标题:** {metadata['title']}")
                                 if metadata.get('category'):
                                     st.markdown(f"**类别:** {metadata['category']}")
+                                if metadata.get('source'):
+                                    chapter = f" 第{metadata['chapter']}回" if metadata.get('chapter') else ""
+                                    st.markdown(f"**出处:** {metadata['source']}{chapter}")
                                 if metadata.get('keywords'):
                                     st.markdown(f"**关键词:** {metadata['keywords']}")
                             with col2:
@@ -398,6 +459,31 @@ def display_monitoring_interface():
             for key, value in config_data.items():
                 st.text(f"{key}: {value}")
             
+            # 内存占用
+            memory = stats.get('memory', {})
+            if memory:
+                st.subheader("🧠 内存占用")
+                to_mb = lambda value: f"{value / 1024 / 1024:.0f}MB" if value else "N/A"
+                col1, col2, col3, col4 = st.columns(4)
+                with col1:
+                    st.metric("进程RSS", to_mb(memory.get('process_rss_bytes')))
+                with col2:
+                    st.metric("峰值RSS", to_mb(memory.get('peak_rss_bytes')))
+                with col3:
+                    st.metric("模型参数", to_mb(memory.get('model_parameter_bytes')),
+                              help=f"全部常驻模型: {to_mb(memory.get('resident_model_bytes'))}")
+                with col4:
+                    st.metric("向量索引", to_mb(memory.get('vector_index_bytes')))
+                last_index = stats.get('last_index_stats', {})
+                if last_index.get('peak_rss_bytes'):
+                    st.caption(f"上次入库峰值RSS: {to_mb(last_index['peak_rss_bytes'])}"
+                               f"{'（流式入库）' if last_index.get('streaming') else ''}")
+
+            # 性能指标（可实时刷新）
+            st.subheader("📊 性能指标")
+            live = st.toggle("实时刷新（每2秒）", value=False)
+            st.fragment(display_metrics_panel, run_every=2 if live else None)()
+            
             # 操作按钮
             st.subheader("🛠️ 系统操作")
             col1, col2 = st.columns(2)
@@ -417,6 +503,89 @@ def display_monitoring_interface():
     except Exception as e:
         st.error(f"❌ 获取系统信息失败: {e}")
 
+def _series_frame(metrics, name: str, column: str, scale: float = 1.0, **labels):
+    """把直方图窗口内的样本转成按时间索引的 DataFrame"""
+    import pandas as pd
+    samples = metrics.series(name, **labels)
+    if not samples:
+        return None
+    return pd.DataFrame(
+        {column: [value * scale for _, value in samples]},
+        index=pd.to_datetime([timestamp for timestamp, _ in samples], unit='s')
+    )
+
+def display_metrics_panel():
+    """延迟分位数、QPS、缓存命中率、嵌入批大小和索引吞吐"""
+    import pandas as pd
+    
+    if not st.session_state.rag_system:
+        return
+    metrics = st.session_state.rag_system.metrics
+    snapshot = metrics.snapshot()
+    histograms = snapshot['histograms']
+    
+    total = histograms.get('query_seconds[mode=sync]', {})
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("QPS", f"{snapshot['qps']:.2f}")
+    with col2:
+        st.metric("问答 p50", f"{total.get('p50', 0) * 1000:.0f}ms")
+    with col3:
+        st.metric("问答 p95", f"{total.get('p95', 0) * 1000:.0f}ms")
+    with col4:
+        st.metric("问答 p99", f"{total.get('p99', 0) * 1000:.0f}ms")
+    
+    if snapshot['cache_hit_rates']:
+        cols = st.columns(len(snapshot['cache_hit_rates']))
+        for col, (cache, rate) in zip(cols, snapshot['cache_hit_rates'].items()):
+            with col:
+                st.metric(f"缓存命中率 ({cache})", f"{rate:.1%}")
+    
+    # 延迟趋势
+    frames = [_series_frame(metrics, 'search_seconds', "检索(ms)", 1000)]
+    for mode in ("sync", "stream"):
+        frames.append(_series_frame(metrics, 'generate_seconds', f"生成-{mode}(ms)", 1000, mode=mode))
+        frames.append(_series_frame(metrics, 'query_seconds', f"总计-{mode}(ms)", 1000, mode=mode))
+    frames = [frame for frame in frames if frame is not None]
+    if frames:
+        st.markdown("**延迟趋势**")
+        st.line_chart(pd.concat(frames, axis=1).sort_index())
+    else:
+        st.info("暂无请求数据，提问后这里会显示延迟趋势")
+    
+    # 分位数汇总
+    if histograms:
+        rows = []
+        for name, h in sorted(histograms.items()):
+            scale = 1000 if name.startswith(('search_seconds', 'generate_seconds', 'query_seconds')) else 1
+            rows.append({
+                "指标": name + (" (ms)" if scale == 1000 else ""),
+                "样本数": h['count'],
+                "p50": round(h['p50'] * scale, 2),
+                "p95": round(h['p95'] * scale, 2),
+                "p99": round(h['p99'] * scale, 2),
+            })
+        st.dataframe(pd.DataFrame(rows), hide_index=True, use_container_width=True)
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        batch_frame = _series_frame(metrics, 'embedding_batch_size', "嵌入批大小")
+        if batch_frame is not None:
+            st.markdown("**嵌入批大小**")
+            st.bar_chart(batch_frame.reset_index(drop=True))
+    with col2:
+        throughput_frame = _series_frame(metrics, 'index_chunks_per_second', "文本块/秒")
+        if throughput_frame is not None:
+            st.markdown("**索引吞吐**")
+            st.bar_chart(throughput_frame.reset_index(drop=True))
+    
+    st.download_button(
+        "📥 导出 Prometheus 指标",
+        data=metrics.to_prometheus(),
+        file_name="rag_metrics.prom",
+        mime="text/plain"
+    )
+
 if __name__ == "__main__":
     try:
         main()
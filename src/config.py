@@ -5,10 +5,11 @@ import os
 
 # 环境变量名称
 DEEPSEEK_API_KEY_ENV = "DEEPSEEK_API_KEY"
+DEEPSEEK_BASE_URL_ENV = "DEEPSEEK_BASE_URL"
 
-# DeepSeek API配置 
-DEEPSEEK_API_KEY = ""  #
-DEEPSEEK_BASE_URL = "https://api.deepseek.com/v1"
+# DeepSeek API配置（可通过环境变量覆盖，如指向本地模拟服务 mock_llm_server.py）
+DEEPSEEK_API_KEY = os.getenv(DEEPSEEK_API_KEY_ENV, "")
+DEEPSEEK_BASE_URL = os.getenv(DEEPSEEK_BASE_URL_ENV, "https://api.deepseek.com/v1")
 
 class Config:
     """RAG系统配置类"""
@@ -16,10 +17,18 @@ class Config:
     # 数据路径
     DATA_DIR = "../data"
     TOUTIAO_DATA_FILE = os.path.join(DATA_DIR, "san_guo_yan_yi.txt")
+    DATA_FILE_PATTERN = "*.txt"  # 目录加载模式下匹配的文件
+    INGEST_MAX_WORKERS = None    # 并行分块进程数，None表示按文件数和CPU核数确定
     
     # 嵌入模型配置
     MODEL_CACHE_DIR = "../models"
     EMBEDDING_MODEL_NAME = "AI-ModelScope/m3e-base"  # 使用本地下载的模型路径
+    # 离线模式：只从本地加载模型，不访问网络（可用环境变量 RAG_OFFLINE=1 开启）
+    EMBEDDING_OFFLINE = os.getenv("RAG_OFFLINE", "0") == "1"
+    # 常驻嵌入模型：最多同时保留的模型数与参数总大小上限（MB，None 表示只按数量限制），
+    # 超出时按最近使用顺序淘汰；每个模型使用独立的集合，已常驻的模型可立即切换
+    MAX_RESIDENT_MODELS = 2
+    MAX_RESIDENT_MODEL_MB = None
     
     # 🎯 TF-IDF优先模式 - 设置为False以使用嵌入模型
     USE_TFIDF_ONLY = False
@@ -36,16 +45,96 @@ class Config:
     CHROMA_PERSIST_DIR = "../chroma_db"
     COLLECTION_NAME = "toutiao_news"
     
+    # HNSW索引参数（仅在创建集合时生效，修改后需强制重新加载数据）
+    HNSW_SPACE = "cosine"
+    HNSW_M = 16                   # 每个节点的最大邻居数
+    HNSW_CONSTRUCTION_EF = 100    # 建索引时的候选列表大小
+    HNSW_SEARCH_EF = 100          # 查询时的候选列表大小
+    
+    # 向量存储方式："chroma" 使用ChromaDB（float32 + HNSW）；
+    # "int8" / "binary" 使用量化编码生成候选，再用 float16 向量精确重排序
+    VECTOR_STORAGE = "chroma"
+    QUANTIZED_RESCORE_FACTOR = 4  # 重排序候选数 = top_k * 该系数
+    
     # 文本处理配置
     MAX_CHUNK_SIZE = 500
     CHUNK_OVERLAP = 50
     
+    # 近重复去重配置（MinHash/LSH，在生成嵌入向量前执行，只剔除同一章节内的重复文本块）
+    ENABLE_DEDUP = True
+    DEDUP_THRESHOLD = 0.8     # 估计Jaccard相似度阈值
+    DEDUP_NUM_PERM = 64       # MinHash签名长度
+    DEDUP_SHINGLE_SIZE = 5    # 字符shingle长度
+    
     # DeepSeek API配置
     DEEPSEEK_API_KEY = DEEPSEEK_API_KEY
     DEEPSEEK_BASE_URL = DEEPSEEK_BASE_URL
+    LLM_MODEL = "deepseek-chat"
+    
+    # DeepSeek 客户端：连接池（keep-alive 复用TLS连接）、单次请求超时（秒，流式时为相邻数据块的最长间隔）、
+    # 可重试错误（连接失败、超时、429、5xx）的重试次数与指数退避参数
+    LLM_POOL_CONNECTIONS = 20
+    LLM_POOL_KEEPALIVE = 10
+    LLM_KEEPALIVE_EXPIRY = 60.0
+    LLM_CONNECT_TIMEOUT = 5.0
+    LLM_READ_TIMEOUT = 30.0
+    LLM_MAX_RETRIES = 2
+    LLM_BACKOFF_BASE = 0.5
+    LLM_BACKOFF_MAX = 4.0
+    # 单次问答的总时间预算（秒，None 表示不限制）：用完时不再等待LLM，改为从检索结果中抽取回答
+    QUERY_LATENCY_BUDGET = 20.0
     
     # 搜索配置
     DEFAULT_TOP_K = 5
+    RETRIEVAL_MODE = "flat"          # "flat": 全量文本块检索；"hierarchical": 章节 → 文本块分层检索
+    HIERARCHICAL_TOP_CHAPTERS = 5    # 分层检索时粗排保留的章节数
+    
+    # 预热配置：初始化后在后台执行首次推理、索引载入和连接建立；
+    # 热门问题预计算会向DeepSeek发送 PRESET_QUESTIONS（每个进程/worker各一次，产生API费用），需显式开启，
+    # 且只在配置了生成客户端时执行
+    ENABLE_WARMUP = True
+    WARMUP_HOT_QUESTIONS = False
+    PRESET_QUESTIONS = [
+        "悟空的兵器是什么？",
+        "悟空的师傅是谁？",
+        "悟能的兵器是什么？",
+        "悟净的兵器是什么？",
+        "悟能的师傅是谁？",
+        "悟净的师傅是谁？",
+    ]
+    
+    # 链路追踪配置（OpenTelemetry）："" 关闭；"console" 输出到控制台；"file" 按行写入 TRACING_FILE
+    TRACING_EXPORTER = os.getenv("RAG_TRACING", "")
+    TRACING_FILE = "../traces.jsonl"
+    
+    # 日志配置：入口脚本（app.py / api_server.py）使用的日志级别（可用 RAG_LOG_LEVEL 覆盖），
+    # 批量处理时进度汇总的输出间隔（秒），以及DEBUG级别下文本块预览的抽样间隔
+    LOG_LEVEL = os.getenv("RAG_LOG_LEVEL", "INFO").upper()
+    LOG_PROGRESS_INTERVAL = 5.0
+    LOG_SAMPLE_EVERY = 1000
+    
+    # 内存预算（MB，None 表示不限制，可用 RAG_MEMORY_BUDGET_MB 设置）：
+    # 预计入库峰值超过 预算 * MEMORY_BUDGET_HEADROOM 时改为分段流式入库，RSS 接近预算时减小编码批大小
+    MEMORY_BUDGET_MB = float(os.getenv("RAG_MEMORY_BUDGET_MB")) if os.getenv("RAG_MEMORY_BUDGET_MB") else None
+    MEMORY_BUDGET_HEADROOM = 0.8
+    MEMORY_STREAM_BATCH = 256     # 流式入库时每段编码并写入的文本块数
+    MEMORY_MIN_EMBED_BATCH = 4    # 编码批大小下限
+    
+    # 问答结果缓存：进程内所有会话共享，键为 (问题, top_k, 过滤条件, 集合, 索引版本, 模型)；
+    # TTL 为 None 表示只在重新索引后失效；大小为 0 时关闭（可用 RAG_QUERY_CACHE_SIZE 设置，压测时关闭）
+    QUERY_CACHE_SIZE = int(os.getenv("RAG_QUERY_CACHE_SIZE", "512"))
+    QUERY_CACHE_TTL = None
+    
+    # 性能指标配置：每个延迟直方图保留的样本数，以及计算QPS的时间窗口（秒）
+    METRICS_WINDOW = 1000
+    METRICS_RATE_WINDOW = 60
+    
+    # HTTP API服务配置（api_server.py）
+    API_HOST = "0.0.0.0"
+    API_PORT = 8000
+    API_MAX_CONCURRENCY = 8       # 每个worker进程同时处理的请求数
+    API_QUEUE_TIMEOUT = 10        # 等待并发名额的最长时间（秒），超时返回503
+    API_REQUEST_TIMEOUT = 60      # 单个请求的最长处理时间（秒），超时返回504
     
     def __init__(self):
         """确保目录存在"""
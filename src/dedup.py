@@ -0,0 +1,159 @@
+"""
+文本块近重复检测
+基于字符shingle的MinHash签名 + LSH分桶，在生成嵌入向量前剔除近似重复的文本块
+"""
+from typing import List, Dict, Any, Hashable, Optional, Sequence, Tuple
+
+import mmh3
+import numpy as np
+
+# 小于2^32的最大素数，作为MinHash置换的模数
+_MERSENNE_PRIME = 4294967291
+_MAX_HASH = (1 << 32) - 1
+
+
+class MinHashDeduplicator:
+    """MinHash/LSH近重复文本块去重器"""
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 64,
+                 shingle_size: int = 5, bands: int = 16, seed: int = 1):
+        """
+        初始化去重器
+
+        Args:
+            threshold: Jaccard相似度阈值，超过该值视为近重复
+            num_perm: MinHash置换数量（签名长度）
+            shingle_size: 字符shingle长度
+            bands: LSH分带数量，num_perm必须能被其整除
+            seed: 随机种子，保证签名可复现
+        """
+        if num_perm % bands != 0:
+            raise ValueError(f"num_perm ({num_perm}) 必须能被 bands ({bands}) 整除")
+
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.bands = bands
+        self.rows = num_perm // bands
+
+        # a、b 小于2^31，保证 a * hash + b 不会溢出uint64
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, 1 << 31, size=num_perm).astype(np.uint64)
+        self._b = rng.randint(0, 1 << 31, size=num_perm).astype(np.uint64)
+
+    def _shingles(self, text: str) -> set:
+        """生成字符shingle集合"""
+        text = ''.join(text.split())
+        k = self.shingle_size
+        if len(text) <= k:
+            return {text}
+        return {text[i:i + k] for i in range(len(text) - k + 1)}
+
+    def signature(self, text: str) -> np.ndarray:
+        """
+        计算文本的MinHash签名
+
+        Args:
+            text: 输入文本
+
+        Returns:
+            长度为 num_perm 的uint64数组
+        """
+        hashes = np.fromiter(
+            (mmh3.hash(s, signed=False) for s in self._shingles(text)),
+            dtype=np.uint64
+        )
+        permuted = (hashes[:, None] * self._a + self._b) % _MERSENNE_PRIME
+        return (permuted & _MAX_HASH).min(axis=0)
+
+    def find_duplicates(self, chunks: List[str],
+                        groups: Optional[Sequence[Hashable]] = None) -> Tuple[List[int], Dict[int, int]]:
+        """
+        查找近重复文本块
+
+        按顺序处理，每个文本块与先前保留的文本块比较，
+        重复块映射到最早出现的代表块。
+
+        Args:
+            chunks: 文本块列表
+            groups: 每个文本块所属的分组，只在同组内查找重复；None 表示全部文本块为一组
+
+        Returns:
+            (保留的下标列表, {重复块下标: 代表块下标})
+        """
+        buckets: Dict[Tuple[Hashable, int, bytes], List[int]] = {}
+        signatures: Dict[int, np.ndarray] = {}
+        keep: List[int] = []
+        duplicate_of: Dict[int, int] = {}
+
+        for idx, chunk in enumerate(chunks):
+            sig = self.signature(chunk)
+            group = groups[idx] if groups is not None else None
+            band_keys = [
+                (group, band, sig[band * self.rows:(band + 1) * self.rows].tobytes())
+                for band in range(self.bands)
+            ]
+
+            # 收集候选并用签名估计的Jaccard相似度确认
+            candidates = set()
+            for key in band_keys:
+                candidates.update(buckets.get(key, ()))
+
+            match = None
+            for cand in sorted(candidates):
+                if np.mean(signatures[cand] == sig) >= self.threshold:
+                    match = cand
+                    break
+
+            if match is not None:
+                duplicate_of[idx] = match
+                continue
+
+            keep.append(idx)
+            signatures[idx] = sig
+            for key in band_keys:
+                buckets.setdefault(key, []).append(idx)
+
+        return keep, duplicate_of
+
+    def deduplicate(self, chunks: List[str], metadatas: List[Dict], ids: List[str],
+                    scope_keys: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """
+        剔除近重复文本块
+
+        被剔除的文本块不会生成嵌入向量；代表块的元数据记录
+        duplicate_count（被合并的重复块数量）和 duplicate_ids（以逗号分隔）。
+
+        Args:
+            chunks: 文本块列表
+            metadatas: 元数据列表
+            ids: 文档ID列表
+            scope_keys: 去重范围的元数据字段（如 ("source", "doc_id") 表示只在同一章节内去重），
+                None 表示在全部文本块中去重
+
+        Returns:
+            包含 chunks、metadatas、ids、removed 的字典
+        """
+        groups = None
+        if scope_keys:
+            groups = [tuple(metadata.get(key) for key in scope_keys) for metadata in metadatas]
+        keep, duplicate_of = self.find_duplicates(chunks, groups)
+
+        linked: Dict[int, List[str]] = {}
+        for dup_idx, rep_idx in duplicate_of.items():
+            linked.setdefault(rep_idx, []).append(ids[dup_idx])
+
+        kept_metadatas = []
+        for idx in keep:
+            metadata = dict(metadatas[idx])
+            if idx in linked:
+                metadata['duplicate_count'] = len(linked[idx])
+                metadata['duplicate_ids'] = ','.join(linked[idx])
+            kept_metadatas.append(metadata)
+
+        return {
+            'chunks': [chunks[i] for i in keep],
+            'metadatas': kept_metadatas,
+            'ids': [ids[i] for i in keep],
+            'removed': len(duplicate_of)
+        }
@@ -0,0 +1,192 @@
+"""
+磁盘占用统计服务
+在后台线程中用 os.scandir 统计目录大小，按目录缓存结果并以目录 mtime 判断是否失效，
+界面调用时立即返回上次扫描的结果及扫描时间，不阻塞页面
+
+目录的 mtime 只在其直接子项增删、重命名时变化：mtime 未变的目录复用缓存的文件列表和子目录列表，
+不再 scandir，只对缓存的文件逐个 stat 取当前大小——原地改写并增长的文件（如 ChromaDB 的
+sqlite / HNSW 段文件）不改变目录 mtime，大小仍须每次重新读取。
+"""
+import os
+import time
+import threading
+import logging
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _DirEntry:
+    """单个目录的缓存：直接包含的文件列表、文件大小之和与子目录列表"""
+    mtime_ns: int
+    files: List[str]
+    file_bytes: int
+    subdirs: List[str]
+
+
+@dataclass
+class UsageResult:
+    """一个根目录的统计结果"""
+    path: str
+    total_bytes: int = 0
+    children: Dict[str, int] = field(default_factory=dict)  # 直接子目录名 -> 字节数
+    scanned_at: Optional[float] = None                      # 扫描完成时间戳，None 表示尚未扫描
+    scan_seconds: float = 0.0
+    exists: bool = True
+
+
+class DiskUsageService:
+    """磁盘占用统计（线程安全，进程内共享一个实例即可）"""
+
+    def __init__(self, min_interval: float = 5.0):
+        """
+        Args:
+            min_interval: 两次后台扫描同一目录的最小间隔（秒）
+        """
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._dirs: Dict[str, _DirEntry] = {}
+        self._results: Dict[str, UsageResult] = {}
+        self._scanning: Dict[str, threading.Thread] = {}
+
+    # ------------------------------------------------------------------
+    # 对外接口
+    # ------------------------------------------------------------------
+    def get(self, path: str, refresh: bool = True) -> UsageResult:
+        """
+        立即返回缓存的统计结果；refresh 为 True 时在后台启动一次增量扫描
+
+        尚未扫描过的目录返回 scanned_at 为 None 的空结果。
+        """
+        path = os.path.abspath(path)
+        if refresh:
+            self.scan_async(path)
+        with self._lock:
+            return self._results.get(path) or UsageResult(path=path)
+
+    def scan_async(self, path: str) -> bool:
+        """在后台线程中扫描目录，已在扫描或距上次扫描不足 min_interval 时跳过"""
+        path = os.path.abspath(path)
+        with self._lock:
+            thread = self._scanning.get(path)
+            if thread and thread.is_alive():
+                return False
+            last = self._results.get(path)
+            if last and last.scanned_at and time.time() - last.scanned_at < self.min_interval:
+                return False
+            thread = threading.Thread(target=self.scan, args=(path,), name=f"disk-usage-{os.path.basename(path)}",
+                                      daemon=True)
+            self._scanning[path] = thread
+        thread.start()
+        return True
+
+    def is_scanning(self, path: str) -> bool:
+        with self._lock:
+            thread = self._scanning.get(os.path.abspath(path))
+            return bool(thread and thread.is_alive())
+
+    def wait(self, path: str, timeout: Optional[float] = None):
+        """等待后台扫描结束"""
+        with self._lock:
+            thread = self._scanning.get(os.path.abspath(path))
+        if thread:
+            thread.join(timeout)
+
+    def invalidate(self, path: str):
+        """删除目录下所有缓存（例如清理目录之后）"""
+        path = os.path.abspath(path)
+        prefix = path + os.sep
+        with self._lock:
+            for key in [k for k in self._dirs if k == path or k.startswith(prefix)]:
+                del self._dirs[key]
+            self._results.pop(path, None)
+
+    def scan(self, path: str) -> UsageResult:
+        """同步扫描（增量），更新并返回结果"""
+        path = os.path.abspath(path)
+        start = time.perf_counter()
+        if not os.path.isdir(path):
+            result = UsageResult(path=path, scanned_at=time.time(), exists=False)
+        else:
+            entry = self._scan_dir(path)
+            children = {}
+            for subdir in entry.subdirs if entry else []:
+                children[os.path.basename(subdir)] = self._tree_bytes(subdir)
+            total = (entry.file_bytes if entry else 0) + sum(children.values())
+            result = UsageResult(path=path, total_bytes=total, children=children, scanned_at=time.time(),
+                                 scan_seconds=time.perf_counter() - start)
+        with self._lock:
+            self._results[path] = result
+        logger.debug("磁盘统计 %s: %d 字节, %.3fs", path, result.total_bytes, result.scan_seconds)
+        return result
+
+    # ------------------------------------------------------------------
+    # 内部实现
+    # ------------------------------------------------------------------
+    def _tree_bytes(self, path: str) -> int:
+        """目录树总大小（迭代实现，避免深层目录递归）"""
+        total = 0
+        stack = [path]
+        while stack:
+            entry = self._scan_dir(stack.pop())
+            if entry is None:
+                continue
+            total += entry.file_bytes
+            stack.extend(entry.subdirs)
+        return total
+
+    def _scan_dir(self, path: str) -> Optional[_DirEntry]:
+        """返回单个目录的缓存项：mtime 变化时重新 scandir，否则沿用文件列表并重新读取文件大小"""
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            with self._lock:
+                self._dirs.pop(path, None)
+            return None
+
+        with self._lock:
+            cached = self._dirs.get(path)
+        if cached and cached.mtime_ns == mtime_ns:
+            file_bytes = 0
+            for file_path in cached.files:
+                try:
+                    file_bytes += os.stat(file_path, follow_symlinks=False).st_size
+                except OSError:
+                    continue
+            cached.file_bytes = file_bytes
+            return cached
+
+        files, file_bytes, subdirs = [], 0, []
+        try:
+            with os.scandir(path) as entries:
+                for item in entries:
+                    try:
+                        if item.is_dir(follow_symlinks=False):
+                            subdirs.append(item.path)
+                        elif item.is_file(follow_symlinks=False):
+                            file_bytes += item.stat(follow_symlinks=False).st_size
+                            files.append(item.path)
+                    except OSError:
+                        continue
+        except OSError:
+            return None
+
+        entry = _DirEntry(mtime_ns=mtime_ns, files=files, file_bytes=file_bytes, subdirs=subdirs)
+        with self._lock:
+            self._dirs[path] = entry
+        return entry
+
+
+_service: Optional[DiskUsageService] = None
+_service_lock = threading.Lock()
+
+
+def get_disk_usage_service() -> DiskUsageService:
+    """进程内共享的服务实例（Streamlit 重跑脚本时模块不会重新导入，缓存得以保留）"""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = DiskUsageService()
+        return _service
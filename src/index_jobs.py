@@ -0,0 +1,132 @@
+"""
+后台索引任务
+在独立线程中执行加载和索引，记录阶段、进度、速度和预计剩余时间，支持取消。
+任务写入临时集合，完成后才替换当前集合，索引期间查询继续使用原集合。
+"""
+import time
+import uuid
+import threading
+import logging
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class IndexJobCancelled(Exception):
+    """索引任务被取消"""
+
+
+class IndexJob:
+    """
+    一次后台索引任务（线程安全地读取状态）
+
+    状态: pending → running → done / failed / cancelled
+    """
+
+    STAGES = {
+        'chunking': "分块",
+        'dedup': "去重",
+        'embedding': "生成嵌入向量",
+        'committing': "提交索引"
+    }
+
+    def __init__(self, description: str):
+        self.id = uuid.uuid4().hex[:8]
+        self.description = description
+        self.state = 'pending'
+        self.stage = None
+        self.done = 0
+        self.total = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        # 任务启动时的嵌入模型和目标集合，整个任务只使用这一组（期间切换模型不影响任务），
+        # 由 RAGSystem 在启动任务前设置
+        self.encoder = None
+        self.collection_name = None
+        self.staging_name = None
+        # 写入目标（临时集合），由 RAGSystem 在开始写入前设置
+        self.collection = None
+        self.chapter_collection = None
+        self._stage_start = time.perf_counter()
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self, target: Callable[["IndexJob"], bool]):
+        """在后台线程中执行 target(job)，返回值为 False 时任务记为失败"""
+        def run():
+            self.state = 'running'
+            try:
+                if target(self):
+                    self.state = 'done'
+                elif self._cancel.is_set():
+                    self.state = 'cancelled'
+                else:
+                    self.state = 'failed'
+                    self.error = self.error or "索引失败，详见日志"
+            except IndexJobCancelled:
+                self.state = 'cancelled'
+            except Exception as e:
+                logger.error(f"❌ 索引任务 {self.id} 异常: {e}")
+                self.state = 'failed'
+                self.error = str(e)
+            finally:
+                self.finished_at = time.time()
+                logger.info(f"📋 索引任务 {self.id} 结束: {self.state}")
+
+        self._thread = threading.Thread(target=run, name=f"index-job-{self.id}", daemon=True)
+        self._thread.start()
+
+    def is_running(self) -> bool:
+        return self.state in ('pending', 'running')
+
+    def wait(self, timeout: Optional[float] = None):
+        if self._thread:
+            self._thread.join(timeout)
+
+    def cancel(self):
+        """请求取消，任务在下一批编码前或下一阶段开始时停止"""
+        if self.is_running():
+            self._cancel.set()
+            logger.info(f"🛑 请求取消索引任务 {self.id}")
+
+    def check_cancelled(self):
+        if self._cancel.is_set():
+            raise IndexJobCancelled(self.id)
+
+    def set_stage(self, stage: str, total: Optional[int] = None):
+        """进入新阶段（重置进度计数），已请求取消时抛出 IndexJobCancelled"""
+        self.check_cancelled()
+        with self._lock:
+            self.stage = stage
+            self.done = 0
+            self.total = total
+            self._stage_start = time.perf_counter()
+
+    def advance(self, count: int = 1):
+        """累加当前阶段的完成数，已请求取消时抛出 IndexJobCancelled"""
+        with self._lock:
+            self.done += count
+        self.check_cancelled()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """当前状态：阶段、完成数、速度（项/秒）、预计剩余秒数"""
+        with self._lock:
+            elapsed = time.perf_counter() - self._stage_start
+            rate = self.done / elapsed if elapsed > 0 and self.done else 0.0
+            eta = (self.total - self.done) / rate if self.total and rate > 0 else None
+            return {
+                'id': self.id,
+                'description': self.description,
+                'state': self.state,
+                'cancel_requested': self._cancel.is_set(),
+                'stage': self.stage,
+                'stage_label': self.STAGES.get(self.stage, self.stage or ""),
+                'done': self.done,
+                'total': self.total,
+                'rate': rate,
+                'eta': eta,
+                'elapsed': (self.finished_at or time.time()) - self.created_at,
+                'error': self.error
+            }
@@ -0,0 +1,124 @@
+"""
+DeepSeek 生成客户端
+复用 HTTP 连接池（keep-alive），每次请求单独设置超时，
+对可重试的错误（连接失败、超时、429、5xx）按指数退避加随机抖动重试；
+调用时可指定截止时间，剩余时间不足以完成下一次等待时不再重试，到期后抛出 DeadlineExceeded。
+
+httpx / tenacity 导入耗时较长，在创建客户端和首次请求时才导入，导入本模块不会加载它们。
+"""
+import time
+import logging
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class DeadlineExceeded(Exception):
+    """本次问答的时间预算已用完"""
+
+
+def build_http_client(config):
+    """按配置创建带连接池和 keep-alive 的 httpx 客户端（供 openai.OpenAI 复用）"""
+    import httpx
+    return httpx.Client(
+        limits=httpx.Limits(
+            max_connections=config.LLM_POOL_CONNECTIONS,
+            max_keepalive_connections=config.LLM_POOL_KEEPALIVE,
+            keepalive_expiry=config.LLM_KEEPALIVE_EXPIRY
+        ),
+        timeout=httpx.Timeout(config.LLM_READ_TIMEOUT, connect=config.LLM_CONNECT_TIMEOUT)
+    )
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """连接错误、超时、限流和服务端错误可重试；鉴权、参数等客户端错误不重试"""
+    import httpx
+    try:
+        import openai
+    except ImportError:
+        openai = None
+    if openai is not None:
+        if isinstance(exc, (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)):
+            return True
+        if isinstance(exc, openai.APIStatusError):
+            return exc.status_code >= 500
+    return isinstance(exc, (httpx.TransportError, TimeoutError, ConnectionError))
+
+
+class _StopAtDeadline:
+    """下一次等待结束时已超过截止时间则停止重试（tenacity 的 stop 条件可以是任意可调用对象）"""
+
+    def __init__(self, deadline: Optional[float]):
+        self.deadline = deadline
+
+    def __call__(self, retry_state) -> bool:
+        if self.deadline is None:
+            return False
+        return time.monotonic() + (retry_state.upcoming_sleep or 0.0) >= self.deadline
+
+
+class GenerationClient:
+    """包装 OpenAI 兼容客户端的 chat.completions.create：单次请求超时、退避重试、截止时间"""
+
+    def __init__(self, client, config, on_retry: Optional[Callable[[BaseException], None]] = None):
+        """
+        Args:
+            client: openai.OpenAI 或接口相同的客户端（如 StubOpenAIClient）
+            config: 配置对象（LLM_* 超时与重试参数）
+            on_retry: 每次重试前调用，参数为本次失败的异常
+        """
+        self.client = client
+        self.model = config.LLM_MODEL
+        self.request_timeout = config.LLM_READ_TIMEOUT
+        self.max_retries = config.LLM_MAX_RETRIES
+        self.backoff_base = config.LLM_BACKOFF_BASE
+        self.backoff_max = config.LLM_BACKOFF_MAX
+        self.on_retry = on_retry
+
+    def _attempt_timeout(self, deadline: Optional[float]) -> float:
+        """单次请求超时：配置值与剩余预算中较小者"""
+        if deadline is None:
+            return self.request_timeout
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceeded("时间预算已用完")
+        return min(self.request_timeout, remaining)
+
+    def _before_sleep(self, retry_state):
+        exc = retry_state.outcome.exception()
+        logger.warning("⚠️ LLM请求失败（第 %d 次）: %s，%.2fs 后重试",
+                       retry_state.attempt_number, exc, retry_state.upcoming_sleep)
+        if self.on_retry:
+            self.on_retry(exc)
+
+    def create(self, messages: List[Dict[str, str]], deadline: Optional[float] = None, **kwargs) -> Any:
+        """
+        调用 chat.completions.create，失败时按策略重试
+
+        Args:
+            messages: 对话消息
+            deadline: 截止时间（time.monotonic() 时间戳），None 表示不限制
+            **kwargs: 透传给 create 的参数（max_tokens、temperature、stream 等）
+
+        Raises:
+            DeadlineExceeded: 发起请求前预算已用完
+            Exception: 不可重试的错误，或重试次数/预算用完后的最后一次错误
+        """
+        from tenacity import Retrying, retry_if_exception, stop_after_attempt, wait_random_exponential
+
+        def attempt():
+            return self.client.chat.completions.create(
+                model=self.model,
+                messages=messages,
+                timeout=self._attempt_timeout(deadline),
+                **kwargs
+            )
+
+        retrying = Retrying(
+            stop=stop_after_attempt(self.max_retries + 1) | _StopAtDeadline(deadline),
+            wait=wait_random_exponential(multiplier=self.backoff_base, max=self.backoff_max),
+            retry=retry_if_exception(is_retryable),
+            before_sleep=self._before_sleep,
+            reraise=True
+        )
+        return retrying(attempt)
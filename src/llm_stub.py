@@ -0,0 +1,45 @@
+"""
+本地LLM桩客户端
+实现 RAGSystem 用到的 openai 客户端接口子集（chat.completions.create，含 stream=True），
+按配置的延迟返回固定答案，用于在没有DeepSeek密钥时测量完整问答流程的吞吐
+"""
+import time
+from types import SimpleNamespace
+from typing import Iterator
+
+DEFAULT_ANSWER = "根据上下文信息，这是一个用于性能测试的模拟回答。"
+
+
+class StubOpenAIClient:
+    """模拟 openai.OpenAI 客户端"""
+
+    def __init__(self, delay: float = 0.5, answer: str = DEFAULT_ANSWER, tokens_per_second: float = 50.0):
+        """
+        Args:
+            delay: 非流式请求的总耗时 / 流式请求的首个token耗时（秒）
+            answer: 返回的固定答案
+            tokens_per_second: 流式输出速度（每个字符视为一个token）
+        """
+        self.delay = delay
+        self.answer = answer
+        self.tokens_per_second = tokens_per_second
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+        self.models = SimpleNamespace(list=lambda: [])
+
+    def _create(self, model: str = "", messages=None, stream: bool = False, **kwargs):
+        if stream:
+            return self._stream()
+        time.sleep(self.delay)
+        message = SimpleNamespace(role="assistant", content=self.answer)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(index=0, message=message, finish_reason="stop")],
+            usage=SimpleNamespace(prompt_tokens=0, completion_tokens=len(self.answer), total_tokens=len(self.answer))
+        )
+
+    def _stream(self) -> Iterator[SimpleNamespace]:
+        time.sleep(self.delay)
+        interval = 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+        for char in self.answer:
+            yield SimpleNamespace(choices=[SimpleNamespace(index=0, delta=SimpleNamespace(content=char))])
+            if interval:
+                time.sleep(interval)
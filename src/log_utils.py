@@ -0,0 +1,81 @@
+"""
+热路径日志工具
+按时间间隔输出进度汇总（代替逐条日志），以及按固定间隔抽样的调试日志。
+日志参数均以 %-占位符传入，级别未启用时不做字符串格式化。
+"""
+import time
+import logging
+from typing import Optional
+
+
+class ProgressReporter:
+    """
+    周期性进度汇总：每隔 interval 秒最多输出一行，包含完成数、速度和预计剩余时间
+
+    用法:
+        progress = ProgressReporter(logger, "嵌入", total=len(chunks), interval=5.0)
+        for batch in batches:
+            ...
+            progress.update(len(batch))
+        progress.finish()
+    """
+
+    def __init__(self, logger: logging.Logger, label: str, total: Optional[int] = None,
+                 interval: float = 5.0, level: int = logging.INFO):
+        self.logger = logger
+        self.label = label
+        self.total = total
+        self.interval = interval
+        self.level = level
+        self.done = 0
+        self.start_time = time.perf_counter()
+        self._last_report = self.start_time
+
+    def update(self, count: int = 1):
+        """累加完成数，距上次输出超过 interval 时输出一行进度"""
+        self.done += count
+        now = time.perf_counter()
+        if now - self._last_report >= self.interval:
+            self._last_report = now
+            self._report(now)
+
+    def rate(self) -> float:
+        elapsed = time.perf_counter() - self.start_time
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    def eta(self) -> Optional[float]:
+        """预计剩余秒数，总数未知或尚无进度时返回 None"""
+        rate = self.rate()
+        if self.total is None or rate <= 0:
+            return None
+        return max(0.0, (self.total - self.done) / rate)
+
+    def _report(self, now: float):
+        if not self.logger.isEnabledFor(self.level):
+            return
+        elapsed = now - self.start_time
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        extra = {'progress': {'label': self.label, 'done': self.done, 'total': self.total,
+                              'rate': rate, 'elapsed': elapsed}}
+        if self.total:
+            eta = (self.total - self.done) / rate if rate > 0 else 0.0
+            self.logger.log(self.level, "📊 %s进度: %d/%d (%.1f%%), %.1f/s, 预计剩余 %.0fs",
+                            self.label, self.done, self.total, 100.0 * self.done / self.total,
+                            rate, eta, extra=extra)
+        else:
+            self.logger.log(self.level, "📊 %s进度: %d, %.1f/s", self.label, self.done, rate, extra=extra)
+
+    def finish(self):
+        """输出最终汇总"""
+        elapsed = time.perf_counter() - self.start_time
+        if self.logger.isEnabledFor(self.level):
+            self.logger.log(self.level, "✅ %s完成: %d 项, 用时 %.2fs (%.1f/s)",
+                            self.label, self.done, elapsed, self.done / elapsed if elapsed > 0 else 0.0,
+                            extra={'progress': {'label': self.label, 'done': self.done, 'total': self.total,
+                                                'elapsed': elapsed}})
+
+
+def log_sampled(logger: logging.Logger, index: int, every: int, msg: str, *args, level: int = logging.DEBUG):
+    """只在 index 为 every 的整数倍时输出日志（every <= 0 时不输出）"""
+    if every > 0 and index % every == 0 and logger.isEnabledFor(level):
+        logger.log(level, msg, *args)
@@ -0,0 +1,132 @@
+"""
+内存占用统计
+进程RSS / 峰值RSS、嵌入模型参数字节数、向量索引文件大小，
+以及在后台线程中采样RSS、记录某段操作期间峰值的 MemoryMonitor
+"""
+import os
+import sys
+import sqlite3
+import threading
+from typing import Iterable, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# HNSW 索引文件（ChromaDB 查询时整体加载到内存）
+_HNSW_FILES = ("data_level0.bin", "link_lists.bin", "header.bin", "length.bin")
+
+
+def process_rss_bytes() -> Optional[int]:
+    """当前进程常驻内存（字节），无法获取时返回 None"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        return None
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """进程生命周期内的峰值常驻内存（字节）"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 为单位，macOS 以字节为单位
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def model_parameter_bytes(model) -> int:
+    """torch 模型参数与缓冲区占用的字节数，非 torch 模型返回 0"""
+    if model is None or not hasattr(model, "parameters"):
+        return 0
+    total = sum(p.numel() * p.element_size() for p in model.parameters())
+    if hasattr(model, "buffers"):
+        total += sum(b.numel() * b.element_size() for b in model.buffers())
+    return int(total)
+
+
+def _vector_segment_dirs(persist_dir: str, collection_ids: Iterable[str]) -> Optional[list]:
+    """从 chroma.sqlite3 中查出集合的向量段目录（目录名为段ID），读取失败返回 None"""
+    ids = [str(collection_id) for collection_id in collection_ids]
+    if not ids:
+        return []
+    try:
+        db = sqlite3.connect(f"file:{os.path.join(persist_dir, 'chroma.sqlite3')}?mode=ro", uri=True)
+        try:
+            rows = db.execute(
+                f"SELECT id FROM segments WHERE scope = 'VECTOR' AND collection IN ({','.join('?' * len(ids))})",
+                ids
+            ).fetchall()
+        finally:
+            db.close()
+    except sqlite3.Error:
+        return None
+    return [os.path.join(persist_dir, row[0]) for row in rows]
+
+
+def hnsw_index_bytes(persist_dir: str, collection_ids: Optional[Iterable[str]] = None) -> int:
+    """
+    ChromaDB 持久化目录下 HNSW 索引文件的大小之和
+
+    指定 collection_ids 时只统计这些集合的向量段（无法读取段信息时统计全部）
+    """
+    if not os.path.isdir(persist_dir):
+        return 0
+    segment_dirs = _vector_segment_dirs(persist_dir, collection_ids) if collection_ids is not None else None
+    if segment_dirs is None:
+        segment_dirs = [entry.path for entry in os.scandir(persist_dir) if entry.is_dir()]
+    total = 0
+    for segment_dir in segment_dirs:
+        for name in _HNSW_FILES:
+            path = os.path.join(segment_dir, name)
+            if os.path.exists(path):
+                total += os.path.getsize(path)
+    return total
+
+
+class MemoryMonitor:
+    """
+    在后台线程中定期采样RSS，记录 with 代码块执行期间的峰值
+
+    用法:
+        with MemoryMonitor() as memory:
+            ...
+        memory.peak_bytes, memory.start_bytes
+    """
+
+    def __init__(self, interval: float = 0.1):
+        self.interval = interval
+        self.start_bytes = None
+        self.peak_bytes = None
+        self.end_bytes = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        rss = process_rss_bytes()
+        if rss is not None and (self.peak_bytes is None or rss > self.peak_bytes):
+            self.peak_bytes = rss
+        return rss
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        self.start_bytes = self._sample()
+        self._thread = threading.Thread(target=self._run, name="memory-monitor", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+        self.end_bytes = self._sample()
+        return False
@@ -0,0 +1,209 @@
+"""
+进程内性能指标
+记录延迟、批大小、吞吐等滚动直方图（保留最近 window 个样本）和计数器，
+提供分位数统计、QPS、缓存命中率，以及 Prometheus 文本格式导出
+"""
+import time
+import threading
+from collections import deque
+from typing import Dict, Any, List, Tuple, Optional
+
+import numpy as np
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+# 指标说明（用于 Prometheus 的 HELP 行）
+METRIC_HELP = {
+    'search_seconds': "检索延迟（秒）",
+    'search_batch_seconds': "批量检索每批延迟（秒）",
+    'generate_seconds': "答案生成延迟（秒）",
+    'query_seconds': "完整问答延迟（秒）",
+    'embedding_batch_size': "嵌入批大小",
+    'index_chunks_per_second': "索引吞吐（文本块/秒）",
+    'queries_total': "问答请求数",
+    'cache_requests_total': "缓存查找次数",
+    'indexed_chunks_total': "已索引文本块数",
+    'llm_retries_total': "LLM请求重试次数",
+    'llm_fallbacks_total': "LLM降级为抽取式回答的次数",
+}
+
+LabelKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+def _key(name: str, labels: Dict[str, Any]) -> LabelKey:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _escape(value: str) -> str:
+    """Prometheus 标签值转义"""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class RollingHistogram:
+    """保留最近 window 个样本及其时间戳的直方图"""
+
+    def __init__(self, window: int):
+        self.samples = deque(maxlen=window)
+        self.count = 0      # 累计样本数（不受窗口限制）
+        self.sum = 0.0
+
+    def observe(self, value: float, timestamp: float):
+        self.samples.append((timestamp, value))
+        self.count += 1
+        self.sum += value
+
+    def values(self) -> List[float]:
+        return [value for _, value in self.samples]
+
+    def quantiles(self) -> Dict[float, float]:
+        values = self.values()
+        if not values:
+            return {q: 0.0 for q in QUANTILES}
+        result = np.percentile(values, [q * 100 for q in QUANTILES])
+        return dict(zip(QUANTILES, (float(v) for v in result)))
+
+
+class MetricsRegistry:
+    """线程安全的指标注册表"""
+
+    def __init__(self, window: int = 1000, rate_window: float = 60.0):
+        """
+        Args:
+            window: 每个直方图保留的样本数
+            rate_window: 计算QPS的时间窗口（秒）
+        """
+        self.window = window
+        self.rate_window = rate_window
+        self._lock = threading.Lock()
+        self._histograms: Dict[LabelKey, RollingHistogram] = {}
+        self._counters: Dict[LabelKey, float] = {}
+        self._query_times = deque()
+        self._start_time = time.time()
+
+    def observe(self, name: str, value: float, **labels):
+        """记录一个直方图样本"""
+        now = time.time()
+        key = _key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = RollingHistogram(self.window)
+            histogram.observe(value, now)
+
+    def increment(self, name: str, amount: float = 1, **labels):
+        """计数器累加"""
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def record_query(self, generate_time: float, total_time: float, **labels):
+        """记录一次问答请求的生成和总延迟（检索延迟由 search 单独记录）"""
+        self.observe('generate_seconds', generate_time, **labels)
+        self.observe('query_seconds', total_time, **labels)
+        self.increment('queries_total', **labels)
+        with self._lock:
+            self._query_times.append(time.time())
+
+    def record_cache(self, cache: str, hit: bool):
+        """记录一次缓存查找"""
+        self.increment('cache_requests_total', cache=cache, result="hit" if hit else "miss")
+
+    def qps(self) -> float:
+        """最近 rate_window 秒内的问答QPS"""
+        now = time.time()
+        with self._lock:
+            while self._query_times and self._query_times[0] < now - self.rate_window:
+                self._query_times.popleft()
+            count = len(self._query_times)
+        elapsed = min(self.rate_window, now - self._start_time)
+        return count / elapsed if elapsed > 0 else 0.0
+
+    def cache_hit_rates(self) -> Dict[str, float]:
+        """按缓存名称统计命中率"""
+        totals: Dict[str, List[float]] = {}
+        with self._lock:
+            for (name, labels), value in self._counters.items():
+                if name != 'cache_requests_total':
+                    continue
+                label_dict = dict(labels)
+                hits_total = totals.setdefault(label_dict.get('cache', ''), [0.0, 0.0])
+                hits_total[1] += value
+                if label_dict.get('result') == "hit":
+                    hits_total[0] += value
+        return {cache: hits / total if total else 0.0 for cache, (hits, total) in totals.items()}
+
+    def series(self, name: str, **labels) -> List[Tuple[float, float]]:
+        """直方图窗口内的 (时间戳, 值) 序列，用于绘图"""
+        with self._lock:
+            histogram = self._histograms.get(_key(name, labels))
+            return list(histogram.samples) if histogram else []
+
+    def snapshot(self) -> Dict[str, Any]:
+        """当前全部指标的汇总"""
+        with self._lock:
+            histograms = {
+                self._format_name(name, labels): {
+                    'count': h.count,
+                    'window': len(h.samples),
+                    **{f"p{int(q * 100)}": v for q, v in h.quantiles().items()}
+                }
+                for (name, labels), h in self._histograms.items()
+            }
+            counters = {self._format_name(name, labels): value for (name, labels), value in self._counters.items()}
+        return {
+            'histograms': histograms,
+            'counters': counters,
+            'qps': self.qps(),
+            'cache_hit_rates': self.cache_hit_rates()
+        }
+
+    def to_prometheus(self, prefix: str = "rag") -> str:
+        """导出为 Prometheus 文本格式（直方图以 summary 类型导出滚动窗口分位数）"""
+        lines = []
+        # 在锁内取出分位数，避免其他线程写入时遍历样本
+        with self._lock:
+            histograms = [
+                (key, h.quantiles(), h.sum, h.count)
+                for key, h in sorted(self._histograms.items(), key=lambda item: item[0])
+            ]
+            counters = sorted(self._counters.items())
+
+        seen = set()
+        for (name, labels), quantiles, total, count in histograms:
+            metric = f"{prefix}_{name}"
+            if metric not in seen:
+                seen.add(metric)
+                lines.append(f"# HELP {metric} {METRIC_HELP.get(name, name)}")
+                lines.append(f"# TYPE {metric} summary")
+            for q, value in quantiles.items():
+                lines.append(f"{metric}{self._labels(labels, quantile=q)} {value}")
+            lines.append(f"{metric}_sum{self._labels(labels)} {total}")
+            lines.append(f"{metric}_count{self._labels(labels)} {count}")
+
+        for (name, labels), value in counters:
+            metric = f"{prefix}_{name}"
+            if metric not in seen:
+                seen.add(metric)
+                lines.append(f"# HELP {metric} {METRIC_HELP.get(name, name)}")
+                lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric}{self._labels(labels)} {value}")
+
+        lines.append(f"# HELP {prefix}_qps 最近{int(self.rate_window)}秒的问答QPS")
+        lines.append(f"# TYPE {prefix}_qps gauge")
+        lines.append(f"{prefix}_qps {self.qps()}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _labels(labels: Tuple[Tuple[str, str], ...], quantile: Optional[float] = None) -> str:
+        pairs = list(labels)
+        if quantile is not None:
+            pairs.append(('quantile', str(quantile)))
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+    @staticmethod
+    def _format_name(name: str, labels: Tuple[Tuple[str, str], ...]) -> str:
+        if not labels:
+            return name
+        return f"{name}[{','.join(f'{k}={v}' for k, v in labels)}]"
@@ -0,0 +1,145 @@
+"""
+本地 OpenAI 兼容的模拟LLM服务
+实现 /v1/chat/completions（含 stream=True 的SSE输出）和 /v1/models，
+可配置首token延迟、输出速度和错误率，用于在没有DeepSeek密钥时压测完整问答流程
+
+启动:
+    cd src
+    python mock_llm_server.py --port 9000 --ttft 0.3 --tokens-per-second 40 --error-rate 0.05
+
+然后把 Config.DEEPSEEK_BASE_URL 指向 http://127.0.0.1:9000/v1（或设置环境变量
+DEEPSEEK_BASE_URL），DEEPSEEK_API_KEY 可设为任意非空值。
+"""
+import time
+import json
+import uuid
+import random
+import asyncio
+import argparse
+from dataclasses import dataclass
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+@dataclass
+class MockSettings:
+    """模拟服务参数"""
+    ttft: float = 0.3                # 首token延迟（秒）
+    tokens_per_second: float = 40.0  # 输出速度
+    answer_tokens: int = 80          # 每个回答的token数（最多不超过请求的 max_tokens）
+    error_rate: float = 0.0          # 返回错误的概率
+    error_status: int = 500          # 错误状态码（如 429 模拟限流）
+    seed: int = 0
+
+
+settings = MockSettings()
+rng = random.Random(settings.seed)
+app = FastAPI(title="Mock OpenAI-compatible LLM")
+
+_ANSWER_TEXT = "根据提供的上下文信息，答案如下：这是模拟服务生成的回答，用于压测检索增强生成流程的端到端延迟。"
+
+
+def _answer_tokens(count: int):
+    """生成指定数量的token（每个汉字视为一个token）"""
+    return [_ANSWER_TEXT[i % len(_ANSWER_TEXT)] for i in range(count)]
+
+
+def _prompt_tokens(messages) -> int:
+    return sum(len(m.get("content", "")) for m in messages)
+
+
+def _error_response():
+    return JSONResponse(
+        status_code=settings.error_status,
+        content={"error": {"message": "mock upstream error", "type": "server_error", "code": settings.error_status}}
+    )
+
+
+@app.get("/v1/models")
+async def list_models():
+    return {"object": "list", "data": [{"id": "deepseek-chat", "object": "model", "owned_by": "mock"}]}
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    if rng.random() < settings.error_rate:
+        return _error_response()
+
+    model = body.get("model", "deepseek-chat")
+    messages = body.get("messages", [])
+    count = min(settings.answer_tokens, body.get("max_tokens") or settings.answer_tokens)
+    tokens = _answer_tokens(count)
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+    created = int(time.time())
+    interval = 1.0 / settings.tokens_per_second if settings.tokens_per_second > 0 else 0.0
+    usage = {
+        "prompt_tokens": _prompt_tokens(messages),
+        "completion_tokens": len(tokens),
+        "total_tokens": _prompt_tokens(messages) + len(tokens)
+    }
+
+    if not body.get("stream"):
+        await asyncio.sleep(settings.ttft + interval * max(0, len(tokens) - 1))
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "".join(tokens)},
+                "finish_reason": "stop"
+            }],
+            "usage": usage
+        }
+
+    async def event_stream():
+        def chunk(delta, finish_reason=None):
+            payload = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+            }
+            return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+        await asyncio.sleep(settings.ttft)
+        yield chunk({"role": "assistant", "content": ""})
+        for i, token in enumerate(tokens):
+            if i:
+                await asyncio.sleep(interval)
+            yield chunk({"content": token})
+        yield chunk({}, finish_reason="stop")
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI兼容的模拟LLM服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--ttft", type=float, default=settings.ttft, help="首token延迟（秒）")
+    parser.add_argument("--tokens-per-second", type=float, default=settings.tokens_per_second)
+    parser.add_argument("--answer-tokens", type=int, default=settings.answer_tokens)
+    parser.add_argument("--error-rate", type=float, default=settings.error_rate, help="错误概率 0~1")
+    parser.add_argument("--error-status", type=int, default=settings.error_status, help="错误状态码，如500/429")
+    parser.add_argument("--seed", type=int, default=settings.seed)
+    args = parser.parse_args()
+
+    settings.ttft = args.ttft
+    settings.tokens_per_second = args.tokens_per_second
+    settings.answer_tokens = args.answer_tokens
+    settings.error_rate = args.error_rate
+    settings.error_status = args.error_status
+    rng.seed(args.seed)
+
+    import uvicorn
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+嵌入模型注册表
+同时常驻多个嵌入模型，按最近使用顺序(LRU)在超出数量或内存上限时淘汰，
+未常驻的模型可在后台线程中加载，加载期间当前模型继续提供服务
+"""
+import gc
+import time
+import threading
+import logging
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingModelRegistry:
+    """常驻嵌入模型的LRU注册表（线程安全）"""
+
+    def __init__(self, loader: Callable[[str], Any], size_of: Callable[[Any], int],
+                 max_models: int = 2, max_bytes: Optional[int] = None):
+        """
+        Args:
+            loader: 按模型名称加载模型，失败时抛出异常
+            size_of: 返回模型占用的字节数
+            max_models: 最多常驻的模型数
+            max_bytes: 常驻模型总字节数上限，None 表示只按数量限制
+        """
+        self.loader = loader
+        self.size_of = size_of
+        self.max_models = max(1, max_models)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._models: "OrderedDict[str, Any]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._loading: Dict[str, threading.Thread] = {}
+        self._errors: Dict[str, str] = {}
+
+    def get(self, name: str) -> Optional[Any]:
+        """返回常驻模型并标记为最近使用，未常驻返回 None"""
+        with self._lock:
+            model = self._models.get(name)
+            if model is not None:
+                self._models.move_to_end(name)
+            return model
+
+    def is_resident(self, name: str) -> bool:
+        with self._lock:
+            return name in self._models
+
+    def is_loading(self, name: str) -> bool:
+        with self._lock:
+            thread = self._loading.get(name)
+            return bool(thread and thread.is_alive())
+
+    def load(self, name: str, keep: Iterable[str] = ()) -> Any:
+        """
+        同步加载模型（已常驻时直接返回），加入后按LRU淘汰超出上限的模型
+
+        Args:
+            name: 模型名称
+            keep: 不参与淘汰的模型（如当前正在服务的模型）
+        """
+        model = self.get(name)
+        if model is not None:
+            return model
+
+        load_start = time.perf_counter()
+        model = self.loader(name)
+        size = int(self.size_of(model))
+        with self._lock:
+            self._models[name] = model
+            self._sizes[name] = size
+            self._errors.pop(name, None)
+        logger.info(f"📦 模型已常驻: {name} ({size / 1024 / 1024:.0f}MB, {time.perf_counter() - load_start:.2f}s)")
+        self._evict(keep={name, *keep})
+        return model
+
+    def load_async(self, name: str, keep: Iterable[str] = (),
+                   on_ready: Optional[Callable[[str], None]] = None) -> bool:
+        """
+        在后台线程中加载模型，完成后调用 on_ready(name)
+
+        Returns:
+            bool: 是否启动了新的加载线程（已常驻或正在加载时返回 False）
+        """
+        keep = tuple(keep)
+        with self._lock:
+            if name in self._models:
+                return False
+            thread = self._loading.get(name)
+            if thread and thread.is_alive():
+                return False
+
+            def run():
+                try:
+                    self.load(name, keep)
+                except Exception as e:
+                    logger.error(f"❌ 后台加载模型失败: {name}: {e}")
+                    with self._lock:
+                        self._errors[name] = str(e)
+                    return
+                finally:
+                    with self._lock:
+                        self._loading.pop(name, None)
+                if on_ready:
+                    on_ready(name)
+
+            thread = threading.Thread(target=run, name=f"model-load-{name}", daemon=True)
+            self._loading[name] = thread
+            self._errors.pop(name, None)
+        thread.start()
+        return True
+
+    def _evict(self, keep: set):
+        """按LRU顺序淘汰模型，直到数量和总字节数都在上限内（keep 中的模型不淘汰）"""
+        evicted = []
+        with self._lock:
+            def over_limit():
+                if len(self._models) > self.max_models:
+                    return True
+                return self.max_bytes is not None and sum(self._sizes.values()) > self.max_bytes
+
+            for name in list(self._models):
+                if not over_limit():
+                    break
+                if name in keep:
+                    continue
+                del self._models[name]
+                evicted.append((name, self._sizes.pop(name, 0)))
+        for name, size in evicted:
+            logger.info(f"♻️ 淘汰常驻模型: {name} (释放约 {size / 1024 / 1024:.0f}MB)")
+        if evicted:
+            gc.collect()
+
+    def status(self) -> Dict[str, Any]:
+        """常驻模型（按最近使用排序，最近的在后）、正在加载的模型和加载错误"""
+        with self._lock:
+            resident: List[Dict[str, Any]] = [
+                {'name': name, 'bytes': self._sizes.get(name, 0)} for name in self._models
+            ]
+            loading = [name for name, thread in self._loading.items() if thread.is_alive()]
+            return {
+                'resident': resident,
+                'loading': loading,
+                'errors': dict(self._errors),
+                'total_bytes': sum(self._sizes.values()),
+                'max_models': self.max_models,
+                'max_bytes': self.max_bytes
+            }
@@ -0,0 +1,174 @@
+"""
+嵌入模型路径解析
+优先使用本地模型文件，并把解析结果（路径 + 指纹）记录到清单文件中，
+后续启动直接从清单加载，离线模式下不会访问网络
+"""
+import os
+import json
+import time
+import hashlib
+import logging
+from typing import Optional, List, Dict, Any
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "model_manifest.json"
+
+# 判断目录是否为可加载的模型目录
+_MODEL_MARKER_FILES = ("modules.json", "config.json", "config_sentence_transformers.json")
+
+
+class ModelResolver:
+    """嵌入模型本地路径解析器"""
+
+    def __init__(self, cache_dir: str, offline: bool = False):
+        """
+        初始化解析器
+
+        Args:
+            cache_dir: 模型缓存目录（清单文件也保存在这里）
+            offline: 离线模式，只使用本地文件
+        """
+        self.cache_dir = cache_dir
+        self.offline = offline
+        self.manifest_path = os.path.join(cache_dir, MANIFEST_FILE)
+        self.timings: List[Dict[str, Any]] = []
+
+    @staticmethod
+    def enable_offline_mode():
+        """设置 HuggingFace / Transformers 离线环境变量，避免加载时访问网络"""
+        os.environ["HF_HUB_OFFLINE"] = "1"
+        os.environ["TRANSFORMERS_OFFLINE"] = "1"
+
+    def _timed(self, step: str, func, *args):
+        """执行一个解析步骤并记录耗时"""
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.timings.append({'step': step, 'ms': elapsed_ms, 'found': result is not None})
+        logger.info(f"⏱️ 模型解析 [{step}]: {elapsed_ms:.1f}ms {'✅' if result else '—'}")
+        return result
+
+    @staticmethod
+    def is_model_dir(path: str) -> bool:
+        return os.path.isdir(path) and any(
+            os.path.exists(os.path.join(path, name)) for name in _MODEL_MARKER_FILES
+        )
+
+    @staticmethod
+    def fingerprint(path: str) -> str:
+        """
+        计算模型目录指纹：配置文件内容 + 顶层文件名和大小
+
+        只读取小文件，不对权重文件做完整哈希，保证启动时开销很小。
+        """
+        digest = hashlib.sha256()
+        for name in sorted(os.listdir(path)):
+            file_path = os.path.join(path, name)
+            if not os.path.isfile(file_path):
+                continue
+            digest.update(f"{name}:{os.path.getsize(file_path)};".encode("utf-8"))
+            if name in _MODEL_MARKER_FILES:
+                with open(file_path, "rb") as f:
+                    digest.update(f.read())
+        return digest.hexdigest()[:16]
+
+    # ------------------------------------------------------------------
+    # 清单
+    # ------------------------------------------------------------------
+    def _load_manifest(self) -> Dict[str, Any]:
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _from_manifest(self, model_name: str) -> Optional[str]:
+        entry = self._load_manifest().get(model_name)
+        if not entry:
+            return None
+        path = entry.get("path", "")
+        if not self.is_model_dir(path):
+            logger.warning(f"⚠️ 清单中的模型路径已失效: {path}")
+            return None
+        if self.fingerprint(path) != entry.get("fingerprint"):
+            logger.warning(f"⚠️ 模型文件已变化，重新解析: {path}")
+            return None
+        if entry.get("source"):
+            logger.info(f"🔁 {model_name} 使用替代模型 {entry['source']}: {path}")
+        return path
+
+    def record(self, model_name: str, path: str, source: Optional[str] = None):
+        """
+        把解析结果写入清单
+
+        Args:
+            model_name: 配置的模型名称（启动时按此名称查找）
+            path: 本地模型目录
+            source: 实际下载的模型ID（与 model_name 不同时记录，如 ModelScope 替代模型）
+        """
+        manifest = self._load_manifest()
+        manifest[model_name] = {
+            "path": os.path.abspath(path),
+            "fingerprint": self.fingerprint(path),
+            "resolved_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        if source and source != model_name:
+            manifest[model_name]["source"] = source
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(self.manifest_path, "w", encoding="utf-8") as f:
+                json.dump(manifest, f, ensure_ascii=False, indent=2)
+        except OSError as e:
+            logger.warning(f"⚠️ 写入模型清单失败: {e}")
+
+    # ------------------------------------------------------------------
+    # 本地查找
+    # ------------------------------------------------------------------
+    def local_candidates(self, model_name: str) -> List[str]:
+        """按优先级列出可能的本地模型目录"""
+        candidates = [
+            model_name,                                            # 直接给出的本地路径
+            os.path.join(self.cache_dir, model_name),              # ModelScope 布局: cache/org/name
+            os.path.join("./models", model_name),
+            os.path.join("models", model_name),
+        ]
+
+        # HuggingFace 缓存布局: cache/models--org--name/snapshots/<revision>
+        snapshots_dir = os.path.join(self.cache_dir, "models--" + model_name.replace("/", "--"), "snapshots")
+        if os.path.isdir(snapshots_dir):
+            revisions = sorted(
+                (os.path.join(snapshots_dir, r) for r in os.listdir(snapshots_dir)),
+                key=os.path.getmtime, reverse=True
+            )
+            candidates.extend(revisions)
+
+        # sentence-transformers 旧版缓存布局: cache/org_name
+        candidates.append(os.path.join(self.cache_dir, model_name.replace("/", "_")))
+        return candidates
+
+    def _scan_local(self, model_name: str) -> Optional[str]:
+        for path in self.local_candidates(model_name):
+            if self.is_model_dir(path):
+                return path
+        return None
+
+    def resolve_local(self, model_name: str) -> Optional[str]:
+        """
+        解析本地模型路径：先查清单，再扫描本地候选目录
+
+        Args:
+            model_name: 模型名称，如 "AI-ModelScope/m3e-base"
+
+        Returns:
+            本地模型目录，未找到时返回 None
+        """
+        self.timings = []
+        path = self._timed("manifest", self._from_manifest, model_name)
+        if path:
+            return path
+
+        path = self._timed("local_scan", self._scan_local, model_name)
+        if path:
+            self.record(model_name, path)
+        return path
@@ -4,9 +4,13 @@
 import streamlit as st
 from typing import Dict, List
 import os
+import time
 import shutil
 from pathlib import Path
 
+from config import Config
+from disk_usage import get_disk_usage_service, UsageResult
+
 class ModelSelector:
     """模型选择器"""
     
@@ -51,6 +55,7 @@ class ModelSelector:
             current_model = ModelSelector._get_current_model()
             if current_model:
                 st.info(f"📱 当前模型: {current_model}")
+            ModelSelector._display_resident_models()
         
         # TF-IDF模式开关
         st.markdown("### ⚡ 快速模式")
@@ -113,53 +118,83 @@ class ModelSelector:
     def _get_current_model() -> str:
         """获取当前使用的模型"""
         try:
-            if hasattr(st.session_state.rag_system, 'embedding_model'):
-                if st.session_state.rag_system.using_modelscope:
-                    return "ModelScope中文模型"
-                elif st.session_state.rag_system.using_tfidf:
-                    return "TF-IDF (备选方案)"
-                else:
-                    # 尝试从模型路径获取名称
-                    return "Sentence Transformer模型"
+            rag_system = st.session_state.rag_system
+            if rag_system.active_model_name:
+                suffix = " (ModelScope中文模型)" if rag_system.using_modelscope else ""
+                return f"{rag_system.active_model_name}{suffix}"
             return "未知"
         except:
             return "未初始化"
     
+    @staticmethod
+    def _display_resident_models():
+        """显示常驻模型及后台加载状态"""
+        rag_system = st.session_state.get('rag_system')
+        if not rag_system:
+            return
+        status = rag_system.get_model_status()
+        lines = []
+        for item in reversed(status['resident']):
+            marker = "🟢" if item['name'] == status['active'] else "⚪"
+            lines.append(f"{marker} {item['name']}: {item['bytes'] / 1024 / 1024:.0f}MB")
+        for name in status['loading']:
+            lines.append(f"⏳ {name}: 后台加载中，当前模型继续服务")
+        for name, error in status['errors'].items():
+            lines.append(f"❌ {name}: {error}")
+        if lines:
+            st.caption(f"常驻模型（最多 {status['max_models']} 个，按最近使用淘汰）:\n" + "\n".join(lines))
+    
     @staticmethod 
     def _switch_model(model_name: str):
-        """切换模型"""
+        """切换模型：已常驻的模型立即切换，否则后台加载，加载完成前当前模型继续服务"""
         try:
-            with st.spinner(f"正在切换到模型: {model_name}"):
-                # 更新配置
-                if 'config' in st.session_state:
-                    st.session_state.config.EMBEDDING_MODEL_NAME = model_name
-                
-                # 重置RAG系统
-                st.session_state.rag_system = None
-                st.session_state.system_initialized = False
-                
-                st.success(f"✅ 已切换到模型: {model_name}")
-                st.info("💡 请重新初始化系统以使用新模型")
-                st.rerun()
+            # 更新配置
+            if 'config' in st.session_state and st.session_state.config:
+                st.session_state.config.EMBEDDING_MODEL_NAME = model_name
+            
+            rag_system = st.session_state.get('rag_system')
+            if not rag_system:
+                st.info("💡 请初始化系统以使用新模型")
+                return
+            
+            state = rag_system.switch_model(model_name)
+            if state == 'active':
+                st.success(f"✅ 已切换到模型: {model_name} (集合 {rag_system.collection_name})")
+                if rag_system.collection.count() == 0:
+                    st.info("💡 该模型的集合为空，请加载数据")
+            else:
+                st.info(f"⏳ 正在后台加载 {model_name}，加载完成后自动切换")
                 
         except Exception as e:
             st.error(f"❌ 切换模型失败: {e}")
     
+    @staticmethod
+    def _format_scan_time(result: UsageResult) -> str:
+        """扫描时间说明，如 "上次扫描: 15:30:02（用时0.12s）" """
+        if result.scanned_at is None:
+            return "⏳ 正在后台扫描，稍后再次点击查看结果"
+        scanned = time.strftime("%H:%M:%S", time.localtime(result.scanned_at))
+        return f"🕒 上次扫描: {scanned}（用时{result.scan_seconds:.2f}s）"
+    
     @staticmethod
     def _clear_model_cache():
         """清理模型缓存"""
         try:
-            models_dir = Path("../models")
+            models_dir = Path(Config.MODEL_CACHE_DIR)
+            service = get_disk_usage_service()
             if models_dir.exists():
-                # 计算缓存大小
-                total_size = sum(f.stat().st_size for f in models_dir.rglob('*') if f.is_file())
-                size_mb = total_size / 1024 / 1024
+                # 缓存大小取上次扫描结果，不在界面线程中遍历文件
+                cached = service.get(str(models_dir), refresh=False)
                 
                 # 清理缓存
                 shutil.rmtree(models_dir)
                 models_dir.mkdir(exist_ok=True)
+                service.invalidate(str(models_dir))
                 
-                st.success(f"✅ 已清理模型缓存 (释放 {size_mb:.1f}MB)")
+                if cached.scanned_at is not None:
+                    st.success(f"✅ 已清理模型缓存 (释放 {cached.total_bytes / 1024 / 1024:.1f}MB)")
+                else:
+                    st.success("✅ 已清理模型缓存")
             else:
                 st.info("📁 模型缓存目录为空")
                 
@@ -168,20 +203,20 @@ class ModelSelector:
     
     @staticmethod
     def _check_disk_usage():
-        """检查磁盘使用情况"""
+        """检查磁盘使用情况（立即返回缓存结果，后台增量刷新）"""
         try:
-            models_dir = Path("../models")
-            chroma_dir = Path("../chroma_db")
-            
+            service = get_disk_usage_service()
             usage_info = []
             
-            for dir_path, name in [(models_dir, "模型缓存"), (chroma_dir, "向量数据库")]:
-                if dir_path.exists():
-                    total_size = sum(f.stat().st_size for f in dir_path.rglob('*') if f.is_file())
-                    size_mb = total_size / 1024 / 1024
-                    usage_info.append(f"📁 {name}: {size_mb:.1f}MB")
-                else:
+            for dir_path, name in [(Config.MODEL_CACHE_DIR, "模型缓存"), (Config.CHROMA_PERSIST_DIR, "向量数据库")]:
+                result = service.get(dir_path)
+                if not result.exists:
                     usage_info.append(f"📁 {name}: 0MB")
+                elif result.scanned_at is None:
+                    usage_info.append(f"📁 {name}: 统计中...")
+                else:
+                    usage_info.append(f"📁 {name}: {result.total_bytes / 1024 / 1024:.1f}MB")
+                usage_info.append(f"   {ModelSelector._format_scan_time(result)}")
             
             st.info("\n".join(usage_info))
             
@@ -190,25 +225,26 @@ class ModelSelector:
     
     @staticmethod
     def _scan_downloaded_models():
-        """扫描已下载的模型"""
+        """扫描已下载的模型（立即返回缓存结果，后台增量刷新）"""
         try:
-            models_dir = Path("../models")
+            models_dir = Config.MODEL_CACHE_DIR
             
-            if not models_dir.exists():
+            if not os.path.isdir(models_dir):
                 st.info("📁 模型目录不存在")
                 return
             
-            downloaded_models = []
+            result = get_disk_usage_service().get(models_dir)
+            if result.scanned_at is None:
+                st.info(ModelSelector._format_scan_time(result))
+                return
             
-            for item in models_dir.iterdir():
-                if item.is_dir():
-                    # 计算目录大小
-                    total_size = sum(f.stat().st_size for f in item.rglob('*') if f.is_file())
-                    size_mb = total_size / 1024 / 1024
-                    downloaded_models.append(f"📦 {item.name}: {size_mb:.1f}MB")
+            downloaded_models = [
+                f"📦 {name}: {size / 1024 / 1024:.1f}MB"
+                for name, size in sorted(result.children.items())
+            ]
             
             if downloaded_models:
-                st.info("已下载的模型:\n" + "\n".join(downloaded_models))
+                st.info("已下载的模型:\n" + "\n".join(downloaded_models) + "\n" + ModelSelector._format_scan_time(result))
             else:
                 st.info("📭 暂无已下载的模型")
                 
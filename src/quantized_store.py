@@ -0,0 +1,342 @@
+"""
+量化向量存储
+以 int8 标量量化或二值(符号位)编码生成候选，再用 float16 向量精确重排序。
+接口与 RAGSystem 用到的 ChromaDB 集合方法保持一致（add / query / count / reset），
+可直接替换 RAGSystem.collection；数据文件只追加，写入完成后调用 flush() 持久化
+"""
+import os
+import json
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+# 每个字节中1的个数，用于计算汉明距离
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+# 候选打分时每次处理的向量数，限制临时 float32 数组的大小
+_SCORE_BLOCK = 65536
+
+
+class QuantizedCollection:
+    """量化向量集合"""
+
+    MODES = ("int8", "binary")
+
+    def __init__(self, path: str, mode: str = "int8", rescore_factor: int = 4):
+        """
+        初始化量化集合，目录中已有数据时自动加载
+
+        Args:
+            path: 存储目录
+            mode: 候选生成编码，"int8"（标量量化）或 "binary"（符号位）
+            rescore_factor: 候选数量 = top_k * rescore_factor，候选再用 float16 向量精确重排序
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"不支持的量化模式: {mode}，可选: {', '.join(self.MODES)}")
+
+        self.path = path
+        self.mode = mode
+        self.rescore_factor = max(1, rescore_factor)
+        self.name = os.path.basename(path)
+        self.metadata = {"quantization": mode}
+        self._clear()
+        self._load()
+
+    def _clear(self):
+        self.ids: List[str] = []
+        self.documents: List[str] = []
+        self.metadatas: List[Dict[str, Any]] = []
+        self.dim: Optional[int] = None
+        self._code_blocks: List[np.ndarray] = []     # int8 [n, D] 或 uint8 [n, D/8]，查询前合并为一块
+        self.scales: List[np.ndarray] = []           # int8 模式下每个写入块的每维量化步长 [D]
+        self.block_starts: List[int] = []            # 每个写入块的起始行
+        self.vectors: Optional[np.ndarray] = None    # float16 [N, D]（内存映射），用于重排序
+        self._pending_vectors: List[np.ndarray] = [] # 尚未写入磁盘的 float16 向量
+        self._columns: Optional[Dict[str, np.ndarray]] = None
+        self._flushed = 0                            # 已写入磁盘的行数
+        self._flushed_blocks = 0
+
+    @property
+    def codes(self) -> Optional[np.ndarray]:
+        """全部量化编码（多个写入块时合并为一个数组）"""
+        if not self._code_blocks:
+            return None
+        if len(self._code_blocks) > 1:
+            self._code_blocks = [np.concatenate(self._code_blocks)]
+        return self._code_blocks[0]
+
+    # ------------------------------------------------------------------
+    # 持久化
+    #
+    # 数据文件只追加：codes.bin / vectors_fp16.bin / scales.bin 为原始数组字节，
+    # records.jsonl 每行一条记录；meta.json 最后写入，记录已完整写入的行数，
+    # 加载时以其为准截掉中断写入留下的尾部。
+    # ------------------------------------------------------------------
+    _DATA_FILES = ("codes.bin", "vectors_fp16.bin", "scales.bin", "records.jsonl", "meta.json")
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _code_width(self) -> int:
+        return self.dim if self.mode == "int8" else (self.dim + 7) // 8
+
+    def _map_vectors(self):
+        """以内存映射方式打开 float16 向量，只有重排序用到的行才会被读入内存"""
+        self.vectors = np.memmap(self._file("vectors_fp16.bin"), dtype=np.float16, mode="r",
+                                 shape=(self._flushed, self.dim)) if self._flushed else None
+
+    def _load(self):
+        if not os.path.exists(self._file("meta.json")):
+            return
+        with open(self._file("meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("mode") != self.mode:
+            raise ValueError(f"存储目录 {self.path} 的量化模式为 {meta.get('mode')}，与配置 {self.mode} 不一致")
+        count, self.dim = meta["count"], meta["dim"]
+        self.block_starts = meta["block_starts"]
+
+        with open(self._file("records.jsonl"), "r", encoding="utf-8") as f:
+            for _ in range(count):
+                record = json.loads(f.readline())
+                self.ids.append(record["id"])
+                self.documents.append(record["document"])
+                self.metadatas.append(record["metadata"])
+            records_size = f.tell()
+        code_dtype = np.int8 if self.mode == "int8" else np.uint8
+        self._code_blocks = [np.fromfile(self._file("codes.bin"), dtype=code_dtype,
+                                         count=count * self._code_width()).reshape(count, self._code_width())]
+        if self.mode == "int8":
+            self.scales = list(np.fromfile(self._file("scales.bin"), dtype=np.float32,
+                                           count=len(self.block_starts) * self.dim).reshape(-1, self.dim))
+        self._flushed, self._flushed_blocks = count, len(self.block_starts)
+
+        # 截掉上次中断写入时留下的不完整数据，之后的追加从一致的位置开始
+        for name, size in (("codes.bin", count * self._code_width() * np.dtype(code_dtype).itemsize),
+                           ("vectors_fp16.bin", count * self.dim * 2),
+                           ("scales.bin", len(self.scales) * self.dim * 4),
+                           ("records.jsonl", records_size)):
+            if os.path.exists(self._file(name)) and os.path.getsize(self._file(name)) > size:
+                os.truncate(self._file(name), size)
+        self._map_vectors()
+
+    def flush(self):
+        """把尚未持久化的数据追加到磁盘文件（只写新增部分）"""
+        if self._flushed == len(self.ids):
+            return
+        os.makedirs(self.path, exist_ok=True)
+        with open(self._file("codes.bin"), "ab") as f:
+            for block in self._code_blocks_since(self._flushed):
+                f.write(block.tobytes())
+        with open(self._file("vectors_fp16.bin"), "ab") as f:
+            for block in self._pending_vectors:
+                f.write(block.tobytes())
+        if self.mode == "int8":
+            with open(self._file("scales.bin"), "ab") as f:
+                for scale in self.scales[self._flushed_blocks:]:
+                    f.write(scale.tobytes())
+        with open(self._file("records.jsonl"), "a", encoding="utf-8") as f:
+            for i in range(self._flushed, len(self.ids)):
+                f.write(json.dumps({"id": self.ids[i], "document": self.documents[i],
+                                    "metadata": self.metadatas[i]}, ensure_ascii=False) + "\n")
+
+        tmp = self._file("meta.json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"mode": self.mode, "dim": self.dim, "count": len(self.ids),
+                       "block_starts": self.block_starts}, f)
+        os.replace(tmp, self._file("meta.json"))
+
+        self._flushed, self._flushed_blocks = len(self.ids), len(self.block_starts)
+        self._pending_vectors = []
+        self._map_vectors()
+
+    def _code_blocks_since(self, row: int) -> List[np.ndarray]:
+        """从第 row 行开始的量化编码（未持久化的写入块都还在 _code_blocks 末尾，尚未合并）"""
+        blocks, end = [], sum(len(block) for block in self._code_blocks)
+        for block in reversed(self._code_blocks):
+            if end <= row:
+                break
+            start = end - len(block)
+            blocks.append(block[max(0, row - start):])
+            end = start
+        return blocks[::-1]
+
+    def reset(self):
+        """清空集合（含磁盘文件）"""
+        for name in self._DATA_FILES:
+            if os.path.exists(self._file(name)):
+                os.remove(self._file(name))
+        self._clear()
+
+    # ------------------------------------------------------------------
+    # 编码
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def _encode(self, vectors: np.ndarray, scale: Optional[np.ndarray] = None) -> np.ndarray:
+        if self.mode == "binary":
+            return np.packbits(vectors > 0, axis=1)
+        return np.clip(np.rint(vectors / scale), -127, 127).astype(np.int8)
+
+    def _build_columns(self):
+        """按元数据字段建立列数组，用于向量化执行 where 过滤"""
+        keys = {key for metadata in self.metadatas for key in metadata}
+        self._columns = {
+            key: np.array([metadata.get(key) for metadata in self.metadatas], dtype=object)
+            for key in keys
+        }
+
+    def add(self, embeddings, documents: List[str], metadatas: List[Dict], ids: List[str]):
+        """
+        添加向量（与 chromadb Collection.add 参数一致）
+
+        每次调用作为一个写入块：int8 模式按块内向量计算量化步长，已有数据不重新编码。
+        新数据先保留在内存中，调用 flush()（或下一次查询）时追加写入磁盘。
+        """
+        new_vectors = self._normalize(np.asarray(embeddings, dtype=np.float32))
+        if not len(new_vectors):
+            return
+        if self.dim is None:
+            self.dim = new_vectors.shape[1]
+        elif new_vectors.shape[1] != self.dim:
+            raise ValueError(f"向量维度 {new_vectors.shape[1]} 与集合维度 {self.dim} 不一致")
+
+        scale = None
+        if self.mode == "int8":
+            scale = np.abs(new_vectors).max(axis=0) / 127.0
+            scale[scale == 0] = 1.0
+            scale = scale.astype(np.float32)
+            self.scales.append(scale)
+        self.block_starts.append(len(self.ids))
+        self._code_blocks.append(self._encode(new_vectors, scale))
+        self._pending_vectors.append(new_vectors.astype(np.float16))
+
+        self.ids.extend(ids)
+        self.documents.extend(documents)
+        self.metadatas.extend(metadatas)
+        self._columns = None
+
+    def count(self) -> int:
+        return len(self.ids)
+
+    # ------------------------------------------------------------------
+    # 过滤
+    # ------------------------------------------------------------------
+    def _mask(self, where: Dict[str, Any]) -> np.ndarray:
+        """把 ChromaDB 风格的 where 条件转换为布尔掩码"""
+        n = len(self.ids)
+        if "$and" in where:
+            mask = np.ones(n, dtype=bool)
+            for condition in where["$and"]:
+                mask &= self._mask(condition)
+            return mask
+        if "$or" in where:
+            mask = np.zeros(n, dtype=bool)
+            for condition in where["$or"]:
+                mask |= self._mask(condition)
+            return mask
+
+        if self._columns is None:
+            self._build_columns()
+        mask = np.ones(n, dtype=bool)
+        for key, condition in where.items():
+            column = self._columns.get(key)
+            if column is None:
+                return np.zeros(n, dtype=bool)
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+            for op, value in condition.items():
+                if op == "$eq":
+                    mask &= column == value
+                elif op == "$ne":
+                    mask &= column != value
+                elif op == "$in":
+                    mask &= np.isin(column, value)
+                elif op == "$nin":
+                    mask &= ~np.isin(column, value)
+                elif op in ("$gt", "$gte", "$lt", "$lte"):
+                    numeric = np.array([v if isinstance(v, (int, float)) else np.nan for v in column], dtype=float)
+                    with np.errstate(invalid="ignore"):
+                        mask &= {
+                            "$gt": numeric > value,
+                            "$gte": numeric >= value,
+                            "$lt": numeric < value,
+                            "$lte": numeric <= value,
+                        }[op]
+                else:
+                    raise ValueError(f"不支持的过滤操作: {op}")
+        return mask
+
+    # ------------------------------------------------------------------
+    # 检索
+    # ------------------------------------------------------------------
+    def _candidate_scores(self, query: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        """用量化编码为候选行打分（越大越相似）"""
+        scores = np.empty(len(rows), dtype=np.float32)
+        if self.mode == "binary":
+            query_code = np.packbits(query > 0)
+            for start in range(0, len(rows), _SCORE_BLOCK):
+                block = self.codes[rows[start:start + _SCORE_BLOCK]]
+                hamming = _POPCOUNT[np.bitwise_xor(block, query_code)].sum(axis=1, dtype=np.int32)
+                scores[start:start + _SCORE_BLOCK] = -hamming
+        else:
+            # 行号升序，按写入块切分，每块使用各自的量化步长
+            edges = np.searchsorted(rows, self.block_starts + [len(self.ids)])
+            codes = self.codes
+            for block, scale in enumerate(self.scales):
+                scaled_query = query * scale
+                for start in range(edges[block], edges[block + 1], _SCORE_BLOCK):
+                    end = min(start + _SCORE_BLOCK, edges[block + 1])
+                    scores[start:end] = codes[rows[start:end]].astype(np.float32) @ scaled_query
+        return scores
+
+    def query(self, query_embeddings, n_results: int = 10, where: Optional[Dict[str, Any]] = None,
+              include: Optional[List[str]] = None) -> Dict[str, List[List[Any]]]:
+        """
+        检索（返回结构与 chromadb Collection.query 一致，距离为余弦距离）
+        """
+        self.flush()
+        result = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+        for query_embedding in query_embeddings:
+            query = np.asarray(query_embedding, dtype=np.float32)
+            query = query / (np.linalg.norm(query) or 1.0)
+
+            rows = np.arange(len(self.ids))
+            if where and len(rows):
+                rows = rows[self._mask(where)]
+            if len(rows) == 0:
+                for key in result:
+                    result[key].append([])
+                continue
+
+            # 候选生成：量化编码粗排
+            num_candidates = min(len(rows), n_results * self.rescore_factor)
+            scores = self._candidate_scores(query, rows)
+            if num_candidates < len(rows):
+                top = np.argpartition(-scores, num_candidates - 1)[:num_candidates]
+            else:
+                top = np.arange(len(rows))
+            candidates = np.sort(rows[top])
+
+            # 精确重排序：float16 向量计算余弦相似度
+            exact = np.asarray(self.vectors[candidates], dtype=np.float32) @ query
+            order = np.argsort(-exact)[:n_results]
+
+            hits = candidates[order]
+            result["ids"].append([self.ids[i] for i in hits])
+            result["documents"].append([self.documents[i] for i in hits])
+            result["metadatas"].append([self.metadatas[i] for i in hits])
+            result["distances"].append([float(1 - s) for s in exact[order]])
+        return result
+
+    def get_storage_stats(self) -> Dict[str, Any]:
+        """返回编码和向量的字节数"""
+        return {
+            "quantization": self.mode,
+            "vectors": len(self.ids),
+            "code_bytes": int(self.codes.nbytes) if self.codes is not None else 0,
+            "rescore_vector_bytes": len(self.ids) * (self.dim or 0) * 2,
+        }
@@ -4,50 +4,54 @@ RAG (Retrieval-Augmented Generation) 系统
 """
 import os
 import sys
+import glob
+import shutil
 import time
 import json
+import re
+import hashlib
+import uuid
 import warnings
-from typing import List, Dict, Any, Optional
+import threading
+import importlib.util
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from typing import List, Dict, Any, Optional, Iterator
 import logging
 
 # 抑制警告
 warnings.filterwarnings("ignore")
 os.environ['TOKENIZERS_PARALLELISM'] = 'false'
 
-# 配置日志
-logging.basicConfig(level=logging.INFO)
+# ModelScope镜像源配置（在首次导入modelscope前生效）
+os.environ['MODELSCOPE_CACHE'] = '../models'
+
 logger = logging.getLogger(__name__)
 
-try:
-    # ModelScope镜像源配置
-    os.environ['MODELSCOPE_CACHE'] = '../models'
-    from modelscope import snapshot_download
-    from modelscope.hub.api import HubApi
-    from sentence_transformers import SentenceTransformer
-    MODELSCOPE_AVAILABLE = True
-    logger.info("✅ ModelScope available")
-except ImportError:
-    MODELSCOPE_AVAILABLE = False
-    logger.warning("⚠️ ModelScope not available")
 
-try:
-    import chromadb
-    from chromadb.config import Settings
-    CHROMADB_AVAILABLE = True
-    logger.info("✅ ChromaDB available")
-except ImportError:
-    CHROMADB_AVAILABLE = False
-    logger.warning("⚠️ ChromaDB not available")
+def _module_available(name: str) -> bool:
+    """只查找模块是否安装，不执行导入"""
+    return importlib.util.find_spec(name) is not None
+
 
-try:
-    import openai
-    OPENAI_AVAILABLE = True
-    logger.info("✅ OpenAI client available")
-except ImportError:
-    OPENAI_AVAILABLE = False
-    logger.warning("⚠️ OpenAI client not available")
+# 依赖可用性检查。modelscope / sentence_transformers(torch) / chromadb / openai
+# 导入耗时较长，在对应组件初始化时才真正导入
+MODELSCOPE_AVAILABLE = _module_available("modelscope") and _module_available("sentence_transformers")
+CHROMADB_AVAILABLE = _module_available("chromadb")
+OPENAI_AVAILABLE = _module_available("openai")
 
-from utils import load_toutiao_data, clean_text, split_text_by_sentences
+from utils import build_novel_chunks, extractive_answer
+from dedup import MinHashDeduplicator
+from quantized_store import QuantizedCollection
+from model_resolver import ModelResolver
+from tracing import setup_tracing, span, start_span
+from metrics import MetricsRegistry
+from log_utils import ProgressReporter, log_sampled
+from model_registry import EmbeddingModelRegistry
+from index_jobs import IndexJob, IndexJobCancelled
+from result_cache import ResultCache
+from memory_stats import (MemoryMonitor, process_rss_bytes, peak_rss_bytes,
+                          model_parameter_bytes, hnsw_index_bytes)
 
 
 class RAGSystem:
@@ -64,19 +68,56 @@ class RAGSystem:
         self.embedding_model = None
         self.chroma_client = None
         self.collection = None
+        self.chapter_collection = None
         self.openai_client = None
         self.using_modelscope = False
+        self.last_index_stats = {}
+        self._hnsw_warned = set()  # 已提示HNSW参数不一致的集合
+        
+        # 常驻嵌入模型（LRU淘汰），每个模型对应独立的集合
+        self.model_registry = EmbeddingModelRegistry(
+            self._load_embedding_model,
+            model_parameter_bytes,
+            max_models=self.config.MAX_RESIDENT_MODELS,
+            max_bytes=self.config.MAX_RESIDENT_MODEL_MB * 1024 * 1024 if self.config.MAX_RESIDENT_MODEL_MB else None
+        )
+        self.active_model_name = None
+        self.collection_name = self.config.COLLECTION_NAME
+        self._pending_model = None
+        self._modelscope_models = set()
+        self._switch_lock = threading.Lock()
+        
+        # 后台索引任务（同一时间只运行一个）
+        self.index_job: Optional[IndexJob] = None
+        self._index_job_lock = threading.Lock()
+        
+        # 预热状态
+        self.warmup_status = {'state': 'idle', 'steps': {}}
+        self._warmup_thread = None
+        
+        # 问答结果缓存，键包含集合的索引版本和模型；索引版本持久化在向量库目录中，
+        # 任何进程重新索引后，所有进程的缓存都不再命中
+        self.result_cache = ResultCache(self.config.QUERY_CACHE_SIZE, self.config.QUERY_CACHE_TTL)
+        self._seen_index_version = None
+        
+        # 进程内性能指标（延迟分位数、QPS、缓存命中率、索引吞吐）
+        self.metrics = MetricsRegistry(self.config.METRICS_WINDOW, self.config.METRICS_RATE_WINDOW)
         
         # 确保目录存在
         os.makedirs(self.config.MODEL_CACHE_DIR, exist_ok=True)
         os.makedirs(self.config.CHROMA_PERSIST_DIR, exist_ok=True)
         
+        setup_tracing(self.config.TRACING_EXPORTER, self.config.TRACING_FILE)
+        
         logger.info("🚀 RAG系统初始化完成")
     
-    def initialize(self) -> bool:
+    def initialize(self, warmup: Optional[bool] = None) -> bool:
         """
         初始化所有组件
         
+        Args:
+            warmup: 是否在后台预热，默认使用 Config.ENABLE_WARMUP
+        
         Returns:
             bool: 初始化是否成功
         """
@@ -96,49 +137,133 @@ class RAGSystem:
         self._initialize_openai_client()
         
         logger.info("✅ RAG系统初始化成功")
+        
+        # 后台预热，不阻塞调用方
+        if self.config.ENABLE_WARMUP if warmup is None else warmup:
+            self.start_warmup()
+        
         return True
     
+    def start_warmup(self):
+        """在后台线程中执行预热"""
+        if self._warmup_thread and self._warmup_thread.is_alive():
+            return
+        self._warmup_thread = threading.Thread(target=self._warmup, name="rag-warmup", daemon=True)
+        self._warmup_thread.start()
+    
+    def _warmup_step(self, name: str, func):
+        """执行单个预热步骤并记录耗时，失败不影响后续步骤"""
+        start = time.time()
+        try:
+            func()
+            self.warmup_status['steps'][name] = round(time.time() - start, 3)
+        except Exception as e:
+            self.warmup_status['steps'][name] = f"失败: {e}"
+            logger.warning(f"⚠️ 预热步骤 {name} 失败: {e}")
+    
+    def _warmup(self):
+        """
+        预热：首次推理、向量索引载入、HTTP连接池建立、（可选）热门问题预计算
+        
+        这些开销原本由启动后的第一个问题承担。
+        """
+        self.warmup_status = {'state': 'running', 'steps': {}}
+        logger.info("🔥 开始后台预热...")
+        start = time.time()
+        
+        # 1. 首次前向推理（算子初始化）
+        self._warmup_step('encode', lambda: self.embedding_model.encode(["预热"]))
+        
+        # 2. 访问集合，让HNSW索引从磁盘载入内存
+        def touch_collection():
+            if self.collection and self.collection.count() > 0:
+                self._search_embedding("预热", 1)
+            if self.chapter_collection and self.chapter_collection.count() > 0:
+                self._search_hierarchical("预热", 1)
+        self._warmup_step('collection', touch_collection)
+        
+        # 3. 预先建立到DeepSeek的TLS连接（连接保留在客户端连接池中）
+        if self.openai_client:
+            self._warmup_step('http', lambda: self.openai_client.models.list())
+        
+        # 4. 预计算热门问题的答案（写入结果缓存）；会调用LLM，需显式开启
+        def precompute_answers():
+            if not self.collection or self.collection.count() == 0:
+                return
+            for question in self.config.PRESET_QUESTIONS:
+                self.query(question, top_k=self.config.DEFAULT_TOP_K)
+        if self.config.WARMUP_HOT_QUESTIONS and self.llm:
+            self._warmup_step('hot_questions', precompute_answers)
+        
+        self.warmup_status['state'] = 'done'
+        self.warmup_status['total_time'] = round(time.time() - start, 3)
+        logger.info(f"🔥 预热完成: {self.warmup_status['total_time']:.2f}s")
+    
     def _initialize_embedding_model(self) -> bool:
-        """初始化嵌入模型"""
+        """初始化嵌入模型（加载到常驻模型注册表并设为当前模型）"""
         logger.info("🤖 正在初始化嵌入模型...")
         
-        # 🎯 优先尝试使用配置的M3E-Base模型
-        if self.config.EMBEDDING_MODEL_NAME == "AI-ModelScope/m3e-base":
+        if self.config.EMBEDDING_OFFLINE:
+            # 必须在导入 sentence_transformers / transformers 之前设置
+            ModelResolver.enable_offline_mode()
+            logger.info("📴 离线模式：只使用本地模型文件")
+        
+        model_name = self.config.EMBEDDING_MODEL_NAME
+        try:
+            self.embedding_model = self.model_registry.load(model_name)
+        except Exception as e:
+            logger.error(f"❌ {e}")
+            return False
+        
+        self.active_model_name = model_name
+        self.collection_name = self._collection_name_for(model_name)
+        self.using_modelscope = model_name in self._modelscope_models
+        return True
+    
+    def _load_embedding_model(self, model_name: str):
+        """
+        按名称加载嵌入模型（本地模型 → 直接加载 → ModelScope镜像）
+        
+        作为常驻模型注册表的加载函数，全部失败时抛出 RuntimeError。
+        """
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError:
+            raise RuntimeError("sentence_transformers 不可用")
+        
+        offline = self.config.EMBEDDING_OFFLINE
+        resolver = ModelResolver(self.config.MODEL_CACHE_DIR, offline=offline)
+        
+        # 🎯 优先使用本地模型（清单缓存 → 本地候选目录）
+        local_model_path = resolver.resolve_local(model_name)
+        if local_model_path:
             try:
-                logger.info(f"🚀 优先尝试加载M3E-Base模型: {self.config.EMBEDDING_MODEL_NAME}")
-                
-                # 尝试两个可能的路径：配置路径和当前目录路径
-                possible_paths = [
-                    os.path.join(self.config.MODEL_CACHE_DIR, "AI-ModelScope", "m3e-base"),  # 配置路径
-                    os.path.join("./models", "AI-ModelScope", "m3e-base"),  # 当前目录路径
-                    os.path.join("models", "AI-ModelScope", "m3e-base")  # 相对路径
-                ]
-                
-                for local_model_path in possible_paths:
-                    if os.path.exists(local_model_path):
-                        logger.info(f"📁 找到本地模型路径: {local_model_path}")
-                        # 使用本地路径加载模型
-                        self.embedding_model = SentenceTransformer(local_model_path)
-                        logger.info(f"✅ M3E-Base模型加载成功: {local_model_path}")
-                        return True
-                
-                logger.warning("⚠️ 未找到本地M3E-Base模型文件")
-                    
+                load_start = time.perf_counter()
+                logger.info(f"📁 找到本地模型路径: {local_model_path}")
+                model = SentenceTransformer(local_model_path)
+                logger.info(f"✅ 本地模型加载成功: {local_model_path} ({time.perf_counter() - load_start:.2f}s)")
+                return model
             except Exception as e:
-                logger.warning(f"⚠️ M3E-Base模型加载失败: {e}")
+                logger.warning(f"⚠️ 本地模型加载失败: {e}")
+        
+        if offline:
+            raise RuntimeError(f"离线模式下未找到可用的本地模型: {model_name}")
         
         # 尝试直接加载其他配置的嵌入模型
         try:
-            logger.info(f"🚀 尝试直接加载配置的嵌入模型: {self.config.EMBEDDING_MODEL_NAME}")
+            logger.info(f"🚀 尝试直接加载配置的嵌入模型: {model_name}")
+            load_start = time.perf_counter()
             
             # 尝试加载配置的嵌入模型
-            self.embedding_model = SentenceTransformer(
-                self.config.EMBEDDING_MODEL_NAME,
+            model = SentenceTransformer(
+                model_name,
                 cache_folder=self.config.MODEL_CACHE_DIR
             )
             
-            logger.info(f"✅ 嵌入模型加载成功: {self.config.EMBEDDING_MODEL_NAME}")
-            return True
+            logger.info(f"✅ 嵌入模型加载成功: {model_name} ({time.perf_counter() - load_start:.2f}s)")
+            # 记录下载后的本地路径，下次启动直接加载
+            resolver.resolve_local(model_name)
+            return model
             
         except Exception as e:
             logger.warning(f"⚠️ 配置的嵌入模型直接加载失败: {e}")
@@ -147,6 +272,8 @@ class RAGSystem:
         if MODELSCOPE_AVAILABLE:
             try:
                 logger.info("🚀 尝试使用ModelScope镜像源...")
+                from modelscope import snapshot_download
+                load_start = time.perf_counter()
                 
                 # 中文嵌入模型
                 model_id = 'iic/nlp_gte_sentence-embedding_chinese-small'
@@ -156,16 +283,91 @@ class RAGSystem:
                 logger.info(f"✅ 模型下载成功: {model_dir}")
                 
                 # 加载模型
-                self.embedding_model = SentenceTransformer(model_dir)
-                self.using_modelscope = True
-                logger.info("✅ ModelScope嵌入模型加载成功")
-                return True
+                model = SentenceTransformer(model_dir)
+                self._modelscope_models.add(model_name)
+                # 按配置的模型名称记录，下次启动时 resolve_local(model_name) 直接命中清单
+                resolver.record(model_name, model_dir, source=model_id)
+                logger.info(f"✅ ModelScope嵌入模型加载成功 ({time.perf_counter() - load_start:.2f}s)")
+                return model
                 
             except Exception as e:
                 logger.warning(f"⚠️ ModelScope加载失败: {e}")
         
-        logger.error("❌ 所有嵌入模型加载失败")
-        return False
+        raise RuntimeError(f"所有嵌入模型加载失败: {model_name}")
+    
+    def _collection_name_for(self, model_name: str) -> str:
+        """
+        模型对应的文本块集合名称，不同模型的向量各自存放
+        
+        默认模型沿用 COLLECTION_NAME（兼容已有的向量库），
+        其他模型在其后追加模型名称和哈希（ChromaDB 集合名只允许字母、数字、._-）。
+        """
+        if model_name == type(self.config).EMBEDDING_MODEL_NAME:
+            return self.config.COLLECTION_NAME
+        slug = re.sub(r"[^a-zA-Z0-9]+", "-", model_name.split("/")[-1]).strip("-").lower()[:32]
+        digest = hashlib.sha1(model_name.encode("utf-8")).hexdigest()[:8]
+        return f"{self.config.COLLECTION_NAME}_{slug}_{digest}"
+    
+    def switch_model(self, model_name: str, background: bool = True) -> str:
+        """
+        切换嵌入模型
+        
+        模型已常驻时立即切换到其对应集合；否则在后台加载，加载期间当前模型继续服务，
+        加载完成后自动切换（期间若又切换到其他模型则不再切换）。
+        
+        Args:
+            model_name: 模型名称
+            background: 模型未常驻时是否后台加载，False 时同步加载
+        
+        Returns:
+            str: 'active' 已切换，'loading' 正在后台加载
+        """
+        self._pending_model = model_name
+        if model_name == self.active_model_name:
+            return 'active'
+        
+        if self.model_registry.is_resident(model_name) or not background:
+            self.model_registry.load(model_name, keep=(self.active_model_name,))
+            self._activate_model(model_name)
+            return 'active'
+        
+        self.model_registry.load_async(model_name, keep=(self.active_model_name,),
+                                       on_ready=self._on_model_ready)
+        logger.info(f"⏳ 后台加载模型: {model_name}，当前模型 {self.active_model_name} 继续服务")
+        return 'loading'
+    
+    def _on_model_ready(self, model_name: str):
+        """后台加载完成回调：仍是最近一次请求的模型时才切换"""
+        if self._pending_model == model_name:
+            try:
+                self._activate_model(model_name)
+            except Exception as e:
+                logger.error(f"❌ 切换模型失败: {model_name}: {e}")
+    
+    def _activate_model(self, model_name: str):
+        """把常驻模型设为当前模型：先连接其集合，再一次性替换，查询不会看到不匹配的模型和集合"""
+        with self._switch_lock:
+            model = self.model_registry.get(model_name)
+            if model is None:
+                raise RuntimeError(f"模型未常驻: {model_name}")
+            collection_name = self._collection_name_for(model_name)
+            collection, chapter_collection = self._open_collections(collection_name)
+            
+            self.embedding_model = model
+            self.collection_name = collection_name
+            self.collection = collection
+            self.chapter_collection = chapter_collection
+            self.active_model_name = model_name
+            self.using_modelscope = model_name in self._modelscope_models
+            self._seen_index_version = None
+        logger.info(f"🔀 已切换嵌入模型: {model_name} (集合 {collection_name}, {collection.count()} 条文档)")
+    
+    def get_model_status(self) -> Dict[str, Any]:
+        """当前模型、常驻模型及后台加载状态"""
+        status = self.model_registry.status()
+        status['active'] = self.active_model_name
+        status['pending'] = self._pending_model
+        return status
     
     def _initialize_vector_db(self) -> bool:
         """初始化向量数据库"""
@@ -175,6 +377,8 @@ class RAGSystem:
         
         try:
             logger.info("🗄️ 正在初始化ChromaDB...")
+            import chromadb
+            from chromadb.config import Settings
             
             # 创建ChromaDB客户端
             self.chroma_client = chromadb.PersistentClient(
@@ -185,18 +389,8 @@ class RAGSystem:
                 )
             )
             
-            # 获取或创建集合
-            try:
-                self.collection = self.chroma_client.get_collection(
-                    name=self.config.COLLECTION_NAME
-                )
-                logger.info(f"✅ 已连接到现有集合: {self.config.COLLECTION_NAME}")
-            except:
-                self.collection = self.chroma_client.create_collection(
-                    name=self.config.COLLECTION_NAME,
-                    metadata={"hnsw:space": "cosine"}
-                )
-                logger.info(f"✅ 创建新集合: {self.config.COLLECTION_NAME}")
+            # 获取或创建当前模型的集合
+            self.collection, self.chapter_collection = self._open_collections(self.collection_name)
             
             return True
             
@@ -204,6 +398,63 @@ class RAGSystem:
             logger.error(f"❌ ChromaDB初始化失败: {e}")
             return False
     
+    def _open_collections(self, collection_name: str) -> tuple:
+        """获取或创建文本块集合及其章节级集合"""
+        if self.config.VECTOR_STORAGE != "chroma":
+            collection = self._create_quantized_collection(collection_name)
+            logger.info(f"✅ 使用量化向量存储: {self.config.VECTOR_STORAGE} ({collection.count()} 条文档)")
+        else:
+            collection = self._connect_chroma_collection(collection_name)
+        
+        # 章节级索引（分层检索的粗排阶段）
+        chapter_collection = self.chroma_client.get_or_create_collection(
+            name=self._chapter_collection_name(collection_name),
+            metadata=self._collection_metadata()
+        )
+        return collection, chapter_collection
+    
+    def _create_quantized_collection(self, collection_name: str) -> QuantizedCollection:
+        """创建（或加载）量化向量集合"""
+        return QuantizedCollection(
+            os.path.join(self.config.CHROMA_PERSIST_DIR, f"{collection_name}_{self.config.VECTOR_STORAGE}"),
+            mode=self.config.VECTOR_STORAGE,
+            rescore_factor=self.config.QUANTIZED_RESCORE_FACTOR
+        )
+    
+    def _connect_chroma_collection(self, collection_name: str):
+        """连接或创建ChromaDB文本块集合"""
+        try:
+            collection = self.chroma_client.get_collection(
+                    name=collection_name
+            )
+            logger.info(f"✅ 已连接到现有集合: {collection_name}")
+            self._check_hnsw_params(collection)
+        except:
+            collection = self.chroma_client.create_collection(
+                name=collection_name,
+                metadata=self._collection_metadata()
+            )
+            logger.info(f"✅ 创建新集合: {collection_name}")
+        return collection
+    
+    @property
+    def openai_client(self):
+        """OpenAI 兼容客户端；赋值时（包括替换为桩客户端）同时创建带超时和重试的 GenerationClient"""
+        return self._openai_client
+    
+    @openai_client.setter
+    def openai_client(self, client):
+        self._openai_client = client
+        self.llm = None
+        if client:
+            # llm_client 在配置客户端时才导入（httpx / tenacity 在其中按需导入）
+            from llm_client import GenerationClient
+            self.llm = GenerationClient(client, self.config,
+                                        on_retry=lambda e: self.metrics.increment('llm_retries_total'))
+        # 缓存的回答由之前的客户端（或抽取式回答）生成，更换客户端后不再使用
+        if hasattr(self, 'result_cache'):
+            self.result_cache.clear()
+    
     def _initialize_openai_client(self):
         """初始化OpenAI客户端（可选）"""
         if not OPENAI_AVAILABLE:
@@ -216,9 +467,14 @@ class RAGSystem:
         
         try:
             if self.config.DEEPSEEK_API_KEY and self.config.DEEPSEEK_API_KEY != "sk-YOUR-API-KEY":
+                import openai
+                from llm_client import build_http_client
+                # 重试由 GenerationClient 按截止时间控制，客户端自身不再重试
                 self.openai_client = openai.OpenAI(
                     api_key=self.config.DEEPSEEK_API_KEY,
-                    base_url=self.config.DEEPSEEK_BASE_URL
+                    base_url=self.config.DEEPSEEK_BASE_URL,
+                    http_client=build_http_client(self.config),
+                    max_retries=0
                 )
                 logger.info("✅ DeepSeek客户端初始化成功")
             else:
@@ -226,7 +482,237 @@ class RAGSystem:
         except Exception as e:
             logger.warning(f"⚠️ DeepSeek客户端初始化失败: {e}")
     
-    def load_and_index_data(self, data_file: str, max_documents: int = 1000, force_reload: bool = False) -> bool:
+    # ChromaDB 未在元数据中指定HNSW参数时使用的默认值（无法读取集合实际配置时使用）
+    _CHROMA_HNSW_DEFAULTS = {"hnsw:space": "l2", "hnsw:M": 16, "hnsw:construction_ef": 100, "hnsw:search_ef": 10}
+    # 集合实际配置（configuration_json['hnsw']）中对应的字段
+    _HNSW_CONFIG_FIELDS = {"hnsw:space": "space", "hnsw:M": "max_neighbors",
+                           "hnsw:construction_ef": "ef_construction", "hnsw:search_ef": "ef_search"}
+    
+    def _check_hnsw_params(self, collection):
+        """
+        比较现有集合的实际HNSW参数与配置
+        
+        search_ef 可直接修改；其余参数只在建索引时生效，不一致时提示（每个集合只提示一次）需强制重新加载数据。
+        """
+        hnsw_config = (getattr(collection, "configuration_json", None) or {}).get("hnsw") or {}
+        metadata = collection.metadata or {}
+        rebuild = []
+        for key, expected in self._collection_metadata().items():
+            field = self._HNSW_CONFIG_FIELDS[key]
+            current = hnsw_config.get(field, metadata.get(key, self._CHROMA_HNSW_DEFAULTS[key]))
+            if current == expected:
+                continue
+            if key == "hnsw:search_ef":
+                try:
+                    collection.modify(configuration={"hnsw": {"ef_search": expected}})
+                    logger.info(f"🔧 集合 {collection.name} 的 search_ef 已由 {current} 调整为 {expected}")
+                    continue
+                except Exception as e:
+                    logger.debug("修改 search_ef 失败: %s", e)
+            rebuild.append(f"{key.split(':')[1]}={current}（配置 {expected}）")
+        
+        if rebuild and collection.name not in self._hnsw_warned:
+            self._hnsw_warned.add(collection.name)
+            logger.warning(f"⚠️ 集合 {collection.name} 的HNSW参数 {', '.join(rebuild)} 与配置不一致，"
+                           f"强制重新加载数据（重建索引）后生效")
+    
+    def _collection_metadata(self) -> Dict[str, Any]:
+        """创建集合时使用的HNSW索引参数"""
+        return {
+            "hnsw:space": self.config.HNSW_SPACE,
+            "hnsw:M": self.config.HNSW_M,
+            "hnsw:construction_ef": self.config.HNSW_CONSTRUCTION_EF,
+            "hnsw:search_ef": self.config.HNSW_SEARCH_EF
+        }
+    
+    def _chapter_collection_name(self, collection_name: Optional[str] = None) -> str:
+        """章节级索引的集合名称（默认为当前模型的集合）"""
+        return f"{collection_name or self.collection_name}_chapters"
+    
+    def _reset_collection(self):
+        """删除并重建集合（强制重新加载时使用）"""
+        try:
+            if isinstance(self.collection, QuantizedCollection):
+                self.collection.reset()
+            else:
+                self.chroma_client.delete_collection(self.collection_name)
+                self.collection = self.chroma_client.create_collection(
+                    name=self.collection_name,
+                    metadata=self._collection_metadata()
+                )
+            try:
+                self.chroma_client.delete_collection(self._chapter_collection_name())
+            except Exception:
+                pass
+            self.chapter_collection = self.chroma_client.create_collection(
+                name=self._chapter_collection_name(),
+                metadata=self._collection_metadata()
+            )
+            self._bump_index_version(self.collection_name)
+            logger.info("🗑️ 已清空现有数据")
+        except Exception as e:
+            logger.warning(f"⚠️ 清空数据失败: {e}")
+    
+    def start_index_job(self, data_file: Optional[str] = None, max_documents: int = 1000,
+                        force_reload: bool = False, directory: bool = False) -> IndexJob:
+        """
+        在后台线程中加载和索引数据
+        
+        任务写入临时集合，全部写完后才替换当前集合，期间查询继续使用原集合；
+        取消或失败时丢弃临时集合。同一时间只允许一个任务。
+        
+        Args:
+            data_file: 数据文件路径（directory 为 False 时使用）
+            max_documents: 最大文档数量（目录模式下为每个文件）
+            force_reload: 是否强制重新加载
+            directory: 是否加载 Config.DATA_DIR 下的全部文件
+        
+        Returns:
+            IndexJob: 任务对象，可查询进度或取消
+        """
+        with self._index_job_lock:
+            if self.index_job and self.index_job.is_running():
+                raise RuntimeError(f"已有索引任务在运行: {self.index_job.id}")
+            job = IndexJob(self.config.DATA_DIR if directory else data_file)
+            # 固定任务使用的模型和集合，任务期间切换模型不会混用两个模型的向量
+            with self._switch_lock:
+                job.encoder = self.embedding_model
+                job.collection_name = self.collection_name
+            job.staging_name = f"{job.collection_name}_staging"
+            self.index_job = job
+        
+        if directory:
+            job.start(lambda job: self.load_and_index_directory(
+                max_documents=max_documents, force_reload=force_reload, job=job))
+        else:
+            job.start(lambda job: self.load_and_index_data(
+                data_file, max_documents=max_documents, force_reload=force_reload, job=job))
+        logger.info(f"📋 已启动后台索引任务 {job.id}: {job.description}")
+        return job
+    
+    def _index_into_staging(self, chunks: List[str], metadatas: List[Dict], ids: List[str], job: IndexJob) -> bool:
+        """写入临时集合，成功后替换任务的目标集合；失败或取消时删除临时集合"""
+        staging_name = job.staging_name
+        committed = False
+        try:
+            self._drop_collections(staging_name)
+            job.collection, job.chapter_collection = self._open_collections(staging_name)
+            if not self._index_chunks(chunks, metadatas, ids, job):
+                return False
+            job.set_stage('committing')
+            self._commit_staging(staging_name, job.collection_name)
+            committed = True
+            return True
+        finally:
+            job.collection = job.chapter_collection = None
+            if not committed:
+                self._drop_collections(staging_name)
+    
+    def _commit_staging(self, staging_name: str, name: str):
+        """
+        用临时集合替换名为 name 的集合
+        
+        先把原集合改名，再把临时集合改为正式名称，最后删除旧集合；
+        name 仍是当前模型的集合时切换引用，切换前已开始的查询仍可读取旧集合。
+        期间已切换到其他模型时只替换集合，切回该模型时使用新索引。
+        """
+        with self._switch_lock:
+            retired_name = f"{name}_retired"
+            self._drop_collections(retired_name)
+            if self.config.VECTOR_STORAGE != "chroma":
+                path = lambda n: os.path.join(self.config.CHROMA_PERSIST_DIR, f"{n}_{self.config.VECTOR_STORAGE}")
+                if os.path.exists(path(name)):
+                    os.replace(path(name), path(retired_name))
+                os.replace(path(staging_name), path(name))
+            else:
+                if self._collection_exists(name):
+                    self.chroma_client.get_collection(name).modify(name=retired_name)
+                self.chroma_client.get_collection(staging_name).modify(name=name)
+            if self._collection_exists(self._chapter_collection_name(name)):
+                self.chroma_client.get_collection(self._chapter_collection_name(name)).modify(
+                    name=self._chapter_collection_name(retired_name))
+            self.chroma_client.get_collection(self._chapter_collection_name(staging_name)).modify(
+                name=self._chapter_collection_name(name))
+            
+            if name == self.collection_name:
+                self.collection, self.chapter_collection = self._open_collections(name)
+            self._drop_collections(retired_name)
+            self._bump_index_version(name)
+        logger.info(f"🔁 已提交新索引: {name}")
+    
+    def _collection_exists(self, name: str) -> bool:
+        try:
+            self.chroma_client.get_collection(name)
+            return True
+        except Exception:
+            return False
+    
+    def _drop_collections(self, collection_name: str):
+        """删除文本块集合（或量化存储目录）及其章节集合，不存在时忽略"""
+        if self.config.VECTOR_STORAGE != "chroma":
+            shutil.rmtree(os.path.join(self.config.CHROMA_PERSIST_DIR,
+                                       f"{collection_name}_{self.config.VECTOR_STORAGE}"), ignore_errors=True)
+        for name in (collection_name, self._chapter_collection_name(collection_name)):
+            if self._collection_exists(name):
+                self.chroma_client.delete_collection(name)
+    
+    def _index_version_path(self, collection_name: str) -> str:
+        return os.path.join(self.config.CHROMA_PERSIST_DIR, f"{collection_name}.version")
+    
+    def _bump_index_version(self, collection_name: str):
+        """
+        为集合写入新的索引版本（持久化到向量库目录），之前缓存的问答结果不再命中
+        
+        版本保存在文件中而不是进程内，其他进程（其他 worker、命令行脚本）重新索引后同样失效。
+        """
+        version = uuid.uuid4().hex
+        path = self._index_version_path(collection_name)
+        tmp = f"{path}.{version}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(version)
+        os.replace(tmp, path)
+        if collection_name == self.collection_name:
+            self._seen_index_version = version
+        logger.debug("索引版本 %s: %s", collection_name, version)
+    
+    @property
+    def index_version(self) -> str:
+        """当前集合的索引版本（每次读取文件，集合从未索引过时为空字符串）"""
+        try:
+            with open(self._index_version_path(self.collection_name), "r", encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            return ""
+    
+    def _sync_index_version(self) -> str:
+        """
+        读取当前集合的索引版本；与本进程上次看到的不同时（其他进程重新索引并替换了集合），
+        重新连接集合，避免继续使用已删除的集合
+        """
+        version = self.index_version
+        if version != self._seen_index_version:
+            if self._seen_index_version is not None and self.chroma_client is not None:
+                with self._switch_lock:
+                    self.collection, self.chapter_collection = self._open_collections(self.collection_name)
+                logger.info(f"🔄 索引已被其他进程更新，重新连接集合: {self.collection_name}")
+            self._seen_index_version = version
+        return version
+    
+    def _has_indexed_data(self) -> bool:
+        """检查集合中是否已有数据"""
+        if not self.collection:
+            return False
+        try:
+            count = self.collection.count()
+            if count > 0:
+                logger.info(f"✅ 数据已存在 ({count} 条文档)")
+                return True
+        except:
+            pass
+        return False
+    
+    def load_and_index_data(self, data_file: str, max_documents: int = 1000, force_reload: bool = False,
+                            job: Optional[IndexJob] = None) -> bool:
         """
         加载和索引数据
         
@@ -234,6 +720,7 @@ class RAGSystem:
             data_file: 数据文件路径
             max_documents: 最大文档数量
             force_reload: 是否强制重新加载
+            job: 后台索引任务，指定时写入临时集合，完成后替换当前集合
         
         Returns:
             bool: 是否成功
@@ -241,70 +728,130 @@ class RAGSystem:
         logger.info(f"📚 开始加载数据: {data_file}")
         
         # 检查是否需要重新加载
-        if not force_reload and self.collection:
-            try:
-                count = self.collection.count()
-                if count > 0:
-                    logger.info(f"✅ 数据已存在 ({count} 条文档)")
-                    return True
-            except:
-                pass
+        if not force_reload and self._has_indexed_data():
+            return True
         
-        # 清空现有数据（如果强制重新加载）
-        if force_reload and self.collection:
-            try:
-                self.chroma_client.delete_collection(self.config.COLLECTION_NAME)
-                self.collection = self.chroma_client.create_collection(
-                    name=self.config.COLLECTION_NAME,
-                    metadata={"hnsw:space": "cosine"}
+        # 清空现有数据（如果强制重新加载；后台任务不清空，提交时整体替换）
+        if force_reload and self.collection and job is None:
+            self._reset_collection()
+        
+        with MemoryMonitor() as memory:
+            if job:
+                job.set_stage('chunking')
+            with span("rag.chunking", file=data_file) as s:
+                file_result = build_novel_chunks(
+                    data_file,
+                    max_documents,
+                    self.config.MAX_CHUNK_SIZE,
+                    self.config.CHUNK_OVERLAP
                 )
-                logger.info("🗑️ 已清空现有数据")
-            except Exception as e:
-                logger.warning(f"⚠️ 清空数据失败: {e}")
+                s.set_attribute("chunk_count", len(file_result['chunks']))
+            if not file_result['documents']:
+                logger.error("❌ 数据加载失败")
+                return False
+            
+            success = self._index_file_results([file_result], job)
+        
+        self._record_ingest_memory(memory)
+        return success
+    
+    def load_and_index_directory(self, data_dir: Optional[str] = None, max_documents: int = 1000,
+                                 force_reload: bool = False, max_workers: Optional[int] = None,
+                                 job: Optional[IndexJob] = None) -> bool:
+        """
+        并行加载和索引数据目录下的所有文本文件
+        
+        每个文件在独立的子进程中完成章节分割、清理和分块，
+        文档ID按来源文件命名空间区分，可写入同一个集合。
         
-        # 加载原始数据
-        raw_data = load_toutiao_data(data_file, max_documents)
-        if not raw_data:
-            logger.error("❌ 数据加载失败")
+        Args:
+            data_dir: 数据目录，默认使用 Config.DATA_DIR
+            max_documents: 每个文件的最大文档数量
+            force_reload: 是否强制重新加载
+            max_workers: 并行进程数，默认按文件数和CPU核数确定
+            job: 后台索引任务，指定时写入临时集合，完成后替换当前集合
+        
+        Returns:
+            bool: 是否成功
+        """
+        data_dir = data_dir or self.config.DATA_DIR
+        data_files = sorted(glob.glob(os.path.join(data_dir, self.config.DATA_FILE_PATTERN)))
+        if not data_files:
+            logger.error(f"❌ 数据目录中没有匹配的文件: {data_dir}/{self.config.DATA_FILE_PATTERN}")
             return False
         
-        logger.info(f"📖 加载了 {len(raw_data)} 条原始数据")
+        logger.info(f"📚 开始加载数据目录: {data_dir} ({len(data_files)} 个文件)")
+        
+        # 检查是否需要重新加载
+        if not force_reload and self._has_indexed_data():
+            return True
+        
+        # 清空现有数据（如果强制重新加载；后台任务不清空，提交时整体替换）
+        if force_reload and self.collection and job is None:
+            self._reset_collection()
+        
+        max_workers = max_workers or self.config.INGEST_MAX_WORKERS or os.cpu_count() or 1
+        max_workers = max(1, min(max_workers, len(data_files)))
         
-        # 处理和分块数据
+        # 并行分块，结果按文件名顺序合并，保证索引顺序稳定
+        # （内存统计只包含当前进程，分块子进程的占用不计入）
+        with MemoryMonitor() as memory:
+            if job:
+                job.set_stage('chunking', total=len(data_files))
+            chunk_start = time.time()
+            with span("rag.chunking", file_count=len(data_files), workers=max_workers) as s, \
+                    ProcessPoolExecutor(max_workers=max_workers) as executor:
+                file_results = list(executor.map(
+                    build_novel_chunks,
+                    data_files,
+                    [max_documents] * len(data_files),
+                    [self.config.MAX_CHUNK_SIZE] * len(data_files),
+                    [self.config.CHUNK_OVERLAP] * len(data_files)
+                ))
+                s.set_attribute("chunk_count", sum(len(r['chunks']) for r in file_results))
+            logger.info(f"⏱️ 并行分块完成: {time.time() - chunk_start:.2f}s ({max_workers} 个进程)")
+            
+            file_results = [r for r in file_results if r['documents']]
+            if not file_results:
+                logger.error("❌ 数据加载失败")
+                return False
+            
+            success = self._index_file_results(file_results, job)
+        
+        self._record_ingest_memory(memory)
+        return success
+    
+    def _record_ingest_memory(self, memory: MemoryMonitor):
+        """把一次入库期间的RSS变化写入 last_index_stats"""
+        self.last_index_stats.update({
+            'rss_before_bytes': memory.start_bytes,
+            'peak_rss_bytes': memory.peak_bytes,
+            'rss_after_bytes': memory.end_bytes
+        })
+        if memory.peak_bytes:
+            logger.info("🧠 入库内存: 开始 %.0fMB, 峰值 %.0fMB, 结束 %.0fMB",
+                        (memory.start_bytes or 0) / 2**20, memory.peak_bytes / 2**20,
+                        (memory.end_bytes or 0) / 2**20)
+    
+    def _index_file_results(self, file_results: List[Dict[str, Any]], job: Optional[IndexJob] = None) -> bool:
+        """合并各文件的分块结果并写入向量库（后台任务写入临时集合后提交）"""
         all_chunks = []
         all_metadatas = []
         all_ids = []
         
-        for i, item in enumerate(raw_data):
-            # 清理文本
-            content = clean_text(item.get('content', ''))
-            title = clean_text(item.get('title', ''))
+        for file_result in file_results:
+            logger.info("📖 %s: 加载了 %d 条原始数据, %d 个文本块",
+                        file_result['source'], file_result['documents'], len(file_result['chunks']))
             
-            if not content:
-                continue
-            
-            # 分块处理
-            chunks = split_text_by_sentences(
-                content, 
-                self.config.MAX_CHUNK_SIZE, 
-                self.config.CHUNK_OVERLAP
-            )
+            # 逐块预览只在DEBUG级别按间隔抽样输出
+            if logger.isEnabledFor(logging.DEBUG):
+                for i, chunk in enumerate(file_result['chunks']):
+                    log_sampled(logger, i, self.config.LOG_SAMPLE_EVERY, "文本块样例 %s#%d: %.100s",
+                                file_result['source'], i, chunk)
             
-            for j, chunk in enumerate(chunks):
-                if len(chunk.strip()) < 20:  # 跳过太短的块
-                    continue
-                
-                chunk_id = f"doc_{i}_chunk_{j}"
-                logger.info("✅ 文本块: "+chunk[0:100])
-                all_chunks.append(chunk)
-                all_metadatas.append({
-                    'title': title,
-                    'category': item.get('category', ''),
-                    'keywords': item.get('keywords', ''),
-                    'doc_id': i,
-                    'chunk_id': j
-                })
-                all_ids.append(chunk_id)
+            all_chunks.extend(file_result['chunks'])
+            all_metadatas.extend(file_result['metadatas'])
+            all_ids.extend(file_result['ids'])
         
         if not all_chunks:
             logger.error("❌ 没有有效的文本块")
@@ -312,163 +859,724 @@ class RAGSystem:
         
         logger.info(f"📝 生成了 {len(all_chunks)} 个文本块")
         
+        # 近重复去重（在生成嵌入向量前执行）
+        removed, dedup_time = 0, 0.0
+        if self.config.ENABLE_DEDUP:
+            if job:
+                job.set_stage('dedup', total=len(all_chunks))
+            dedup_start = time.time()
+            deduplicator = MinHashDeduplicator(
+                threshold=self.config.DEDUP_THRESHOLD,
+                num_perm=self.config.DEDUP_NUM_PERM,
+                shingle_size=self.config.DEDUP_SHINGLE_SIZE
+            )
+            with span("rag.dedup", chunk_count=len(all_chunks)) as s:
+                # 只在同一章节内去重：跨章节剔除会让后面的章节在按章节过滤和分层检索时丢失这段文字
+                deduped = deduplicator.deduplicate(all_chunks, all_metadatas, all_ids, scope_keys=('source', 'doc_id'))
+                s.set_attribute("removed", deduped['removed'])
+            all_chunks, all_metadatas, all_ids = deduped['chunks'], deduped['metadatas'], deduped['ids']
+            removed = deduped['removed']
+            dedup_time = time.time() - dedup_start
+            logger.info(f"🧹 近重复去重: 剔除 {removed} 个文本块，剩余 {len(all_chunks)} 个 ({dedup_time:.2f}s)")
+        
         # 索引数据
-        return self._index_chunks(all_chunks, all_metadatas, all_ids)
+        if job:
+            success = self._index_into_staging(all_chunks, all_metadatas, all_ids, job)
+        else:
+            success = self._index_chunks(all_chunks, all_metadatas, all_ids)
+        
+        if success:
+            embed_time = self.last_index_stats.get('embed_time', 0.0)
+            # 按实际嵌入吞吐估算被剔除文本块节省的时间
+            embed_seconds_saved = removed * embed_time / len(all_chunks) if all_chunks else 0.0
+            self.last_index_stats.update({
+                'duplicates_removed': removed,
+                'dedup_time': dedup_time,
+                'embed_seconds_saved': embed_seconds_saved
+            })
+            if removed:
+                logger.info(f"💡 去重节省 {removed} 次嵌入计算，约 {embed_seconds_saved:.2f}s")
+        
+        return success
     
-    def _index_chunks(self, chunks: List[str], metadatas: List[Dict], ids: List[str]) -> bool:
-        """索引文本块"""
+    def _index_chunks(self, chunks: List[str], metadatas: List[Dict], ids: List[str],
+                      job: Optional[IndexJob] = None) -> bool:
+        """索引文本块（指定 job 时写入任务的临时集合并汇报进度）"""
         try:
             # 使用嵌入模型
             logger.info("🧮 正在生成嵌入向量...")
+            if job:
+                job.set_stage('embedding', total=len(chunks))
             
-            # 批量生成嵌入向量
-            batch_size = 32
-            embeddings = []
-            
-            for i in range(0, len(chunks), batch_size):
-                batch_chunks = chunks[i:i + batch_size]
-                batch_embeddings = self.embedding_model.encode(
-                    batch_chunks,
-                    convert_to_tensor=False,
-                    show_progress_bar=True
-                )
-                embeddings.extend(batch_embeddings.tolist())
+            index_start = time.time()
+            streaming = self._should_stream(len(chunks), job.encoder if job else None)
+            if streaming:
+                embed_time, embedding_bytes = self._index_chunks_streaming(chunks, metadatas, ids, job)
+            else:
+                with span("rag.embed_chunks", chunk_count=len(chunks)):
+                    embeddings = self._encode_chunks(chunks, job=job)
+                embed_time = time.time() - index_start
+                embedding_bytes = int(embeddings.nbytes)
+                
+                logger.info("💾 正在存储到向量数据库...")
+                self._write_embeddings(embeddings, chunks, metadatas, ids, job.collection if job else None)
                 
-                if i % (batch_size * 10) == 0:
-                    logger.info(f"📊 已处理 {min(i + batch_size, len(chunks))}/{len(chunks)} 个文本块")
+                # 构建章节级索引
+                chapter_sums: Dict[tuple, list] = {}
+                self._accumulate_chapter_sums(chapter_sums, embeddings, metadatas)
+                del embeddings
+                self._write_chapter_centroids(chapter_sums, job.chapter_collection if job else None)
             
-            # 存储到ChromaDB
-            logger.info("💾 正在存储到向量数据库...")
-            self.collection.add(
-                embeddings=embeddings,
-                documents=chunks,
-                metadatas=metadatas,
-                ids=ids
-            )
+            # 量化存储的新数据在内存中累积，入库结束时一次性追加到磁盘
+            collection = job.collection if job else self.collection
+            if isinstance(collection, QuantizedCollection):
+                collection.flush()
+            
+            self.last_index_stats = {
+                'chunks_indexed': len(chunks),
+                'embed_time': embed_time,
+                'embedding_bytes': embedding_bytes,
+                'streaming': streaming
+            }
+            index_time = time.time() - index_start
+            self.metrics.increment('indexed_chunks_total', len(chunks))
+            if index_time > 0:
+                self.metrics.observe('index_chunks_per_second', len(chunks) / index_time)
+            
+            # 索引已变化，缓存的问答结果失效（后台任务在提交时递增）
+            if job is None:
+                self._bump_index_version(self.collection_name)
             
             logger.info("✅ 向量索引完成")
             return True
                 
+        except IndexJobCancelled:
+            raise
         except Exception as e:
             logger.error(f"❌ 索引失败: {e}")
+            if job:
+                job.error = str(e)
             return False
     
-    def search(self, query: str, top_k: int = 5) -> List[Dict[str, Any]]:
+    def _write_embeddings(self, embeddings: np.ndarray, chunks: List[str], metadatas: List[Dict], ids: List[str],
+                          collection=None):
+        """
+        写入向量库（默认当前集合）：直接传递 float32 数组切片（视图，不复制），
+        ChromaDB 单次写入有数量上限，按上限分批
+        """
+        collection = collection or self.collection
+        if isinstance(collection, QuantizedCollection):
+            write_batch = len(chunks)
+        else:
+            write_batch = self.chroma_client.get_max_batch_size()
+        for i in range(0, len(chunks), write_batch):
+            with span("rag.store_write", offset=i, batch_size=len(ids[i:i + write_batch])):
+                collection.add(
+                    embeddings=embeddings[i:i + write_batch],
+                    documents=chunks[i:i + write_batch],
+                    metadatas=metadatas[i:i + write_batch],
+                    ids=ids[i:i + write_batch]
+                )
+    
+    def _memory_budget_bytes(self) -> Optional[int]:
+        budget_mb = self.config.MEMORY_BUDGET_MB
+        return int(budget_mb * 1024 * 1024) if budget_mb else None
+    
+    def _embedding_dimension(self, encoder=None) -> int:
+        get_dimension = getattr(encoder or self.embedding_model, 'get_sentence_embedding_dimension', None)
+        return (get_dimension() if get_dimension else None) or 768
+    
+    def _should_stream(self, chunk_count: int, encoder=None) -> bool:
+        """
+        设置了内存预算时，估算一次性编码的峰值（当前RSS + 嵌入矩阵及写入时的副本），
+        接近预算则改为分段编码、边编码边写入
+        """
+        budget = self._memory_budget_bytes()
+        rss = process_rss_bytes()
+        if budget is None or rss is None:
+            return False
+        estimate = rss + chunk_count * self._embedding_dimension(encoder) * 4 * 2
+        if estimate <= budget * self.config.MEMORY_BUDGET_HEADROOM:
+            return False
+        logger.info("🧠 预计内存 %.0fMB 接近预算 %.0fMB，改为分段流式入库",
+                    estimate / 2**20, budget / 2**20)
+        return True
+    
+    def _index_chunks_streaming(self, chunks: List[str], metadatas: List[Dict], ids: List[str],
+                                job: Optional[IndexJob] = None) -> tuple:
+        """
+        内存预算模式：每次编码 MEMORY_STREAM_BATCH 个文本块并立即写入（量化存储逐段追加），不保留完整的嵌入矩阵；
+        RSS 超过预算阈值时把编码批大小减半（不低于 MEMORY_MIN_EMBED_BATCH）
+        
+        Returns:
+            (嵌入耗时, 单段嵌入矩阵的最大字节数)
+        """
+        budget = self._memory_budget_bytes()
+        step = self.config.MEMORY_STREAM_BATCH
+        batch_size = 32
+        embed_time, embedding_bytes = 0.0, 0
+        chapter_sums: Dict[tuple, list] = {}
+        progress = ProgressReporter(logger, "流式入库", total=len(chunks), interval=self.config.LOG_PROGRESS_INTERVAL)
+        
+        for start in range(0, len(chunks), step):
+            rss = process_rss_bytes()
+            if rss is not None and rss > budget * self.config.MEMORY_BUDGET_HEADROOM \
+                    and batch_size > self.config.MEMORY_MIN_EMBED_BATCH:
+                batch_size = max(self.config.MEMORY_MIN_EMBED_BATCH, batch_size // 2)
+                logger.warning("⚠️ RSS %.0fMB 接近内存预算，编码批大小降为 %d", rss / 2**20, batch_size)
+            
+            segment = slice(start, start + step)
+            embed_start = time.time()
+            with span("rag.embed_chunks", chunk_count=len(chunks[segment]), streaming=True):
+                embeddings = self._encode_chunks(chunks[segment], batch_size, progress=progress, job=job)
+            embed_time += time.time() - embed_start
+            embedding_bytes = max(embedding_bytes, int(embeddings.nbytes))
+            
+            collection = job.collection if job else self.collection
+            self._write_embeddings(embeddings, chunks[segment], metadatas[segment], ids[segment], collection)
+            # 量化存储逐段追加到磁盘，不在内存中累积 float16 向量
+            if isinstance(collection, QuantizedCollection):
+                collection.flush()
+            self._accumulate_chapter_sums(chapter_sums, embeddings, metadatas[segment])
+            del embeddings
+        
+        progress.finish()
+        self._write_chapter_centroids(chapter_sums, job.chapter_collection if job else None)
+        return embed_time, embedding_bytes
+    
+    def _encode_chunks(self, chunks: List[str], batch_size: int = 32,
+                       progress: Optional[ProgressReporter] = None, job: Optional[IndexJob] = None) -> np.ndarray:
+        """
+        批量生成嵌入向量，写入预分配的连续 float32 数组
+        
+        Args:
+            chunks: 文本块列表
+            batch_size: 每批编码的文本块数量
+            progress: 外部的进度汇总（分段调用时共用），不指定时本次调用单独汇总
+            job: 后台索引任务，使用任务启动时的嵌入模型，每批完成后汇报进度并检查是否已取消
+        
+        Returns:
+            np.ndarray: 形状为 (len(chunks), 向量维度) 的 float32 数组
+        """
+        encoder = job.encoder if job else self.embedding_model
+        embeddings = None
+        owns_progress = progress is None
+        if owns_progress:
+            progress = ProgressReporter(logger, "嵌入", total=len(chunks), interval=self.config.LOG_PROGRESS_INTERVAL)
+        
+        for i in range(0, len(chunks), batch_size):
+            batch_chunks = chunks[i:i + batch_size]
+            self.metrics.observe('embedding_batch_size', len(batch_chunks))
+            with span("rag.embed_batch", offset=i, batch_size=len(batch_chunks)):
+                batch_embeddings = encoder.encode(
+                    batch_chunks,
+                    convert_to_numpy=True,
+                    show_progress_bar=False
+                )
+            
+            # 第一批确定向量维度后一次性分配输出缓冲区
+            if embeddings is None:
+                embeddings = np.empty((len(chunks), batch_embeddings.shape[1]), dtype=np.float32)
+            embeddings[i:i + len(batch_chunks)] = batch_embeddings
+            progress.update(len(batch_chunks))
+            if job:
+                job.advance(len(batch_chunks))
+        
+        if owns_progress:
+            progress.finish()
+        return embeddings
+    
+    @staticmethod
+    def _accumulate_chapter_sums(chapter_sums: Dict[tuple, list], embeddings, metadatas: List[Dict]):
+        """
+        按章节（source + doc_id）累加文本块向量，可分段调用
+        
+        chapter_sums 的值为 [向量和, 文本块数, 章节首个文本块的元数据]
+        """
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        for idx, metadata in enumerate(metadatas):
+            key = (metadata.get('source', ''), metadata.get('doc_id', 0))
+            entry = chapter_sums.get(key)
+            if entry is None:
+                chapter_sums[key] = [vectors[idx].copy(), 1, metadata]
+            else:
+                entry[0] += vectors[idx]
+                entry[1] += 1
+    
+    def _write_chapter_centroids(self, chapter_sums: Dict[tuple, list], chapter_collection=None):
+        """
+        写入章节级索引（默认当前章节集合）
+        
+        每个章节的质心为其所有文本块向量的归一化均值。
+        """
+        chapter_collection = chapter_collection or self.chapter_collection
+        if chapter_collection is None or not chapter_sums:
+            return
+        
+        try:
+            centroid_ids, centroids, centroid_metadatas = [], [], []
+            for (source, doc_id), (vector_sum, count, first) in chapter_sums.items():
+                norm = np.linalg.norm(vector_sum)
+                centroid = vector_sum / norm if norm > 0 else vector_sum
+                centroid_ids.append(f"{source}_doc_{doc_id}")
+                centroids.append(centroid.tolist())
+                centroid_metadatas.append({
+                    'source': source,
+                    'doc_id': doc_id,
+                    'chapter': first.get('chapter', 0),
+                    'title': first.get('title', ''),
+                    'chunk_count': count
+                })
+            
+            with span("rag.store_write", collection="chapters", batch_size=len(centroid_ids)):
+                chapter_collection.upsert(
+                    ids=centroid_ids,
+                    embeddings=centroids,
+                    metadatas=centroid_metadatas
+                )
+            logger.info(f"📑 章节级索引完成: {len(centroid_ids)} 个章节")
+        except Exception as e:
+            logger.warning(f"⚠️ 章节级索引失败，分层检索将不可用: {e}")
+    
+    @staticmethod
+    def build_where_filter(source: Optional[str] = None, chapter_start: Optional[int] = None,
+                           chapter_end: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        构建ChromaDB元数据过滤条件
+        
+        Args:
+            source: 数据来源（文件名，不含扩展名），如 "san_guo_yan_yi"
+            chapter_start: 起始章节（包含）
+            chapter_end: 结束章节（包含）
+        
+        Returns:
+            可直接传给 collection.query 的 where 条件，无过滤时返回 None
+        """
+        conditions = []
+        if source:
+            conditions.append({'source': {'$eq': source}})
+        if chapter_start is not None:
+            conditions.append({'chapter': {'$gte': int(chapter_start)}})
+        if chapter_end is not None:
+            conditions.append({'chapter': {'$lte': int(chapter_end)}})
+        
+        if not conditions:
+            return None
+        if len(conditions) == 1:
+            return conditions[0]
+        return {'$and': conditions}
+    
+    def search(self, query: str, top_k: int = 5, where: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """
         搜索相关文档
         
         Args:
             query: 查询文本
             top_k: 返回结果数量
+            where: 元数据过滤条件（见 build_where_filter），由向量库在检索时执行
         
         Returns:
             List[Dict]: 搜索结果
         """
         try:
-            return self._search_embedding(query, top_k)
+            self._sync_index_version()
+            search_start = time.time()
+            with span("rag.search", top_k=top_k, mode=self.config.RETRIEVAL_MODE, filtered=where is not None):
+                if self.config.RETRIEVAL_MODE == "hierarchical":
+                    results = self._search_hierarchical(query, top_k, where)
+                else:
+                    results = self._search_embedding(query, top_k, where)
+            self.metrics.observe('search_seconds', time.time() - search_start)
+            return results
         except Exception as e:
-            logger.error(f"❌ 搜索失败: {e}")
+            logger.error("❌ 搜索失败: %s", e)
             return []
     
-    def _search_embedding(self, query: str, top_k: int) -> List[Dict[str, Any]]:
+    def search_batch(self, queries: List[str], top_k: int = 5, where: Optional[Dict[str, Any]] = None,
+                     batch_size: int = 64) -> List[Optional[List[Dict[str, Any]]]]:
+        """
+        批量检索：一次编码全部查询，平铺检索模式下每批只调用一次向量库
+        
+        分层检索的精排过滤条件因查询而异，粗排后逐条检索文本块。
+        
+        Args:
+            queries: 查询文本列表
+            top_k: 每个查询的返回结果数量
+            where: 元数据过滤条件（对所有查询生效）
+            batch_size: 每次编码和检索的查询数量
+        
+        Returns:
+            List[Optional[List[Dict]]]: 与 queries 一一对应的检索结果；
+                某批检索失败时该批每个查询的结果为 None（与"没有检索到结果"的空列表区分）
+        """
+        self._sync_index_version()
+        all_results: List[Optional[List[Dict[str, Any]]]] = []
+        for i in range(0, len(queries), batch_size):
+            batch = queries[i:i + batch_size]
+            try:
+                search_start = time.time()
+                with span("rag.search_batch", top_k=top_k, batch_size=len(batch), mode=self.config.RETRIEVAL_MODE):
+                    with span("rag.embed_query", batch_size=len(batch)):
+                        embeddings = self.embedding_model.encode(batch, batch_size=batch_size,
+                                                                 show_progress_bar=False).tolist()
+                    if self.config.RETRIEVAL_MODE == "hierarchical" and self.chapter_collection \
+                            and self.chapter_collection.count() > 0:
+                        results = [self._query_hierarchical(embedding, top_k, where) for embedding in embeddings]
+                    else:
+                        results = self._query_collection_batch(embeddings, top_k, where)
+                self.metrics.observe('search_batch_seconds', time.time() - search_start)
+                all_results.extend(results)
+            except Exception as e:
+                logger.error("❌ 批量搜索失败: %s", e)
+                all_results.extend([None] * len(batch))
+        return all_results
+    
+    def _search_hierarchical(self, query: str, top_k: int, where: Optional[Dict[str, Any]] = None,
+                             top_chapters: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        分层检索：先在章节级索引中选出最相关的章节，再只在这些章节内检索文本块
+        
+        Args:
+            query: 查询文本
+            top_k: 返回结果数量
+            where: 额外的元数据过滤条件
+            top_chapters: 粗排阶段保留的章节数，默认使用 Config.HIERARCHICAL_TOP_CHAPTERS
+        """
+        if not self.chapter_collection or self.chapter_collection.count() == 0:
+            return self._search_embedding(query, top_k, where)
+        
+        query_embedding = self._encode_query(query)
+        return self._query_hierarchical(query_embedding, top_k, where, top_chapters)
+    
+    def _query_hierarchical(self, query_embedding: List[float], top_k: int,
+                            where: Optional[Dict[str, Any]] = None,
+                            top_chapters: Optional[int] = None) -> List[Dict[str, Any]]:
+        """以查询向量执行分层检索（章节粗排 + 文本块精排）"""
+        top_chapters = top_chapters or self.config.HIERARCHICAL_TOP_CHAPTERS
+        
+        # 粗排：章节级索引（where 中的 source/chapter 条件同样适用于章节元数据）
+        with span("rag.vector_query", collection="chapters", n_results=top_chapters):
+            chapter_results = self.chapter_collection.query(
+                query_embeddings=[query_embedding],
+                n_results=top_chapters,
+                where=where
+            )
+        chapter_metadatas = chapter_results['metadatas'][0] if chapter_results['metadatas'] else []
+        if not chapter_metadatas:
+            return []
+        
+        # 精排：只在选中章节内检索文本块
+        chapter_filters = [
+            {'$and': [{'source': {'$eq': m['source']}}, {'doc_id': {'$eq': m['doc_id']}}]}
+            for m in chapter_metadatas
+        ]
+        chunk_where = chapter_filters[0] if len(chapter_filters) == 1 else {'$or': chapter_filters}
+        if where:
+            chunk_where = {'$and': [where, chunk_where]}
+        
+        return self._query_collection(query_embedding, top_k, chunk_where)
+    
+    def _search_embedding(self, query: str, top_k: int, where: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
         """使用嵌入向量搜索"""
         if not self.collection:
             return []
         
         # 生成查询向量
-        query_embedding = self.embedding_model.encode([query])[0].tolist()
+        query_embedding = self._encode_query(query)
         
-        # 搜索
-        results = self.collection.query(
-            query_embeddings=[query_embedding],
-            n_results=top_k
-        )
+        return self._query_collection(query_embedding, top_k, where)
+    
+    def _encode_query(self, query: str) -> List[float]:
+        """生成查询向量"""
+        with span("rag.embed_query", query_length=len(query)):
+            return self.embedding_model.encode([query])[0].tolist()
+    
+    def _query_collection(self, query_embedding: List[float], top_k: int,
+                          where: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """在文本块集合中检索并格式化结果"""
+        return self._query_collection_batch([query_embedding], top_k, where)[0]
+    
+    def _query_collection_batch(self, query_embeddings: List[List[float]], top_k: int,
+                                where: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        """以多个查询向量在文本块集合中检索（一次向量库调用），按查询顺序返回格式化结果"""
+        # 搜索（过滤条件下推到ChromaDB，不在Python中后过滤）
+        with span("rag.vector_query", collection="chunks", n_results=top_k, query_count=len(query_embeddings)):
+            results = self.collection.query(
+                query_embeddings=query_embeddings,
+                n_results=top_k,
+                where=where
+            )
         
         # 格式化结果
-        formatted_results = []
-        for i in range(len(results['documents'][0])):
-            formatted_results.append({
-                'content': results['documents'][0][i],
-                'score': 1 - results['distances'][0][i],  # 转换为相似度
-                'metadata': results['metadatas'][0][i] if results['metadatas'][0] else {}
-            })
+        with span("rag.format_results", result_count=sum(len(docs) for docs in results['documents'])):
+            all_formatted = []
+            for q in range(len(query_embeddings)):
+                formatted_results = []
+                for i in range(len(results['documents'][q])):
+                    formatted_results.append({
+                        'id': results['ids'][q][i],
+                        'content': results['documents'][q][i],
+                        'score': 1 - results['distances'][q][i],  # 转换为相似度
+                        'metadata': results['metadatas'][q][i] if results['metadatas'][q] else {}
+                    })
+                all_formatted.append(formatted_results)
         
-        return formatted_results
+        return all_formatted
     
-    def generate_answer(self, query: str, context: str) -> str:
+    @staticmethod
+    def _build_messages(query: str, context: str) -> List[Dict[str, str]]:
+        """构建发送给DeepSeek的对话消息"""
+        prompt = f"""
+基于以下信息回答用户问题。请确保答案准确、简洁且有用。
+
+上下文信息：
+{context}
+
+用户问题：{query}
+
+请根据上下文信息回答问题。如果上下文中没有相关信息，请说明无法根据提供的信息回答。
+"""
+        return [
+            {"role": "system", "content": "你是一个有用的AI助手，能够基于提供的信息准确回答问题。"},
+            {"role": "user", "content": prompt}
+        ]
+    
+    def _query_deadline(self, start: float) -> Optional[float]:
+        """按 QUERY_LATENCY_BUDGET 计算本次问答的截止时间（time.monotonic() 时间戳）"""
+        budget = self.config.QUERY_LATENCY_BUDGET
+        return start + budget if budget else None
+    
+    def _fallback_answer(self, query: str, context: str, reason: str) -> str:
+        """LLM不可用、出错或超出时间预算时，从上下文中抽取与问题最相关的句子作为回答"""
+        self.metrics.increment('llm_fallbacks_total', reason=reason)
+        extract = extractive_answer(query, context) or "没有检索到相关信息。"
+        return f"抱歉，无法生成回答（{reason}）。以下为检索原文摘录：\n{extract}"
+    
+    def generate_answer(self, query: str, context: str, deadline: Optional[float] = None) -> str:
         """
         使用DeepSeek生成答案
         
         Args:
             query: 用户问题
             context: 检索到的上下文
+            deadline: 截止时间（time.monotonic() 时间戳），到期后返回抽取式回答
         
         Returns:
             str: 生成的答案
         """
-        if not self.openai_client:
-            return f"基于检索到的信息：\n{context[:500]}..."
+        return self._generate_answer(query, context, deadline)[0]
+    
+    def _generate_answer(self, query: str, context: str, deadline: Optional[float] = None) -> tuple:
+        """
+        生成答案
+        
+        Returns:
+            (答案, 是否正常生成)：调用失败或超出预算时返回抽取式回答和 False
+        """
+        if not self.llm:
+            return f"基于检索到的信息：\n{extractive_answer(query, context)}", True
         
         try:
-            prompt = f"""
-基于以下信息回答用户问题。请确保答案准确、简洁且有用。
-
-上下文信息：
-{context}
-
-用户问题：{query}
-
-请根据上下文信息回答问题。如果上下文中没有相关信息，请说明无法根据提供的信息回答。
-"""
+            with span("rag.llm_request", model=self.llm.model, context_length=len(context)) as s:
+                response = self.llm.create(
+                    self._build_messages(query, context),
+                    deadline=deadline,
+                    max_tokens=1000,
+                    temperature=0.1
+                )
+                usage = getattr(response, "usage", None)
+                if usage is not None:
+                    s.set_attribute("prompt_tokens", usage.prompt_tokens)
+                    s.set_attribute("completion_tokens", usage.completion_tokens)
+            
+            return response.choices[0].message.content.strip(), True
             
-            response = self.openai_client.chat.completions.create(
-                model="deepseek-chat",
-                messages=[
-                    {"role": "system", "content": "你是一个有用的AI助手，能够基于提供的信息准确回答问题。"},
-                    {"role": "user", "content": prompt}
-                ],
+        except Exception as e:
+            from llm_client import DeadlineExceeded
+            logger.error(f"❌ 答案生成失败: {e}")
+            expired = isinstance(e, DeadlineExceeded) or (deadline is not None and time.monotonic() >= deadline)
+            return self._fallback_answer(query, context, "超出时间预算" if expired else "生成服务异常"), False
+    
+    def generate_answer_stream(self, query: str, context: str, deadline: Optional[float] = None) -> Iterator[str]:
+        """
+        使用DeepSeek流式生成答案
+        
+        Args:
+            query: 用户问题
+            context: 检索到的上下文
+            deadline: 截止时间（time.monotonic() 时间戳）；首个片段前到期时返回抽取式回答，之后到期则截断
+        
+        Yields:
+            str: 答案文本片段
+        """
+        if not self.llm:
+            yield f"基于检索到的信息：\n{extractive_answer(query, context)}"
+            return
+        
+        from llm_client import DeadlineExceeded
+        
+        # 流式生成跨越多次 yield，span 不绑定到当前上下文，结束时手动关闭
+        llm_span = start_span("rag.llm_request", model=self.llm.model, context_length=len(context), stream=True)
+        chunk_count = 0
+        stream = None
+        try:
+            stream = self.llm.create(
+                self._build_messages(query, context),
+                deadline=deadline,
                 max_tokens=1000,
-                temperature=0.1
+                temperature=0.1,
+                stream=True
             )
-            
-            return response.choices[0].message.content.strip()
-            
+            for chunk in stream:
+                if deadline is not None and time.monotonic() >= deadline:
+                    if chunk_count == 0:
+                        raise DeadlineExceeded("等待首个片段时超出时间预算")
+                    self.metrics.increment('llm_fallbacks_total', reason="回答被截断")
+                    yield "\n\n（已超出时间预算，回答被截断）"
+                    break
+                if chunk.choices and chunk.choices[0].delta.content:
+                    chunk_count += 1
+                    yield chunk.choices[0].delta.content
         except Exception as e:
             logger.error(f"❌ 答案生成失败: {e}")
-            return f"抱歉，无法生成回答。基于检索信息：\n{context[:500]}..."
+            expired = isinstance(e, DeadlineExceeded) or (deadline is not None and time.monotonic() >= deadline)
+            if chunk_count == 0:
+                yield self._fallback_answer(query, context, "超出时间预算" if expired else "生成服务异常")
+            else:
+                self.metrics.increment('llm_fallbacks_total', reason="回答被截断")
+                yield "\n\n（生成中断，回答不完整）"
+        finally:
+            # 截断、出错或调用方关闭生成器时，关闭上游连接
+            if stream is not None:
+                getattr(stream, "close", lambda: None)()
+            llm_span.set_attribute("completion_chunks", chunk_count)
+            llm_span.end()
     
-    def query(self, question: str, top_k: int = 5) -> Dict[str, Any]:
+    def answer_from_sources(self, question: str, sources: List[Dict[str, Any]],
+                            deadline: Optional[float] = None) -> tuple:
+        """
+        用已有的检索结果生成答案（调用方自行检索，如批量问答）
+        
+        Args:
+            question: 用户问题
+            sources: search / search_batch 返回的检索结果
+            deadline: 截止时间（time.monotonic() 时间戳），默认从现在起按 QUERY_LATENCY_BUDGET 计算
+        
+        Returns:
+            (答案, 是否正常生成)：调用失败或超出预算时返回抽取式回答和 False
+        """
+        with span("rag.build_context", source_count=len(sources)):
+            context = self._build_context(sources)
+        if deadline is None:
+            deadline = self._query_deadline(time.monotonic())
+        return self._generate_answer(question, context, deadline)
+    
+    @staticmethod
+    def _build_context(sources: List[Dict[str, Any]]) -> str:
+        """用检索结果构建上下文（只用前3个结果）"""
+        return "\n\n".join([
+            f"相关信息 {i+1}：{source['content']}"
+            for i, source in enumerate(sources[:3])
+        ])
+    
+    def query_stream(self, question: str, top_k: int = 5,
+                     where: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        流式问答流程
+        
+        Args:
+            question: 用户问题
+            top_k: 检索结果数量
+            where: 元数据过滤条件（见 build_where_filter）
+        
+        Yields:
+            Dict: 依次为 {'type': 'sources'}、若干 {'type': 'token'}、最后 {'type': 'done'}
+        """
+        start_time = time.time()
+        deadline = self._query_deadline(time.monotonic())
+        
+        sources = self.search(question, top_k, where)
+        search_time = time.time() - start_time
+        yield {'type': 'sources', 'sources': sources, 'search_time': search_time}
+        
+        with span("rag.build_context", source_count=len(sources)):
+            context = self._build_context(sources)
+        
+        generate_start = time.time()
+        first_token_time = None
+        tokens = self.generate_answer_stream(question, context, deadline)
+        try:
+            for token in tokens:
+                if first_token_time is None:
+                    first_token_time = time.time() - generate_start
+                yield {'type': 'token', 'content': token}
+        finally:
+            tokens.close()
+        
+        generate_time = time.time() - generate_start
+        total_time = time.time() - start_time
+        self.metrics.record_query(generate_time, total_time, mode="stream")
+        yield {
+            'type': 'done',
+            'search_time': search_time,
+            'first_token_time': first_token_time or 0.0,
+            'generate_time': generate_time,
+            'total_time': total_time
+        }
+    
+    def query(self, question: str, top_k: int = 5, where: Optional[Dict[str, Any]] = None,
+              use_cache: bool = True) -> Dict[str, Any]:
         """
         完整的问答流程
         
         Args:
             question: 用户问题
             top_k: 检索结果数量
+            where: 元数据过滤条件（见 build_where_filter）
+            use_cache: 是否读写结果缓存（性能分析时关闭，保证执行完整流程）
         
         Returns:
             Dict: 包含答案、来源和性能指标的结果
         """
+        with span("rag.query", top_k=top_k, filtered=where is not None):
+            return self._query(question, top_k, where, use_cache)
+    
+    def _query(self, question: str, top_k: int, where: Optional[Dict[str, Any]],
+               use_cache: bool = True) -> Dict[str, Any]:
+        """问答流程实现，各阶段在 rag.query span 下记录子span"""
+        # 结果缓存（含预热阶段预计算的热门问题）
+        cache_key = ResultCache.make_key(question, top_k, where, self.collection_name,
+                                         self._sync_index_version(), self.active_model_name)
+        if use_cache:
+            with span("rag.cache_lookup", cache="query") as s:
+                cached = self.result_cache.get(cache_key)
+                s.set_attribute("hit", cached is not None)
+            self.metrics.record_cache("query", cached is not None)
+            if cached is not None:
+                self.metrics.record_query(0.0, 0.0, mode="cached")
+                return dict(cached, cached=True)
+        
         start_time = time.time()
+        deadline = self._query_deadline(time.monotonic())
         
         # 搜索相关文档
         search_start = time.time()
-        sources = self.search(question, top_k)
+        sources = self.search(question, top_k, where)
         search_time = time.time() - search_start
         
         # 构建上下文
-        context = "\n\n".join([
-            f"相关信息 {i+1}：{source['content']}"
-            for i, source in enumerate(sources[:3])  # 只用前3个结果
-        ])
-        logger.info("✅ 上下文: "+context)
+        with span("rag.build_context", source_count=len(sources)):
+            context = self._build_context(sources)
+        logger.debug("上下文 (%d 字): %.300s", len(context), context)
         # 生成答案
         generate_start = time.time()
-        answer = self.generate_answer(question, context)
+        answer, generated = self._generate_answer(question, context, deadline)
         generate_time = time.time() - generate_start
         
         total_time = time.time() - start_time
+        self.metrics.record_query(generate_time, total_time, mode="sync")
         
-        return {
+        result = {
             'answer': answer,
             'sources': sources,
             'search_time': search_time,
@@ -476,6 +1584,11 @@ class RAGSystem:
             'total_time': total_time,
             'using_modelscope': self.using_modelscope
         }
+        # 只缓存LLM生成的回答：生成失败的降级回答和未配置LLM时的抽取式回答都不缓存，
+        # 下次请求重试（或配置客户端后使用LLM）
+        if use_cache and generated and self.llm:
+            self.result_cache.put(cache_key, result)
+        return result
     
     def get_collection_stats(self) -> Dict[str, Any]:
         """获取集合统计信息"""
@@ -483,13 +1596,40 @@ class RAGSystem:
             if self.collection:
                 return {
                     'total_documents': self.collection.count(),
-                    'embedding_model': self.config.EMBEDDING_MODEL_NAME,
+                    'embedding_model': self.active_model_name,
                     'using_modelscope': self.using_modelscope,
                     'chunk_size': self.config.MAX_CHUNK_SIZE,
                     'chunk_overlap': self.config.CHUNK_OVERLAP,
-                    'collection_name': self.config.COLLECTION_NAME
+                    'collection_name': self.collection_name,
+                    'retrieval_mode': self.config.RETRIEVAL_MODE,
+                    'total_chapters': self.chapter_collection.count() if self.chapter_collection else 0,
+                    'vector_storage': self.config.VECTOR_STORAGE,
+                    'last_index_stats': self.last_index_stats,
+                    'warmup_status': self.warmup_status,
+                    'memory': self.get_memory_stats()
                 }
             else:
                 return {'error': '系统未初始化'}
         except Exception as e:
-            return {'error': str(e)} 
\ No newline at end of file
+            return {'error': str(e)} 
+    
+    def get_memory_stats(self) -> Dict[str, Any]:
+        """
+        各组件内存占用（字节）
+        
+        vector_index_bytes 为当前集合（文本块和章节）的 HNSW 索引文件大小（ChromaDB 查询时整体载入内存），
+        量化存储另计入量化编码（float16 重排序向量为内存映射，不计入）。
+        """
+        collection_ids = [collection.id for collection in (self.collection, self.chapter_collection)
+                          if collection is not None and not isinstance(collection, QuantizedCollection)]
+        index_bytes = hnsw_index_bytes(self.config.CHROMA_PERSIST_DIR, collection_ids)
+        if isinstance(self.collection, QuantizedCollection):
+            index_bytes += self.collection.get_storage_stats()['code_bytes']
+        return {
+            'process_rss_bytes': process_rss_bytes(),
+            'peak_rss_bytes': peak_rss_bytes(),
+            'model_parameter_bytes': model_parameter_bytes(self.embedding_model),
+            'resident_model_bytes': self.model_registry.status()['total_bytes'],
+            'vector_index_bytes': index_bytes,
+            'memory_budget_bytes': self._memory_budget_bytes()
+        }
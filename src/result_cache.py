@@ -0,0 +1,59 @@
+"""
+问答结果缓存
+进程内共享的 LRU 缓存（Streamlit 各会话共用同一个 RAGSystem，重跑脚本和不同会话均可命中），
+键中包含索引版本，重新索引后旧结果自然失效，由 LRU 淘汰。
+"""
+import json
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+class ResultCache:
+    """线程安全的 LRU 缓存，可选过期时间"""
+
+    def __init__(self, max_entries: int = 512, ttl: Optional[float] = None):
+        """
+        Args:
+            max_entries: 最多缓存的条目数（<= 0 表示不缓存）
+            ttl: 过期秒数，None 表示不过期
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()  # 键 -> (写入时间, 值)
+
+    @staticmethod
+    def make_key(question: str, top_k: int, where: Optional[Dict[str, Any]], *version) -> tuple:
+        """问答结果的缓存键：(问题, top_k, 过滤条件, *版本信息)"""
+        where_key = json.dumps(where, sort_keys=True, ensure_ascii=False) if where else ""
+        return (question.strip(), top_k, where_key) + tuple(version)
+
+    def get(self, key: tuple) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if self.ttl is not None and time.time() - entry[0] > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: tuple, value: Any):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
@@ -0,0 +1,126 @@
+"""
+链路追踪
+基于 OpenTelemetry 为问答和索引流程的各阶段创建span，导出到控制台或本地文件（每行一个JSON），
+不依赖外部采集服务。
+
+未调用 setup_tracing 时使用 OpenTelemetry 默认的空实现，span 开销可忽略；
+未安装 opentelemetry 时 span() 退化为空上下文管理器。
+"""
+import json
+import logging
+import threading
+import importlib.util
+from contextlib import contextmanager
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+TRACING_AVAILABLE = importlib.util.find_spec("opentelemetry") is not None
+
+TRACER_NAME = "rag_system"
+
+_setup_lock = threading.Lock()
+_configured = False
+
+
+class _NoopSpan:
+    """opentelemetry 不可用时的占位span"""
+
+    def set_attribute(self, key, value):
+        pass
+
+    def set_attributes(self, attributes):
+        pass
+
+    def end(self):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def setup_tracing(exporter: str, file_path: Optional[str] = None) -> bool:
+    """
+    配置全局 TracerProvider（进程内只生效一次）
+
+    Args:
+        exporter: "console" 或 "file"，空字符串表示不启用
+        file_path: exporter 为 "file" 时的输出文件
+
+    Returns:
+        bool: 是否已启用追踪
+    """
+    global _configured
+    if not exporter or not TRACING_AVAILABLE:
+        return _configured
+
+    with _setup_lock:
+        if _configured:
+            return True
+
+        from opentelemetry import trace
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+
+        if exporter == "file":
+            out = open(file_path or "traces.jsonl", "a", encoding="utf-8")
+            span_exporter = ConsoleSpanExporter(
+                out=out,
+                formatter=lambda span: json.dumps(json.loads(span.to_json()), ensure_ascii=False) + "\n"
+            )
+        elif exporter == "console":
+            span_exporter = ConsoleSpanExporter()
+        else:
+            logger.warning(f"⚠️ 未知的追踪导出方式: {exporter}")
+            return False
+
+        provider = TracerProvider(resource=Resource.create({"service.name": TRACER_NAME}))
+        provider.add_span_processor(BatchSpanProcessor(span_exporter))
+        trace.set_tracer_provider(provider)
+        _configured = True
+        logger.info(f"🔭 链路追踪已启用: {exporter}" + (f" → {file_path}" if exporter == "file" else ""))
+        return True
+
+
+def _tracer():
+    from opentelemetry import trace
+    return trace.get_tracer(TRACER_NAME)
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    创建当前上下文中的子span
+
+    用法:
+        with span("rag.vector_query", top_k=5) as s:
+            ...
+            s.set_attribute("result_count", n)
+    """
+    if not TRACING_AVAILABLE:
+        yield _NOOP_SPAN
+        return
+    with _tracer().start_as_current_span(name, attributes=_clean(attributes)) as current:
+        yield current
+
+
+def start_span(name: str, **attributes):
+    """
+    创建不绑定到当前上下文的span，需手动调用 end()
+
+    用于跨越生成器 yield 的阶段（如流式生成），这类阶段可能在不同线程中恢复执行。
+    """
+    if not TRACING_AVAILABLE:
+        return _NOOP_SPAN
+    return _tracer().start_span(name, attributes=_clean(attributes))
+
+
+def _clean(attributes):
+    """span属性只接受基本类型，None 值丢弃，其余转为字符串"""
+    cleaned = {}
+    for key, value in attributes.items():
+        if value is None:
+            continue
+        cleaned[key] = value if isinstance(value, (bool, int, float, str)) else str(value)
+    return cleaned
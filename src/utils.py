@@ -2,6 +2,7 @@
 RAG系统工具函数
 """
 import json
+import os
 import re
 from typing import List, Dict, Any
 import string
@@ -57,6 +58,133 @@ def load_toutiao_data(file_path: str, max_lines: int = 10000) -> List[Dict[str,
     return data
 
 
+def get_source_name(file_path: str) -> str:
+    """
+    根据文件路径生成数据来源名称（用于文档ID命名空间）
+    
+    Args:
+        file_path: 数据文件路径
+    
+    Returns:
+        不含扩展名的文件名，如 xi_you_ji
+    """
+    return os.path.splitext(os.path.basename(file_path))[0]
+
+
+_CHINESE_DIGITS = {'零': 0, '〇': 0, '一': 1, '二': 2, '两': 2, '三': 3, '四': 4,
+                   '五': 5, '六': 6, '七': 7, '八': 8, '九': 9}
+_CHINESE_UNITS = {'十': 10, '百': 100, '千': 1000, '万': 10000}
+
+
+def chinese_to_int(text: str) -> int:
+    """
+    将中文数字（或阿拉伯数字）转换为整数
+    
+    Args:
+        text: 如 "一百二十", "十五", "120"
+    
+    Returns:
+        对应的整数，无法解析时返回0
+    """
+    if text.isdigit():
+        return int(text)
+    
+    total, section, number = 0, 0, 0
+    for char in text:
+        if char in _CHINESE_DIGITS:
+            number = _CHINESE_DIGITS[char]
+        elif char in _CHINESE_UNITS:
+            unit = _CHINESE_UNITS[char]
+            if unit == 10000:
+                total += (section + number) * unit
+                section = 0
+            else:
+                # "十五" 中的 "十" 前面没有数字，按1处理
+                section += (number or 1) * unit
+            number = 0
+        else:
+            return 0
+    return total + section + number
+
+
+def parse_chapter_number(title: str) -> int:
+    """
+    从章节标题中解析章节序号
+    
+    Args:
+        title: 章节标题，如 "第一回 宴桃园豪杰三结义"
+    
+    Returns:
+        章节序号，未找到时返回0
+    """
+    match = re.search(r'第([一二三四五六七八九十百千万零〇两\d]+)[回章节]', title)
+    if match:
+        return chinese_to_int(match.group(1))
+    match = re.search(r'Chapter\s*(\d+)', title, re.IGNORECASE)
+    if match:
+        return int(match.group(1))
+    return 0
+
+
+def build_novel_chunks(file_path: str, max_documents: int = 1000,
+                       max_chunk_size: int = 500, overlap: int = 50,
+                       min_chunk_length: int = 20) -> Dict[str, Any]:
+    """
+    加载单个小说文件并完成清理和分块
+    
+    该函数只依赖标准库，可在子进程中并行执行。
+    
+    Args:
+        file_path: 数据文件路径
+        max_documents: 最大章节数量
+        max_chunk_size: 最大块大小
+        overlap: 重叠大小
+        min_chunk_length: 最小块长度，过短的块会被跳过
+    
+    Returns:
+        包含 source、chunks、metadatas、ids 的字典
+    """
+    source = get_source_name(file_path)
+    chunks, metadatas, ids = [], [], []
+    
+    raw_data = load_toutiao_data(file_path, max_documents)
+    
+    for i, item in enumerate(raw_data):
+        # 清理文本
+        content = clean_text(item.get('content', ''))
+        title = clean_text(item.get('title', ''))
+        chapter = parse_chapter_number(item.get('title', ''))
+        
+        if not content:
+            continue
+        
+        for j, chunk in enumerate(split_text_by_sentences(content, max_chunk_size, overlap)):
+            if len(chunk.strip()) < min_chunk_length:  # 跳过太短的块
+                continue
+            
+            chunks.append(chunk)
+            metadatas.append({
+                'title': title,
+                'category': item.get('category', ''),
+                'keywords': item.get('keywords', ''),
+                'source': source,
+                'chapter': chapter,
+                'doc_id': i,
+                'chunk_id': j
+            })
+            # 以来源文件作为命名空间，避免多个文件写入同一集合时ID冲突
+            ids.append(f"{source}_doc_{i}_chunk_{j}")
+    
+    return {
+        'source': source,
+        'file_path': file_path,
+        'documents': len(raw_data),
+        'chunks': chunks,
+        'metadatas': metadatas,
+        'ids': ids
+    }
+
+
 def split_novel_by_chapters(content: str) -> List[str]:
     """
     按章节分割小说内容
@@ -251,6 +379,38 @@ def split_text_by_sentences(text: str, max_chunk_size: int = 500, overlap: int =
     return chunks
 
 
+def extractive_answer(question: str, context: str, max_sentences: int = 3) -> str:
+    """
+    抽取式回答：从上下文中选出与问题字符二元组重合最多的句子，按原文顺序拼接
+    
+    用于LLM不可用或超出时间预算时的降级回答。
+    
+    Args:
+        question: 用户问题
+        context: 检索到的上下文（_build_context 的输出）
+        max_sentences: 最多选取的句子数
+    
+    Returns:
+        抽取的句子，上下文为空时返回空字符串
+    """
+    # 去掉 "相关信息 N：" 前缀后按句子切分，保留句末标点
+    text = re.sub(r'相关信息 \d+：', '', context)
+    sentences = [s.strip() for s in re.findall(r'[^。！？\n]+[。！？]?', text) if len(s.strip()) >= 5]
+    if not sentences:
+        return ""
+    
+    question_bigrams = {question[i:i + 2] for i in range(len(question) - 1)}
+    scores = []
+    for index, sentence in enumerate(sentences):
+        overlap = sum(1 for i in range(len(sentence) - 1) if sentence[i:i + 2] in question_bigrams)
+        scores.append((overlap, -index))
+    
+    # 没有重合时取排名最靠前的检索结果开头的句子
+    top = [i for i in sorted(range(len(sentences)), key=lambda i: scores[i], reverse=True)
+           if scores[i][0] > 0][:max_sentences] or list(range(min(max_sentences, len(sentences))))
+    return "".join(sentences[i] for i in sorted(top))
+
+
 def format_search_results(results: List[Dict[str, Any]]) -> str:
     """
     格式化搜索结果用于显示
@@ -4,8 +4,11 @@
 """
 import sys
 import os
+import logging
 sys.path.append('./src')
 
+logging.basicConfig(level=logging.INFO)
+
 from config import Config
 from rag_system import RAGSystem
 